@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from saldos import a_centavos, de_centavos
+
+
+# -------------------------
+# Cubo de gastos
+# -------------------------
+# Sumas por (día, pagó, moneda): monto_base, monto en la moneda original (los dos en centavos
+# enteros, como el Ledger) y cantidad de gastos.
+# Se mantiene como el Ledger: se arma una vez por snapshot y después se le suman las filas nuevas
+# (o se le restan las borradas), así los gráficos no recorren el viaje entero.
+# Son pocas celdas (días x personas x monedas); las vistas (por día, acumulado, por persona,
+# mezcla de monedas) se arman de ahí.
+
+SIN_FECHA = ""
+
+
+def _dias(col: pd.Series) -> pd.Series:
+    # "YYYY-MM-DD" (o SIN_FECHA); acepta texto, número de serie de la Sheet o datetime.
+    # Import diferido: sheets importa este módulo para mantener el cubo en cada snapshot.
+    from sheets import to_fecha
+
+    return pd.to_datetime(to_fecha(col.reset_index(drop=True))).dt.strftime("%Y-%m-%d").fillna(SIN_FECHA)
+
+
+class Cubo:
+    def __init__(self):
+        self.celdas = {}  # (dia, pago, moneda) -> [monto_base_c, monto_c, n]
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame) -> "Cubo":
+        cubo = cls()
+        cubo.add_df(df)
+        return cubo
+
+    @classmethod
+    def from_sumas(cls, df: pd.DataFrame) -> "Cubo":
+        # Desde sumas ya agrupadas (ej. un GROUP BY fecha, pago, moneda en SQL), con la cantidad en "n"
+        cubo = cls()
+        cubo._sumar(df, 1, n=df["n"].to_numpy(dtype=int) if "n" in df.columns else 1)
+        return cubo
+
+    def copy(self) -> "Cubo":
+        other = Cubo()
+        other.celdas = {k: list(v) for k, v in self.celdas.items()}
+        return other
+
+    def _sumar(self, df: pd.DataFrame, sign: int, n=1):
+        if df is None or df.empty or "monto_base" not in df.columns:
+            return
+        claves = pd.DataFrame({
+            "dia": _dias(df["fecha"]) if "fecha" in df.columns else SIN_FECHA,
+            "pago": df["pago"].astype(str).to_numpy() if "pago" in df.columns else "",
+            "moneda": df["moneda"].astype(str).to_numpy() if "moneda" in df.columns else "",
+            "monto_base": a_centavos(df["monto_base"]),
+            "monto": a_centavos(df["monto"]) if "monto" in df.columns else 0,
+            "n": n,
+        })
+        # un groupby por lote: se toca una celda por combinación, no una por fila
+        sumas = claves.groupby(["dia", "pago", "moneda"], sort=False)[["monto_base", "monto", "n"]].sum()
+        for (dia, pago, moneda), (base, monto, n) in zip(sumas.index, sumas.to_numpy()):
+            celda = self.celdas.setdefault((dia, pago, moneda), [0, 0, 0])
+            celda[0] += sign * int(base)
+            celda[1] += sign * int(monto)
+            celda[2] += sign * int(n)
+            if celda[2] <= 0:
+                del self.celdas[(dia, pago, moneda)]
+
+    def add_df(self, df: pd.DataFrame):
+        self._sumar(df, 1)
+
+    def add(self, row):
+        self._sumar(pd.DataFrame([row]), 1)
+
+    def remove(self, row):
+        self._sumar(pd.DataFrame([row]), -1)
+
+    @property
+    def n(self) -> int:
+        return sum(c[2] for c in self.celdas.values())
+
+    # ----- vistas -----
+    def tabla(self) -> pd.DataFrame:
+        if not self.celdas:
+            return pd.DataFrame(columns=["dia", "pago", "moneda", "monto_base", "monto", "n"])
+        claves = list(self.celdas)
+        valores = np.array(list(self.celdas.values()), dtype=np.int64)
+        return pd.DataFrame({
+            "dia": [k[0] for k in claves],
+            "pago": [k[1] for k in claves],
+            "moneda": [k[2] for k in claves],
+            "monto_base": de_centavos(valores[:, 0]),
+            "monto": de_centavos(valores[:, 1]),
+            "n": valores[:, 2],
+        }).sort_values(["dia", "pago", "moneda"], ignore_index=True)
+
+    def por_dia(self) -> pd.Series:
+        # Gasto diario (en la base), con los días sin gastos en 0
+        t = self.tabla()
+        t = t[t["dia"] != SIN_FECHA]
+        if t.empty:
+            return pd.Series(dtype=float)
+        s = t.groupby("dia")["monto_base"].sum()
+        s.index = pd.to_datetime(s.index)
+        return s.reindex(pd.date_range(s.index.min(), s.index.max(), freq="D"), fill_value=0.0)
+
+    def acumulado(self) -> pd.Series:
+        return self.por_dia().cumsum()
+
+    def por_pago_dia(self) -> pd.DataFrame:
+        # Días x quién pagó
+        t = self.tabla()
+        t = t[t["dia"] != SIN_FECHA]
+        if t.empty:
+            return pd.DataFrame()
+        p = t.pivot_table(index="dia", columns="pago", values="monto_base", aggfunc="sum", fill_value=0.0)
+        p.index = pd.to_datetime(p.index)
+        return p.reindex(pd.date_range(p.index.min(), p.index.max(), freq="D"), fill_value=0.0)
+
+    def por_pago(self) -> pd.Series:
+        t = self.tabla()
+        return t.groupby("pago")["monto_base"].sum().sort_values(ascending=False)
+
+    def monedas(self) -> pd.DataFrame:
+        # Cuánto se gastó en cada moneda (original y en la base) y qué parte del total es
+        t = self.tabla()
+        if t.empty:
+            return pd.DataFrame(columns=["Moneda", "Monto", "En base", "Gastos", "%"])
+        m = t.groupby("moneda")[["monto", "monto_base", "n"]].sum().sort_values("monto_base", ascending=False)
+        total = m["monto_base"].sum()
+        return pd.DataFrame({
+            "Moneda": m.index,
+            "Monto": m["monto"].to_numpy(),
+            "En base": m["monto_base"].to_numpy(),
+            "Gastos": m["n"].to_numpy(dtype=int),
+            "%": (m["monto_base"] / total * 100).to_numpy() if total else 0.0,
+        })
+
+    def ritmo(self) -> dict:
+        # Ritmo de gasto: promedio por día del viaje (contando los días sin gastos) y el día pico
+        dia = self.por_dia()
+        if dia.empty:
+            return {"dias": 0, "promedio": 0.0, "pico": 0.0, "dia_pico": None}
+        return {
+            "dias": len(dia),
+            "promedio": float(dia.mean()),
+            "pico": float(dia.max()),
+            "dia_pico": dia.idxmax().date(),
+        }
@@ -1,161 +1,44 @@
+import os
 import streamlit as st
-import pandas as pd
-import gspread
+import threading
 import uuid
 
-
+from collections import OrderedDict
 from datetime import date
-from google.oauth2.service_account import Credentials
-from datetime import datetime 
-
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.lib import fonts
-from reportlab.lib.styles import getSampleStyleSheet
-import os
+
+from sheets import BASE_COLS, SnapshotCache
+from analitica import Cubo
+from cambios import TablaCambios, observadas, rebase
+from cuota import CuotaAgotada, Limitador
+from explorar import IndiceGastos
+from exportar import FORMATOS, TABLAS, tabla_export
+from importar import importar_gastos, plantilla_csv
+from metricas import METRICAS, WorksheetMedida, configurar_logs, etapa, iniciar_corrida, llamada_api
+from outbox import Outbox
+from partes import PARTES_COLS
+from storage import SheetsStorage, SqliteStorage, Storage
+from saldos import Ledger, a_centavos, cuadrar_partes, de_centavos, normalize_currency, repartir, settle
+from viajes import Viaje, parse_trip_index, viajes_from_config
+
+# reportlab (reportes) y gspread/google-auth se importan recién cuando se usan:
+# un arranque en frío no paga el PDF ni la Sheet si nadie los toca.
 
 st.set_page_config(
     page_title="Gastos de Viaje",
     page_icon="🧾",
-    layout="centered",
+    layout="wide",
     initial_sidebar_state="collapsed",
 )
 
-st.markdown("""
-<style>
-/* Quita padding extra */
-.block-container { padding-top: 1rem; padding-bottom: 1rem; }
-
-/* Botones grandes */
-.stButton > button {
-  width: 100%;
-  padding: 0.75rem 1rem;
-  border-radius: 14px;
-  font-weight: 600;
-}
-
-/* Inputs más cómodos */
-div[data-baseweb="input"] input,
-div[data-baseweb="textarea"] textarea {
-  border-radius: 12px !important;
-}
-
-/* Cards */
-.card {
-  background: #ffffff10;
-  border: 1px solid #ffffff20;
-  border-radius: 16px;
-  padding: 12px 14px;
-  margin: 10px 0;
-}
-
-/* Tabla: evita que se “desborde” feo en móvil */
-div[data-testid="stDataFrame"] { overflow-x: auto; }
-</style>
-""", unsafe_allow_html=True)
-
-
-@st.cache_resource
-def get_ws():
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive",
-    ]
-
-    creds = Credentials.from_service_account_info(
-        st.secrets["gcp_service_account"], scopes=scopes
-    )
-
-    gc = gspread.authorize(creds)
-
-    sh = gc.open_by_key(st.secrets["sheets"]["spreadsheet_id"])
-    ws = sh.worksheet(st.secrets["sheets"]["worksheet"])
-
-    return ws
-
-
-import re
-
-def load_gastos_from_sheet(personas):
-    ws = get_ws()
-    values = ws.get_all_values()
-    if len(values) < 2:
-        return pd.DataFrame()
-
-    headers = [h.strip() for h in values[0]]
-    rows = values[1:]
-    df = pd.DataFrame(rows, columns=headers)
-
-    # columnas numéricas
-    numeric_cols = ["monto", "cambio_a_base", "monto_base"] + personas
-
-    def to_num(x):
-        if x is None:
-            return 0.0
-        s = str(x).strip()
-        if s == "":
-            return 0.0
-
-        # deja solo dígitos, coma, punto y signo
-        s = re.sub(r"[^0-9,.\-]", "", s)
-
-        # Tu caso: 333,3333333  -> 333.3333333
-        # y 1000 -> 1000
-        # y 1.234,56 -> 1234.56
-        if "," in s and "." in s:
-            # si tiene ambos, asumimos formato AR: 1.234,56
-            s = s.replace(".", "")
-            s = s.replace(",", ".")
-        elif "," in s and "." not in s:
-            # solo coma: decimal
-            s = s.replace(",", ".")
-
-        try:
-            return float(s)
-        except:
-            return 0.0
-
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = df[col].apply(to_num)
-        else:
-            df[col] = 0.0
-
-    return df
-
-
-
-def append_gasto_to_sheet(row, personas):
-    ws = get_ws()
-    headers = ws.row_values(1)
-
-    # Asegurar que existan las columnas esperadas
-    needed = ["id", "fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"] + personas
-    missing = [c for c in needed if c not in headers]
-    if missing:
-        raise ValueError(f"Faltan columnas en la Sheet (fila 1): {missing}")
-
-    # Evitar duplicados por id
-    id_idx = headers.index("id")
-    values = ws.get_all_values()
-    if len(values) > 1:
-        existing_ids = {r[id_idx] for r in values[1:] if len(r) > id_idx and r[id_idx]}
-        if row["id"] in existing_ids:
-            return
-
-    # Armar fila en el mismo orden que los headers de la hoja
-    ordered = [row.get(h, "") for h in headers]
-    ws.append_row(ordered, value_input_option="USER_ENTERED")
-
-
-
-
-st.set_page_config(page_title="Gastos de Viaje", layout="wide")
+# -------------------------
+# Métricas del rerun
+# -------------------------
+# [debug] log_level = "INFO" (un JSON por rerun) o "DEBUG" (además, uno por llamada a la API);
+# panel = true (o ?debug=1 en la URL) muestra el desglose al pie de la página.
+configurar_logs(st.secrets.get("debug", {}).get("log_level"))
+if st.session_state.get("corrida") is not None and st.session_state.corrida.ms is None:
+    st.session_state.corrida.terminar()  # el rerun anterior cortó con st.stop / st.rerun
+st.session_state.corrida = iniciar_corrida()
 
 # -------------------------
 # CSS (estilo claro)
@@ -165,11 +48,27 @@ st.markdown(
     <style>
       .block-container {padding-top: 1.2rem; padding-bottom: 2rem; max-width: 1200px;}
       h1, h2, h3 {letter-spacing: -0.5px;}
+
+      /* Botones grandes */
+      .stButton > button {
+        width: 100%;
+        padding: 0.75rem 1rem;
+        border-radius: 14px;
+        font-weight: 600;
+      }
+
+      /* Inputs más cómodos */
+      div[data-baseweb="input"] input,
+      div[data-baseweb="textarea"] textarea {
+        border-radius: 12px !important;
+      }
+
       .card {
         background: #ffffff;
         border: 1px solid #eef0f3;
         border-radius: 18px;
         padding: 18px 18px;
+        margin: 10px 0;
         box-shadow: 0 8px 20px rgba(15, 23, 42, 0.06);
       }
       .hero {
@@ -193,99 +92,387 @@ st.markdown(
       .small {font-size: 0.9rem; color:#6b7280;}
       div[data-testid="stMetricValue"] {font-size: 1.35rem;}
       section[data-testid="stSidebar"] {background: #fbfbfd;}
+
+      /* Tabla: evita que se “desborde” feo en móvil */
+      div[data-testid="stDataFrame"] { overflow-x: auto; }
     </style>
     """,
     unsafe_allow_html=True,
 )
 
+
+@st.cache_resource
+def get_gc():
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    scopes = [
+        "https://www.googleapis.com/auth/spreadsheets",
+        "https://www.googleapis.com/auth/drive",
+    ]
+
+    creds = Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"], scopes=scopes
+    )
+
+    return gspread.authorize(creds)
+
+
+@st.cache_resource
+def get_limitador():
+    # Compartido por todas las sesiones: la cuota de Sheets es por minuto y por cuenta de servicio
+    cfg = cfg_sheets()
+    return Limitador(
+        lecturas_por_minuto=float(cfg.get("cuota_lecturas", 60)),
+        escrituras_por_minuto=float(cfg.get("cuota_escrituras", 60)),
+        rafaga=int(cfg.get("rafaga", 10)),
+        max_reintentos=int(cfg.get("max_reintentos", 5)),
+    )
+
+
+@st.cache_resource
+def get_ws(spreadsheet_id, worksheet):
+    # Un handle por viaje (spreadsheet_id, worksheet); cada llamada pasa por el limitador
+    # y cada intento que llega a la API queda medido
+    with llamada_api("open_by_key"):
+        sh = get_gc().open_by_key(spreadsheet_id)
+    with llamada_api("worksheet"):
+        ws = sh.worksheet(worksheet)
+
+    return get_limitador().envolver(WorksheetMedida(ws))
+
+
+@st.cache_resource
+def get_ws_partes(spreadsheet_id, worksheet):
+    # Hoja de partes (layout "largo"); si no existe se crea con su header. Igual que get_ws:
+    # las llamadas de apertura quedan medidas y el handle pasa por el limitador
+    import gspread
+
+    with llamada_api("open_by_key"):
+        sh = get_gc().open_by_key(spreadsheet_id)
+    try:
+        with llamada_api("worksheet"):
+            ws = sh.worksheet(worksheet)
+        nueva = False
+    except gspread.exceptions.WorksheetNotFound:
+        with llamada_api("add_worksheet"):
+            ws = sh.add_worksheet(worksheet, rows=1000, cols=len(PARTES_COLS))
+        nueva = True
+
+    ws = get_limitador().envolver(WorksheetMedida(ws))
+    if nueva:
+        ws.update([PARTES_COLS], "A1")
+    return ws
+
+
+@st.cache_data(ttl=300)
+def leer_indice_viajes(spreadsheet_id, worksheet):
+    return get_ws(spreadsheet_id, worksheet).get_all_values()
+
+
+def backend():
+    # storage.backend = "sheets" (por defecto) o "sqlite" (archivo local, sin red)
+    return st.secrets.get("storage", {}).get("backend", "sheets")
+
+
+def layout():
+    # storage.layout = "ancho" (una columna por persona, por defecto) o "largo" (tabla de partes aparte,
+    # para grupos grandes donde cada gasto es de pocos)
+    return st.secrets.get("storage", {}).get("layout", "ancho")
+
+
+def cfg_sheets():
+    # Con el backend sqlite no hace falta la sección [sheets]
+    return st.secrets.get("sheets", {})
+
+
+def get_viajes() -> dict[str, Viaje]:
+    sheets_cfg = cfg_sheets()
+    viajes = viajes_from_config(sheets_cfg, st.secrets.get("viajes"))
+    if backend() == "sheets" and sheets_cfg.get("trip_index"):
+        indice = leer_indice_viajes(sheets_cfg["spreadsheet_id"], sheets_cfg["trip_index"])
+        viajes = parse_trip_index(indice, sheets_cfg["spreadsheet_id"]) or viajes
+    return viajes
+
+
+@st.cache_resource
+def get_snapshot_cache():
+    ttl = float(cfg_sheets().get("cache_ttl", 30))
+    incremental = cfg_sheets().get("sync", "full") == "incremental"
+    id_index_ttl = float(cfg_sheets().get("id_index_ttl", 300))
+    return SnapshotCache(
+        ttl=ttl,
+        incremental=incremental,
+        id_index_ttl=id_index_ttl,
+        value_render_option=cfg_sheets().get("value_render_option"),
+        typed=modo_tipado(),
+    )
+
+
+def modo_tipado():
+    # sheets.io = "typed": lectura UNFORMATTED_VALUE con esquema y escritura RAW
+    return cfg_sheets().get("io", "text") == "typed"
+
+
+@st.cache_resource
+def get_storage(spreadsheet_id, worksheet) -> Storage:
+    # Un backend por viaje; en sqlite cada worksheet es una tabla del mismo archivo.
+    # Con layout "largo" las columnas por persona que haya se migran a mano (ver migracion_pendiente).
+    if backend() == "sqlite":
+        path = st.secrets.get("storage", {}).get("path", "gastos.db")
+        storage = SqliteStorage(path, table=worksheet, typed=modo_tipado(), layout=layout())
+    else:
+        hoja_partes = f"{worksheet}_partes"
+        storage = SheetsStorage(
+            get_snapshot_cache(), spreadsheet_id, worksheet, lambda: get_ws(spreadsheet_id, worksheet),
+            value_input_option="RAW" if modo_tipado() else "USER_ENTERED",
+            **({"partes_worksheet": hoja_partes, "get_partes_ws": lambda: get_ws_partes(spreadsheet_id, hoja_partes)}
+               if layout() == "largo" else {}),
+        )
+    return storage
+
+
+@st.cache_data(ttl=300)
+def columnas_por_migrar(spreadsheet_id, worksheet) -> list[str]:
+    return get_storage(spreadsheet_id, worksheet).columnas_por_migrar()
+
+
+@st.cache_resource(ttl=3600)
+def get_cambios() -> TablaCambios:
+    # [cambios] path = "cambios.csv" o worksheet = "cambios" (columnas fecha, de, a, tasa)
+    cfg = st.secrets.get("cambios", {})
+    if cfg.get("worksheet"):
+        return TablaCambios.from_values(get_ws(cfg_sheets()["spreadsheet_id"], cfg["worksheet"]).get_all_values())
+    path = cfg.get("path", "cambios.csv")
+    if os.path.exists(path):
+        return TablaCambios.from_csv(path)
+    return TablaCambios()
+
+
+AVISO_CUOTA = "Google Sheets está limitando las lecturas. Probá de nuevo en unos segundos."
+AVISO_CUOTA_ESCRITURA = "Google Sheets está limitando las escrituras: no se guardó nada. Probá de nuevo en unos segundos."
+
+
+# Entradas de por_version en todo el proceso (cada una: un DataFrame convertido y lo que sale de él)
+MAX_POR_VERSION = 8
+
+
+@st.cache_resource
+def get_por_version() -> tuple[OrderedDict, threading.Lock]:
+    # Lo calculado de los datos de un viaje (tabla de cambios, rebase, Ledger y Cubo en otra base),
+    # guardado con la versión del storage: se recalcula cuando cambian los datos, no en cada llamada.
+    # LRU chico; al guardar una versión nueva de una hoja (y personas) se descartan las viejas.
+    return OrderedDict(), threading.Lock()
+
+
+def por_version(viaje: Viaje, personas, key: tuple, fn, depende=()):
+    # fn(df) una vez por versión de los datos; `depende` suma otras cosas que invalidan (ej. la tabla)
+    storage = get_storage(*viaje.hoja)
+    key = (viaje.hoja, tuple(personas)) + key
+    cache, lock = get_por_version()
+    with etapa("load"):
+        try:
+            version = storage.version(personas)
+            with lock:
+                entrada = cache.get(key)
+                if version is not None and entrada is not None and entrada[0] == (version, *depende):
+                    cache.move_to_end(key)
+                    return entrada[1]
+            # la versión antes que los datos: si cambian en el medio, la próxima llamada recalcula
+            df = storage.load(personas)
+        except CuotaAgotada:
+            st.error(AVISO_CUOTA)
+            st.stop()
+    valor = fn(df)
+    if version is None:
+        return valor
+    with lock:
+        for k in [k for k, (v, _) in cache.items() if k[:2] == key[:2] and v[0] != version]:
+            del cache[k]
+        cache[key] = ((version, *depende), valor)
+        cache.move_to_end(key)
+        while len(cache) > MAX_POR_VERSION:
+            cache.popitem(last=False)
+    return valor
+
+
+def cambios_viaje(viaje: Viaje, personas) -> TablaCambios:
+    # La tabla configurada, completada con los cambios que ya se usaron en el viaje
+    tabla = get_cambios()
+    return por_version(viaje, personas, ("cambios",), lambda df: tabla.con(observadas(df, viaje.base)),
+                       depende=(tabla,))
+
+
+def convertido(viaje: Viaje, personas, base: str, nombre: str):
+    # El DataFrame del viaje en otra base y el Ledger / Cubo armados de él, una vez por versión
+    def convertir(df):
+        with etapa("rebase"):
+            return {"df": rebase(df, personas, viaje.base, base, cambios_viaje(viaje, personas))}
+
+    derivados = por_version(viaje, personas, ("rebase", base), convertir)
+    if nombre == "ledger" and "ledger" not in derivados:
+        with etapa("balances"):
+            derivados["ledger"] = Ledger.from_df(derivados["df"], personas)
+    if nombre == "cubo" and "cubo" not in derivados:
+        with etapa("cubo"):
+            derivados["cubo"] = Cubo.from_df(derivados["df"])
+    return derivados[nombre].copy()
+
+
+def cargar_gastos(viaje: Viaje, personas, base=None):
+    # Sheets: una sola lectura de la hoja del viaje por TTL, compartida por todas las tabs.
+    # La hoja guarda todo en la base del viaje; si el sidebar pide otra, se convierte al vuelo
+    # (una vez por versión de los datos, ver convertido).
+    base = base or st.session_state.base_moneda
+    if base != viaje.base:
+        return convertido(viaje, personas, base, "df")
+    with etapa("load"):
+        try:
+            return get_storage(*viaje.hoja).load(personas)
+        except CuotaAgotada:
+            st.error(AVISO_CUOTA)
+            st.stop()
+
+
+def cargar_saldos(viaje: Viaje, personas) -> Ledger:
+    # Sheets: saldos del mismo snapshot, mantenidos incrementalmente; sqlite: sumados en SQL
+    if st.session_state.base_moneda != viaje.base:
+        return convertido(viaje, personas, st.session_state.base_moneda, "ledger")
+    with etapa("balances"):
+        return get_storage(*viaje.hoja).ledger(personas)
+
+
+def cargar_cubo(viaje: Viaje, personas) -> Cubo:
+    # Como los saldos: del snapshot (sumado incrementalmente) o agrupado en SQL; en otra base se
+    # arma del DataFrame convertido
+    if st.session_state.base_moneda != viaje.base:
+        return convertido(viaje, personas, st.session_state.base_moneda, "cubo")
+    with etapa("cubo"):
+        return get_storage(*viaje.hoja).cubo(personas)
+
+
+def editar_fila(viejo: dict, personas, fecha, concepto, pago, monto) -> dict:
+    # Fila completa para storage.update: si cambia el monto, el nuevo se reparte en la misma proporción
+    row = {k: (v.item() if hasattr(v, "item") else v) for k, v in viejo.items()}
+    monto_base = normalize_currency(monto, float(viejo["cambio_a_base"]))
+    row.update({
+        "fecha": fecha.strftime("%Y-%m-%d"),
+        "concepto": concepto.strip(),
+        "pago": pago,
+        "monto": float(monto),
+        "monto_base": monto_base,
+    })
+    partes_c = repartir(a_centavos(monto_base), [float(viejo.get(p, 0.0) or 0.0) for p in personas])
+    for p, c in zip(personas, de_centavos(partes_c)):
+        row[p] = float(c)
+    return row
+
+
+@st.cache_resource
+def get_report_cache():
+    from reportes import ReportCache
+
+    cfg = st.secrets.get("reportes", {})
+    return ReportCache(
+        max_items=int(cfg.get("max_items", 8)),
+        max_bytes=int(cfg.get("max_mb", 64)) * 1024 * 1024,
+    )
+
+
+@st.fragment(run_every=1)
+def esperar_pdf(fut):
+    # Mientras el PDF se genera en otro hilo, sólo este fragmento se refresca
+    if fut.done():
+        st.rerun()
+    st.caption("⏳ Generando PDF…")
+
+
+@st.cache_resource
+def get_outbox():
+    # Los submits se guardan en disco y un hilo los sube en lote al backend de cada viaje
+    cfg = st.secrets.get("outbox", {})
+    outbox = Outbox(cfg.get("path", "outbox.jsonl"))
+    hoja_default = next(iter(get_viajes().values())).hoja
+
+    def push(dest, rows):
+        personas_rows = sorted(set().union(*(r.keys() for r in rows)) - set(BASE_COLS))
+        get_storage(*(dest or hoja_default)).append(rows, personas_rows)
+
+    outbox.start(
+        push,
+        interval=float(cfg.get("interval", 5)),
+        max_backoff=float(cfg.get("max_backoff", 300)),
+    )
+    return outbox
+
+
 # -------------------------
 # Estado
 # -------------------------
 def init_state():
+    viajes = get_viajes()
+    if st.session_state.get("viaje") not in viajes:
+        st.session_state.viaje = next(iter(viajes))
+    viaje = viajes[st.session_state.viaje]
     if "personas" not in st.session_state:
-        st.session_state.personas = ["Quique", "Rafa", "Gus"]
+        st.session_state.personas = viaje.personas
     if "gastos" not in st.session_state:
         st.session_state.gastos = []
     if "base_moneda" not in st.session_state:
-        st.session_state.base_moneda = "ARS"
+        st.session_state.base_moneda = viaje.base
     if "pagina" not in st.session_state:
         st.session_state.pagina = "inicio"  # inicio visual
+    if "estrategia" not in st.session_state:
+        st.session_state.estrategia = "greedy"
+    if "mis_gastos" not in st.session_state:
+        st.session_state.mis_gastos = []  # (hoja, id) de lo que cargó esta sesión, para deshacer
 
-init_state()
 
-# -------------------------
-# Helpers
-# -------------------------
-def normalize_currency(monto: float, cambio_a_base: float) -> float:
-    return float(monto) * float(cambio_a_base)
-
-def compute_balances(df: pd.DataFrame, personas: list[str]) -> pd.Series:
-    if df is None or df.empty:
-        return pd.Series({p: 0.0 for p in personas})
-
-    # Asegurar columnas necesarias
-    for col in ["pago", "monto_base"]:
-        if col not in df.columns:
-            raise ValueError(f"Falta la columna '{col}' en la Sheet.")
-
-    for p in personas:
-        if p not in df.columns:
-            df[p] = 0.0
-
-    # Pagos (quién pagó cuánto total)
-    pagos = df.groupby("pago")["monto_base"].sum()
-
-    # Consumos (cuánto le corresponde a cada persona)
-    consumos = {p: float(df[p].sum()) for p in personas}
-
-    balance = {}
-    for p in personas:
-        balance[p] = float(pagos.get(p, 0.0)) - float(consumos.get(p, 0.0))
-
-    return pd.Series(balance).sort_values(ascending=False)
-    st.write("DEBUG pagos por persona:", df.groupby("pago")["monto_base"].sum().to_dict())
-    st.write("DEBUG consumos por persona:", {p: float(df[p].sum()) for p in personas})
-    st.write("DEBUG balance:", balance.to_dict() if hasattr(balance, "to_dict") else dict(balance))
-
-
-
-def settle_up(balance: pd.Series, eps=1e-6) -> pd.DataFrame:
-    creditors = []
-    debtors = []
-    for person, amt in balance.items():
-        if amt > eps:
-            creditors.append([person, amt])
-        elif amt < -eps:
-            debtors.append([person, -amt])
-
-    transfers = []
-    i = j = 0
-    while i < len(debtors) and j < len(creditors):
-        d_name, d_amt = debtors[i]
-        c_name, c_amt = creditors[j]
-        x = min(d_amt, c_amt)
-        if x > eps:
-            transfers.append({"De": d_name, "Para": c_name, "Monto": round(x, 2)})
-        debtors[i][1] -= x
-        creditors[j][1] -= x
-        if debtors[i][1] <= eps:
-            i += 1
-        if creditors[j][1] <= eps:
-            j += 1
-
-    return pd.DataFrame(transfers)
-
-def money(v: float, symbol: str) -> str:
-    s = f"{symbol}{v:,.2f}"
-    return s.replace(",", "X").replace(".", ",").replace("X", ".")
+def primera_pagina():
+    # Si cambian los filtros o el tamaño de página, el explorador vuelve a la primera
+    st.session_state.pagina_gastos = 1
+
+
+def cambiar_viaje():
+    # Al cambiar de viaje se toman sus personas y su moneda base
+    viaje = get_viajes()[st.session_state.viaje]
+    st.session_state.personas = viaje.personas
+    st.session_state.base_moneda = viaje.base
+
+
+SIMBOLOS = {"ARS": "$", "USD": "US$", "EUR": "€"}
 
 
+def simbolo_de(moneda: str) -> str:
+    return SIMBOLOS.get(moneda, f"{moneda} ")
+
+
+def monedas_base() -> list[str]:
+    # Las de siempre, las bases de los viajes (ej. BRL) y las de la tabla de cambios
+    monedas = list(SIMBOLOS) + [v.base for v in get_viajes().values()] + get_cambios().monedas
+    monedas.append(st.session_state.base_moneda)
+    return list(dict.fromkeys(monedas))
+
+
+init_state()
+
 # -------------------------
 # Sidebar
 # -------------------------
 with st.sidebar:
     st.markdown("## ⚙️ Configuración")
 
+    viajes = get_viajes()
+    if len(viajes) > 1:
+        st.selectbox(
+            "Viaje",
+            list(viajes),
+            format_func=lambda v: viajes[v].titulo,
+            key="viaje",
+            on_change=cambiar_viaje,
+        )
+    viaje = viajes[st.session_state.viaje]
+
     personas_txt = st.text_area(
         "Personas (una por línea)",
         "\n".join(st.session_state.personas),
@@ -296,10 +483,24 @@ with st.sidebar:
         st.session_state.personas = personas
     personas = st.session_state.personas
 
-    st.session_state.base_moneda = st.selectbox("Moneda base", ["ARS", "USD", "EUR"],
-                                                index=["ARS", "USD", "EUR"].index(st.session_state.base_moneda))
+    monedas = monedas_base()
+    st.session_state.base_moneda = st.selectbox("Moneda base", monedas,
+                                                index=monedas.index(st.session_state.base_moneda))
     base = st.session_state.base_moneda
-    simbolo = {"ARS": "$", "USD": "US$", "EUR": "€"}[base]
+    if base != viaje.base:
+        tabla = cambios_viaje(viaje, personas)
+        if tabla.tasa(viaje.base, base) is None:
+            st.warning(f"No hay cotización {viaje.base} → {base}: se muestra en {viaje.base}.")
+            st.session_state.base_moneda = base = viaje.base
+    simbolo = simbolo_de(base)
+
+    estrategias = {"greedy": "Simple (rápido)", "min": "Mínimas transferencias"}
+    st.session_state.estrategia = st.selectbox(
+        "Transferencias",
+        list(estrategias),
+        format_func=estrategias.get,
+        index=list(estrategias).index(st.session_state.estrategia),
+    )
 
     st.markdown("---")
     if st.button("🏠 Volver a inicio", use_container_width=True):
@@ -308,267 +509,6 @@ with st.sidebar:
 
  
 
-def generar_pdf(df, balance, base_moneda):
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
-    from reportlab.lib import colors
-    from reportlab.lib.styles import ParagraphStyle
-    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-    from reportlab.pdfbase import pdfmetrics
-
-    file_path = "resumen_viaje.pdf"
-    doc = SimpleDocTemplate(file_path)
-
-    elements = []
-
-    # Fuente compatible UTF-8
-    pdfmetrics.registerFont(UnicodeCIDFont('HYSMyeongJo-Medium'))
-
-    style = ParagraphStyle(
-        name='Normal',
-        fontName='HYSMyeongJo-Medium',
-        fontSize=12,
-    )
-
-    elements.append(Paragraph("Resumen de Gastos de Viaje", style))
-    elements.append(Spacer(1, 0.3 * inch))
-
-    # Tabla gastos
-    data = [["Fecha", "Concepto", "Pagó", "Monto Base"]]
-    for _, row in df.iterrows():
-        data.append([
-            row["fecha"],
-            row["concepto"],
-            row["pago"],
-            f"{row['monto_base']:.2f} {base_moneda}"
-        ])
-
-    table = Table(data)
-    elements.append(table)
-    elements.append(Spacer(1, 0.5 * inch))
-
-    # Tabla balances
-    data_balance = [["Persona", "Balance"]]
-    for persona, valor in balance.items():
-        data_balance.append([persona, f"{valor:.2f} {base_moneda}"])
-
-    table2 = Table(data_balance)
-    elements.append(table2)
-
-    doc.build(elements)
-
-    return file_path
-
-from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import cm
-import tempfile
-import pandas as pd
-
-def generar_pdf_ejecutivo(df: pd.DataFrame, personas: list[str], simbolo="$", titulo="Viaje NYC – Amsterdam 2026"):
-    styles = getSampleStyleSheet()
-
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    file_path = tmp.name
-    tmp.close()
-
-    doc = SimpleDocTemplate(
-        file_path,
-        pagesize=A4,
-        rightMargin=1.2*cm,
-        leftMargin=1.2*cm,
-        topMargin=1.2*cm,
-        bottomMargin=1.2*cm
-    )
-
-    def fmt_money(x):
-        try:
-            return f"{simbolo}{float(x):,.2f}"
-        except:
-            return f"{simbolo}0.00"
-
-    elements = []
-
-    # ===== ENCABEZADO EJECUTIVO (SIN PORTADA) =====
-    elements.append(Paragraph(f"{titulo} — Informe Ejecutivo", styles["Title"]))
-    elements.append(Spacer(1, 6))
-    elements.append(Paragraph(f"Participantes: {', '.join(personas)}", styles["Normal"]))
-    elements.append(Paragraph(f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles["Normal"]))
-    elements.append(Spacer(1, 12))
-
-    # ===== RESUMEN =====
-    elements.append(Paragraph("Resumen", styles["Heading1"]))
-    elements.append(Spacer(1, 6))
-
-    total_base = float(pd.to_numeric(df.get("monto_base", 0), errors="coerce").fillna(0.0).sum())
-    por_persona = total_base / len(personas) if personas else 0.0
-
-    resumen_tbl = Table([
-        ["Total (base)", fmt_money(total_base)],
-        ["Por persona (base)", fmt_money(por_persona)],
-        ["Cantidad de gastos", str(len(df))]
-    ], colWidths=[7*cm, 7*cm])
-    resumen_tbl.setStyle(TableStyle([
-        ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
-        ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
-        ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
-        ("FONTSIZE", (0,0), (-1,-1), 10),
-        ("PADDING", (0,0), (-1,-1), 6),
-    ]))
-    elements.append(resumen_tbl)
-    elements.append(Spacer(1, 14))
-
-    # ===== PAGÓ / CONSUMIÓ / BALANCE =====
-    elements.append(Paragraph("Pagó, consumió y balance", styles["Heading2"]))
-    elements.append(Spacer(1, 6))
-
-    if "pago" in df.columns and "monto_base" in df.columns:
-        pagos = df.groupby("pago")["monto_base"].sum()
-    else:
-        pagos = pd.Series(dtype=float)
-
-    consumos = {p: float(pd.to_numeric(df.get(p, 0), errors="coerce").fillna(0.0).sum()) for p in personas}
-    balance = {p: float(pagos.get(p, 0.0)) - float(consumos.get(p, 0.0)) for p in personas}
-
-    pcb_rows = [["Persona", "Pagó", "Consumió", "Balance"]]
-    for p in personas:
-        pcb_rows.append([p, fmt_money(pagos.get(p, 0.0)), fmt_money(consumos.get(p, 0.0)), fmt_money(balance.get(p, 0.0))])
-
-    pcb_tbl = Table(pcb_rows, repeatRows=1, colWidths=[4*cm, 4*cm, 4*cm, 4*cm])
-    pcb_tbl.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("FONTSIZE", (0,0), (-1,0), 9),
-        ("FONTSIZE", (0,1), (-1,-1), 9),
-        ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
-        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.white]),
-        ("PADDING", (0,0), (-1,-1), 4),
-    ]))
-    elements.append(pcb_tbl)
-    elements.append(Spacer(1, 14))
-
-    # ===== TRANSFERENCIAS =====
-    elements.append(Paragraph("Quién le transfiere a quién", styles["Heading2"]))
-    elements.append(Spacer(1, 6))
-
-    try:
-        balance_series = pd.Series(balance).sort_values(ascending=False)
-        tx = settle_up(balance_series)  # debe devolver DataFrame
-    except Exception:
-        tx = pd.DataFrame()
-
-    if tx is None or tx.empty:
-        elements.append(Paragraph("No hay transferencias pendientes.", styles["Normal"]))
-    else:
-        tx_show = tx.copy()
-        if "Monto" in tx_show.columns:
-            tx_show["Monto"] = tx_show["Monto"].apply(fmt_money)
-
-        tx_rows = [list(tx_show.columns)] + tx_show.astype(str).values.tolist()
-        tx_tbl = Table(tx_rows, repeatRows=1)
-        tx_tbl.setStyle(TableStyle([
-            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-            ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-            ("FONTSIZE", (0,0), (-1,0), 9),
-            ("FONTSIZE", (0,1), (-1,-1), 9),
-            ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
-            ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.white]),
-            ("PADDING", (0,0), (-1,-1), 4),
-        ]))
-        elements.append(tx_tbl)
-
-    # ===== DETALLE (nueva página) =====
-    elements.append(PageBreak())
-    elements.append(Paragraph("Detalle de gastos", styles["Heading1"]))
-    elements.append(Spacer(1, 8))
-
-    cols = ["fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"] + personas
-    cols = [c for c in cols if c in df.columns]
-
-    detalle = df[cols].copy()
-    for c in ["monto", "cambio_a_base", "monto_base"] + [p for p in personas if p in detalle.columns]:
-        detalle[c] = pd.to_numeric(detalle[c], errors="coerce").fillna(0.0).round(2)
-
-    data = [cols] + detalle.astype(str).values.tolist()
-
-    det_tbl = Table(data, repeatRows=1)
-    det_tbl.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("FONTSIZE", (0,0), (-1,0), 8),
-        ("FONTSIZE", (0,1), (-1,-1), 7),
-        ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
-        ("VALIGN", (0,0), (-1,-1), "TOP"),
-        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.white]),
-        ("PADDING", (0,0), (-1,-1), 3),
-    ]))
-    elements.append(det_tbl)
-
-    doc.build(elements)
-    return file_path
-
-
-def generar_pdf_gastos(df: pd.DataFrame, personas: list[str], titulo="📋 Gastos cargados"):
-    styles = getSampleStyleSheet()
-
-    # Archivo temporal
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    file_path = tmp.name
-    tmp.close()
-
-    doc = SimpleDocTemplate(
-        file_path,
-        pagesize=A4,
-        rightMargin=1.2*cm,
-        leftMargin=1.2*cm,
-        topMargin=1.2*cm,
-        bottomMargin=1.2*cm
-    )
-
-    elements = []
-    elements.append(Paragraph(titulo, styles["Title"]))
-    elements.append(Spacer(1, 10))
-
-    # Columnas a mostrar
-    cols = ["fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"] + personas
-    cols = [c for c in cols if c in df.columns]
-
-    show = df[cols].copy()
-
-    # Redondeos
-    for c in ["monto", "cambio_a_base", "monto_base"] + [p for p in personas if p in show.columns]:
-        if c in show.columns:
-            show[c] = pd.to_numeric(show[c], errors="coerce").fillna(0.0).round(2)
-
-    # Convertir a strings (para PDF)
-    data = [cols] + show.astype(str).values.tolist()
-
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.black),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("FONTSIZE", (0,0), (-1,0), 9),
-        ("FONTSIZE", (0,1), (-1,-1), 8),
-        ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
-        ("VALIGN", (0,0), (-1,-1), "TOP"),
-        ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.white]),
-    ]))
-
-    elements.append(table)
-    elements.append(Spacer(1, 10))
-
-    # Totales (opcional)
-    if "monto_base" in df.columns:
-        total_base = float(pd.to_numeric(df["monto_base"], errors="coerce").fillna(0.0).sum())
-        elements.append(Paragraph(f"<b>Total (base):</b> {total_base:,.2f}", styles["Normal"]))
-
-    doc.build(elements)
-    return file_path
-
-
 # -------------------------
 # Portada / Inicio
 # -------------------------
@@ -580,7 +520,7 @@ if st.session_state.pagina == "inicio":
           <div class="pill">💱 Multi-moneda</div>
           <div class="pill">💳 Saldos y transferencias</div>
           <div class="pill">⬇️ Exportar CSV</div>
-          <h1 style="margin-top:14px;">🌎 Viaje NYC – Amsterdam 2026</h1>
+          <h1 style="margin-top:14px;">🌎 {viaje.titulo}</h1>
           <h3 style="margin-top:6px;">💸 Control de Gastos</h3>
           <p class="muted" style="margin-top:6px;">
             Cargá los gastos durante el viaje y obtené automáticamente quién le transfiere a quién.
@@ -609,15 +549,40 @@ st.title("💸 Gastos de Viaje")
 st.caption("Cargá gastos, dividí y saldá fácil. (Versión clara)")
 
 base = st.session_state.base_moneda
-simbolo = {"ARS": "$", "USD": "US$", "EUR": "€"}[base]
+simbolo = simbolo_de(base)
 personas = st.session_state.personas
 
-tab1, tab2, tab3 = st.tabs(["➕ Cargar", "📋 Gastos", "🧾 Saldos"])
+# -------------------------
+# Migración a layout "largo"
+# -------------------------
+# Borra columnas de la hoja compartida: nunca automática, siempre con confirmación.
+if layout() == "largo" and (pendientes := columnas_por_migrar(*viaje.hoja)):
+    with st.container(border=True):
+        st.warning(
+            f"La hoja todavía tiene una columna por persona ({', '.join(pendientes)}). Con layout \"largo\" "
+            "las partes se leen de la hoja de partes: hasta migrar, los saldos no las cuentan. "
+            "Migrar pasa esas columnas a la hoja de partes y las **borra** de la hoja de gastos."
+        )
+        confirmado = st.checkbox("Entiendo que se borran esas columnas de la Sheet", key="confirmar_migracion")
+        if st.button("🔀 Migrar a partes", disabled=not confirmado):
+            try:
+                n = get_storage(*viaje.hoja).migrar_a_largo(personas)
+            except ValueError as e:
+                st.error(str(e))
+            except CuotaAgotada:
+                st.error("Google Sheets está limitando las escrituras: se cortó la migración. "
+                         "Probá de nuevo en unos segundos; volver a migrar no duplica partes.")
+            else:
+                columnas_por_migrar.clear()
+                st.success(f"{n} parte(s) migradas.")
+                st.rerun()
+
+tab1, tab2, tab3, tab4 = st.tabs(["➕ Cargar", "📋 Gastos", "🧾 Saldos", "📈 Análisis"])
 
 # =========================
 # TAB 1 - CARGAR GASTO
 # =========================
-with tab1:
+with tab1, etapa("render"):
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("➕ Cargar gasto")
 
@@ -636,10 +601,11 @@ with tab1:
         with c3:
             moneda = st.selectbox("Moneda", [base, "USD", "EUR", "ARS"], index=0)
         with c4:
+            # Los gastos se guardan en la base del viaje; con 0 se toma de la tabla de cambios
             cambio = st.number_input(
-                f"Cambio a {base}",
+                f"Cambio a {viaje.base} (0 = automático)",
                 min_value=0.0,
-                value=1.0 if moneda == base else 1000.0,
+                value=1.0 if moneda == viaje.base else 0.0,
                 step=0.1,
             )
 
@@ -657,10 +623,15 @@ with tab1:
         submitted = st.form_submit_button("✅ Agregar gasto")
 
     if submitted:
+        if cambio == 0:
+            tabla = cambios_viaje(viaje, personas)
+            cambio = tabla.tasa(moneda, viaje.base, fecha) or 0.0
         if not concepto.strip():
             st.error("Poné un concepto.")
         elif monto <= 0:
             st.error("El monto debe ser mayor a 0.")
+        elif cambio <= 0:
+            st.error(f"No hay cotización {moneda} → {viaje.base} para esa fecha: ingresá el cambio.")
         else:
             monto_base = normalize_currency(monto, cambio)
 
@@ -675,13 +646,89 @@ with tab1:
                 "monto_base": float(monto_base),
             }
 
-            for p in personas:
-                row[p] = round(float(normalize_currency(partes.get(p, 0.0), cambio)), 2)
-
-            append_gasto_to_sheet(row, personas)
-
-            st.success("Gasto agregado.")
-            st.rerun()
+            # En centavos: igual por mayor resto, personalizada cuadrada con el monto si difiere por
+            # redondeo; así las partes suman exactamente monto_base
+            base_c = a_centavos(monto_base)
+            if modo == "Igual":
+                partes_c = repartir(base_c, [1.0] * len(personas))
+            else:
+                partes_c = cuadrar_partes(
+                    base_c.reshape(1), a_centavos([[partes.get(p, 0.0) * cambio for p in personas]])
+                )[0]
+
+            # Sólo las partes distintas de cero (en layout "largo" cada una es una fila)
+            for p, c in zip(personas, partes_c):
+                if c:
+                    row[p] = float(de_centavos(c))
+
+            # Antes de encolar: si a la Sheet le falta la columna de alguien (ej. una persona recién
+            # agregada en el sidebar), el outbox no podría subir esta fila nunca
+            try:
+                faltan = get_storage(*viaje.hoja).columnas_faltantes([p for p in personas if p in row])
+            except CuotaAgotada:
+                faltan = []  # sin cuota para chequear: el outbox reintenta y, si falta algo, lo pone en cuarentena
+            if faltan:
+                st.error(f"Faltan columnas en la Sheet (fila 1): {faltan}. Agregalas y volvé a cargar el gasto.")
+            else:
+                get_outbox().add(row, dest=viaje.hoja)
+                st.session_state.mis_gastos.append((viaje.hoja, row["id"]))
+
+                st.success("Gasto agregado.")
+                st.rerun()
+
+    with st.expander("📥 Importar CSV / XLSX"):
+        st.caption(
+            "Columnas: fecha, concepto, monto y opcionalmente pago, moneda, cambio_a_base y una por persona "
+            "(división personalizada). También entiende exportaciones del banco (Fecha; Descripción; Importe)."
+        )
+        archivo = st.file_uploader("Archivo", type=["csv", "xlsx"], key="import_archivo")
+        i1, i2 = st.columns(2)
+        with i1:
+            import_pago = st.selectbox("Pagó (si el archivo no lo dice)", personas, key="import_pago")
+        with i2:
+            import_moneda = st.selectbox("Moneda (si el archivo no la dice)", [viaje.base, "USD", "EUR", "ARS"],
+                                         key="import_moneda")
+        st.download_button("Descargar plantilla", plantilla_csv(personas), file_name="plantilla_gastos.csv",
+                           mime="text/csv")
+
+        if archivo is not None and st.button("📥 Importar", use_container_width=True):
+            estado = st.empty()
+            try:
+                r = importar_gastos(
+                    archivo, archivo.name, get_storage(*viaje.hoja), personas, viaje.base, import_pago,
+                    import_moneda, tabla=cambios_viaje(viaje, personas),
+                    progreso=lambda n: estado.caption(f"⏳ {n} filas leídas…"),
+                )
+            except ValueError as e:
+                st.error(str(e))
+            except CuotaAgotada:
+                estado.empty()
+                # los bloques ya escritos tienen ids deterministas: reimportar no los duplica
+                st.error("Google Sheets está limitando las escrituras: se cortó la importación. "
+                         "Probá de nuevo en unos segundos; lo que ya entró no se duplica.")
+            else:
+                estado.empty()
+                st.success(f"{r['importadas']} gasto(s) importados, {r['duplicadas']} ya estaban.")
+                if r["errores"]:
+                    st.warning(f"{len(r['errores'])} fila(s) con errores:\n\n" + "\n".join(r["errores"][:20]))
+
+    outbox = get_outbox()
+    if len(outbox):
+        st.caption(f"⏳ {len(outbox)} gasto(s) pendientes de sincronizar con la Sheet.")
+        if outbox.last_error:
+            st.caption(f"Último error: {outbox.last_error}")
+    for row, error in outbox.fallidos():
+        # En cuarentena: no se reintentan solos y no traban a los demás
+        st.error(f"No se pudo subir «{row.get('concepto', '')}» del {row.get('fecha', '')}: {error}")
+        f1, f2 = st.columns(2)
+        with f1:
+            if st.button("🔁 Reintentar", key=f"reintentar_{row['id']}", use_container_width=True):
+                outbox.reintentar(row["id"])
+                st.rerun()
+        with f2:
+            if st.button("🗑️ Descartar", key=f"descartar_{row['id']}", use_container_width=True):
+                outbox.descartar(row["id"])
+                st.rerun()
 
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -689,43 +736,160 @@ with tab1:
 # =========================
 # TAB 2 - GASTOS
 # =========================
-with tab2:
+with tab2, etapa("render"):
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("📋 Gastos")
 
-    df = load_gastos_from_sheet(personas)
+    df = cargar_gastos(viaje, personas)
 
     if df.empty:
         st.info("Todavía no cargaste gastos.")
     else:
-        resumen_cols = [c for c in ["fecha", "concepto", "pago", "monto_base"] if c in df.columns]
-        st.dataframe(df[resumen_cols], use_container_width=True, hide_index=True)
-
-        with st.expander("Ver detalle completo"):
-            cols = ["fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"] + personas
-            cols = [c for c in cols if c in df.columns]
-            st.dataframe(df[cols], use_container_width=True, hide_index=True)
+        # Sólo la página visible viaja al navegador. Filtros y orden salen de los índices del snapshot.
+        indice = get_storage(*viaje.hoja).indice(personas)
+        if indice.n != len(df):
+            indice = IndiceGastos(df)  # el snapshot se renovó entre las dos lecturas
+        rango = indice.rango_fechas()
+
+        f1, f2, f3, f4, f5 = st.columns([1, 1, 1, 1, 2])
+        with f1:
+            desde = st.date_input("Desde", value=None, min_value=rango[0] if rango else None,
+                                  key="filtro_desde", on_change=primera_pagina)
+        with f2:
+            hasta = st.date_input("Hasta", value=None, max_value=rango[1] if rango else None,
+                                  key="filtro_hasta", on_change=primera_pagina)
+        with f3:
+            pagos = st.multiselect("Pagó", sorted(set(personas) | set(indice.categorias["pago"]) - {""}),
+                                   key="filtro_pago", on_change=primera_pagina)
+        with f4:
+            monedas = st.multiselect("Moneda", sorted(set(indice.categorias["moneda"]) - {""}),
+                                     key="filtro_moneda", on_change=primera_pagina)
+        with f5:
+            buscar = st.text_input("Buscar concepto", key="filtro_texto", on_change=primera_pagina)
+
+        por_pagina = st.session_state.get("por_pagina_gastos", 50)
+        pagina = st.session_state.get("pagina_gastos", 1)
+        filtros = dict(desde=desde, hasta=hasta, pagos=pagos, monedas=monedas, texto=buscar)
+        pos, total = indice.consulta(**filtros, pagina=pagina, por_pagina=por_pagina)
+        n_paginas = max(1, -(-total // por_pagina))
+        if pagina > n_paginas:
+            pagina = st.session_state.pagina_gastos = n_paginas
+            pos, total = indice.consulta(**filtros, pagina=pagina, por_pagina=por_pagina)
+
+        detalle = st.toggle("Ver detalle completo", key="detalle_gastos")
+        cols = ["fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"] + personas \
+            if detalle else ["fecha", "concepto", "pago", "monto_base"]
+        cols = [c for c in cols if c in df.columns]
+        if len(pos):
+            st.dataframe(df.iloc[pos][cols], use_container_width=True, hide_index=True)
+        else:
+            st.info("Ningún gasto cumple los filtros.")
+
+        p1, p2, p3 = st.columns([1, 1, 2])
+        with p1:
+            st.number_input("Página", min_value=1, max_value=n_paginas, step=1, key="pagina_gastos")
+        with p2:
+            st.selectbox("Por página", [25, 50, 100], index=1, key="por_pagina_gastos", on_change=primera_pagina)
+        with p3:
+            inicio = (pagina - 1) * por_pagina
+            st.caption(f"{inicio + 1 if total else 0}–{inicio + len(pos)} de {total} gasto(s) · página {pagina} de {n_paginas}")
+
+        if "id" in df.columns and len(pos):
+            with st.expander("✏️ Editar o borrar un gasto"):
+                # Se edita la fila tal como está guardada (en la base del viaje); se elige entre los de la página
+                crudo = cargar_gastos(viaje, personas, base=viaje.base).iloc[pos]
+                ids = crudo["id"].astype(str).tolist()
+                fila = {i: r for i, r in zip(ids, crudo.to_dict("records"))}
+                sel = st.selectbox(
+                    "Gasto", ids,
+                    format_func=lambda i: f"{str(fila[i]['fecha'])[:10]} · {fila[i]['concepto']} · {fila[i]['monto']:,.2f}",
+                )
+                viejo = fila[sel]
+                try:
+                    fecha_vieja = date.fromisoformat(str(viejo["fecha"])[:10])
+                except ValueError:
+                    fecha_vieja = date.today()
+
+                with st.form("form_editar"):
+                    fecha_e = st.date_input("Fecha", value=fecha_vieja, key=f"editar_fecha_{sel}")
+                    concepto_e = st.text_input("Concepto", value=str(viejo["concepto"]), key=f"editar_concepto_{sel}")
+                    pago_e = st.selectbox("Pagó", personas, key=f"editar_pago_{sel}",
+                                          index=personas.index(viejo["pago"]) if viejo["pago"] in personas else 0)
+                    monto_e = st.number_input("Monto", min_value=0.0, value=float(viejo["monto"]), step=1.0,
+                                              key=f"editar_monto_{sel}")
+                    e1, e2 = st.columns(2)
+                    with e1:
+                        guardar = st.form_submit_button("💾 Guardar cambios")
+                    with e2:
+                        borrar = st.form_submit_button("🗑️ Borrar gasto")
+
+                try:
+                    if guardar:
+                        row = editar_fila(viejo, personas, fecha_e, concepto_e, pago_e, monto_e)
+                        if get_storage(*viaje.hoja).update(sel, row, personas):
+                            st.rerun()
+                        st.warning("Ese gasto ya no está en la Sheet.")
+                    if borrar:
+                        if get_storage(*viaje.hoja).delete(sel):
+                            st.rerun()
+                        st.warning("Ese gasto ya no está en la Sheet.")
+                except CuotaAgotada:
+                    st.error(AVISO_CUOTA_ESCRITURA)
 
         b1, b2 = st.columns(2)
 
         with b1:
-            if st.button("↩️ Borrar último", use_container_width=True):
-                ws = get_ws()
-                last_row = len(ws.get_all_values())
-                if last_row > 1:
-                    ws.delete_rows(last_row)
-                    st.rerun()
+            # Deshace lo último que cargó esta sesión (no la última fila de la hoja, que puede ser de otro)
+            mios = [g for g in st.session_state.mis_gastos if tuple(g[0]) == viaje.hoja]
+            if st.button("↩️ Deshacer mi último", use_container_width=True, disabled=not mios):
+                _, id_ = mios[-1]
+                try:
+                    hecho = get_outbox().cancel(id_) or get_storage(*viaje.hoja).delete(id_)
+                except CuotaAgotada:
+                    st.error(AVISO_CUOTA_ESCRITURA)  # sigue en mis_gastos: se puede volver a deshacer
+                else:
+                    st.session_state.mis_gastos.remove(mios[-1])
+                    if hecho:
+                        st.rerun()
+                    st.warning("Ese gasto ya no está en la Sheet.")
 
         with b2:
             if st.button("✨ PDF Ejecutivo", use_container_width=True):
-                pdf_path = generar_pdf_ejecutivo(df, personas, simbolo=simbolo, titulo="Viaje NYC – Amsterdam 2026")
-                with open(pdf_path, "rb") as f:
+                st.session_state.pdf_key, _ = get_report_cache().submit(
+                    "ejecutivo", df, personas, simbolo=simbolo, titulo=viaje.titulo,
+                    ledger=cargar_saldos(viaje, personas), estrategia=st.session_state.estrategia,
+                    cubo=cargar_cubo(viaje, personas),
+                )
+
+            fut = get_report_cache().get(st.session_state.pdf_key) if "pdf_key" in st.session_state else None
+            if fut is not None and not fut.done():
+                esperar_pdf(fut)
+            elif fut is not None and fut.exception() is None:
+                st.download_button(
+                    "⬇️ Descargar PDF",
+                    data=fut.result(),
+                    file_name="informe_viaje_ejecutivo.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+            elif fut is not None:
+                st.error(f"No se pudo generar el PDF: {fut.exception()}")
+
+        with st.expander("⬇️ Exportar"):
+            # Del snapshot en memoria; cada archivo se arma recién al hacer click
+            formato = st.radio("Formato", list(FORMATOS), horizontal=True, key="export_formato")
+            escribir, ext, mime = FORMATOS[formato]
+            ledger_export = cargar_saldos(viaje, personas)
+            estrategia = st.session_state.estrategia
+            for col, (nombre, etiqueta) in zip(st.columns(len(TABLAS)), TABLAS.items()):
+                with col:
                     st.download_button(
-                        "⬇️ Descargar PDF",
-                        data=f,
-                        file_name="informe_viaje_ejecutivo.pdf",
-                        mime="application/pdf",
-                        use_container_width=True
+                        etiqueta,
+                        data=lambda n=nombre: escribir(tabla_export(n, df, personas, ledger_export, estrategia)),
+                        file_name=f"{viaje.id}_{nombre}.{ext}",
+                        mime=mime,
+                        key=f"export_{nombre}",
+                        use_container_width=True,
                     )
 
     st.markdown("</div>", unsafe_allow_html=True)
@@ -734,20 +898,20 @@ with tab2:
 # =========================
 # TAB 3 - SALDOS
 # =========================
-with tab3:
+with tab3, etapa("render"):
     st.markdown('<div class="card">', unsafe_allow_html=True)
     st.subheader("🧾 Saldos y transferencias")
 
-    df = load_gastos_from_sheet(personas)
+    ledger = cargar_saldos(viaje, personas)
 
-    if not df.empty:
-        total_base = df["monto_base"].sum()
+    if ledger.n:
+        total_base = ledger.total
         por_persona = total_base / len(personas)
 
         st.metric("Total", f"{simbolo}{total_base:,.2f}")
         st.metric("Por persona", f"{simbolo}{por_persona:,.2f}")
 
-        balance = compute_balances(df, personas)
+        balance = ledger.balance()
         bal_df = balance.reset_index()
         bal_df.columns = ["Persona", "Balance"]
 
@@ -756,15 +920,110 @@ with tab3:
 
         st.subheader("💳 Quién le transfiere a quién")
 
-        tx = settle_up(balance)
-        if tx.empty:
+        if ledger.saldado():
             st.success("Todo saldado ✅")
         else:
-            tx_show = tx.copy()
-            tx_show["Monto"] = tx_show["Monto"].apply(lambda x: f"{simbolo}{x:,.2f}")
-            st.dataframe(tx_show, use_container_width=True, hide_index=True)
+            with etapa("settle"):
+                tx = settle(balance, st.session_state.estrategia)
+            if tx.empty:
+                # los saldos no suman cero: nada que sugerir (antes salía como saldado)
+                st.warning("Los saldos no suman cero (hay gastos con partes que no llegan al monto).")
+            else:
+                tx_show = tx.copy()
+                tx_show["Monto"] = tx_show["Monto"].apply(lambda x: f"{simbolo}{x:,.2f}")
+                st.dataframe(tx_show, use_container_width=True, hide_index=True)
 
     else:
         st.info("Cargá gastos para ver los saldos.")
 
     st.markdown("</div>", unsafe_allow_html=True)
+
+
+# =========================
+# TAB 4 - ANÁLISIS
+# =========================
+with tab4, etapa("render"):
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.subheader("📈 Análisis")
+
+    cubo = cargar_cubo(viaje, personas)
+
+    if cubo.n:
+        r = cubo.ritmo()
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Promedio por día", f"{simbolo}{r['promedio']:,.2f}")
+        m2.metric("Días", r["dias"])
+        if r["dia_pico"] is not None:
+            m3.metric("Día pico", f"{simbolo}{r['pico']:,.2f}", r["dia_pico"].strftime("%d/%m"), delta_color="off")
+
+        por_dia = cubo.por_dia()
+        if len(por_dia):
+            st.markdown("**Gasto acumulado**")
+            st.line_chart(cubo.acumulado().rename("Acumulado"))
+            st.markdown("**Gasto por día, según quién pagó**")
+            st.bar_chart(cubo.por_pago_dia())
+        else:
+            st.caption("Los gastos no tienen fecha: no hay gráficos por día.")
+
+        st.markdown("**Mezcla de monedas**")
+        monedas = cubo.monedas()
+        st.bar_chart(monedas.set_index("Moneda")["En base"])
+        st.dataframe(
+            monedas,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Monto": st.column_config.NumberColumn(format="%.2f"),
+                "En base": st.column_config.NumberColumn(f"En {base}", format="%.2f"),
+                "%": st.column_config.NumberColumn(format="%.1f%%"),
+            },
+        )
+    else:
+        st.info("Cargá gastos para ver el análisis.")
+
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+# -------------------------
+# Debug
+# -------------------------
+def debug_activo():
+    return bool(st.secrets.get("debug", {}).get("panel", False)) or st.query_params.get("debug") == "1"
+
+
+evento = st.session_state.corrida.terminar()
+if debug_activo():
+    with st.expander("🔧 Debug"):
+        llamadas = sum(a["llamadas"] for a in evento["api"].values())
+        st.caption(
+            f"Este rerun: {evento['ms']:,.0f} ms · {llamadas} llamada(s) a la API · "
+            f"últimos 60 s (todas las sesiones): {METRICAS.por_minuto()} llamada(s)"
+        )
+        if backend() == "sheets":
+            lim = get_limitador().resumen()
+            st.caption(
+                f"Limitador: {lim['reintentos']} reintento(s), {lim['compartidas']} lectura(s) compartida(s), "
+                f"{lim['espera_s']} s esperando cuota"
+            )
+        st.dataframe(
+            [{"Etapa": k, "ms": v["ms"], "ms propios": v["propio_ms"], "Veces": v["veces"]}
+             for k, v in evento["etapas"].items()],
+            use_container_width=True, hide_index=True,
+        )
+        if evento["api"]:
+            st.dataframe(
+                [{"Llamada": k, **v} for k, v in evento["api"].items()],
+                use_container_width=True, hide_index=True,
+            )
+
+        st.markdown("**Acumulado del proceso**")
+        acumulado = METRICAS.resumen()
+        st.dataframe(
+            [{"Llamada": k, **v, "errores": ", ".join(f"{e}: {n}" for e, n in v["errores"].items())}
+             for k, v in acumulado["api"].items()],
+            use_container_width=True, hide_index=True,
+        )
+        st.dataframe(
+            [{"Etapa": k, **v} for k, v in acumulado["etapas"].items()],
+            use_container_width=True, hide_index=True,
+        )
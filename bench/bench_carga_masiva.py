@@ -0,0 +1,75 @@
+# Importación masiva de un resumen de tarjeta (CSV con ; y formato local) contra una hoja en memoria:
+# tiempo, llamadas a la API por bloque y reimportación sin duplicados.
+# Como referencia, cuántas llamadas costaba cargar fila por fila con append_gasto_to_sheet.
+#
+#   python bench/bench_carga_masiva.py [filas] [chunk]
+
+import io
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "bench"))
+
+from cambios import TablaCambios  # noqa: E402
+from fake_sheet import FakeWorksheet  # noqa: E402
+from importar import importar_gastos  # noqa: E402
+from sheets import BASE_COLS, SnapshotCache, append_gasto_to_sheet  # noqa: E402
+from storage import SheetsStorage  # noqa: E402
+
+PERSONAS = ["Quique", "Rafa", "Gus"]
+
+
+def resumen_tarjeta(n: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    lineas = ["Fecha;Descripción;Importe;Moneda"]
+    for i in range(n):
+        dia = 1 + i * 28 // max(n, 1)
+        monto = f"{rng.uniform(1, 900):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        moneda = rng.choice(["ARS", "ARS", "USD", "EUR"])
+        lineas.append(f"{dia:02d}/03/2026;{rng.choice(['UBER', 'CAFE', 'MUSEO', 'SUPER'])} {i};-{monto};{moneda}")
+    return ("\n".join(lineas) + "\n").encode("utf-8")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    chunk = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    tabla = TablaCambios.from_values([
+        ["fecha", "de", "a", "tasa"],
+        ["2026-03-01", "USD", "ARS", "1100"],
+        ["2026-03-01", "EUR", "USD", "1,08"],
+    ])
+    archivo = resumen_tarjeta(n)
+
+    ws = FakeWorksheet([BASE_COLS + PERSONAS])
+    storage = SheetsStorage(SnapshotCache(), "demo", "gastos", lambda: ws)
+
+    t = time.perf_counter()
+    r = importar_gastos(io.BytesIO(archivo), "tarjeta.csv", storage, PERSONAS, "ARS", "Quique", "ARS",
+                        tabla=tabla, chunk=chunk)
+    dt = time.perf_counter() - t
+    print(f"{n} filas en {dt:.2f}s ({n / dt:,.0f} filas/s): importadas {r['importadas']}, "
+          f"errores {len(r['errores'])}, llamadas {dict(Counter(ws.calls))}")
+    assert r["importadas"] == n and len(ws.values) == n + 1
+
+    ws.calls.clear()
+    r = importar_gastos(io.BytesIO(archivo), "tarjeta.csv", storage, PERSONAS, "ARS", "Quique", "ARS",
+                        tabla=tabla, chunk=chunk)
+    print(f"reimportación: importadas {r['importadas']}, duplicadas {r['duplicadas']}, "
+          f"llamadas {dict(Counter(ws.calls))}")
+    assert r["importadas"] == 0 and len(ws.values) == n + 1
+
+    # Fila por fila (formulario): cada gasto revalida header + ids y agrega una fila
+    uno = FakeWorksheet([BASE_COLS + PERSONAS])
+    append_gasto_to_sheet(uno, {**dict.fromkeys(BASE_COLS, ""), "id": "x"}, PERSONAS)
+    print(f"fila por fila: {len(uno.calls)} llamadas por gasto -> {len(uno.calls) * n:,} para {n} filas "
+          f"(contra {-(-n // chunk)} append_rows)")
+
+
+if __name__ == "__main__":
+    main()
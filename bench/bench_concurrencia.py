@@ -0,0 +1,132 @@
+# Dos (o más) viajeros cargando y deshaciendo a la vez sobre la misma hoja.
+# 1) "Borrar último" por posición (antes) contra deshacer por id (después), con una alta ajena en el medio.
+# 2) Varios hilos (sesiones de la misma app) agregando, editando y borrando por id mientras otra
+#    instancia agrega filas por su lado: al final tienen que quedar exactamente las filas esperadas.
+#
+#   python bench/bench_concurrencia.py [hilos] [gastos_por_hilo]
+
+import os
+import random
+import sys
+import threading
+import uuid
+from collections import Counter
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "bench"))
+
+from fake_sheet import FakeWorksheet  # noqa: E402
+from sheets import BASE_COLS, SnapshotCache  # noqa: E402
+from storage import SheetsStorage  # noqa: E402
+
+PERSONAS = ["Quique", "Rafa", "Gus"]
+HEADERS = BASE_COLS + PERSONAS
+
+
+def gasto(quien: str, concepto: str) -> dict:
+    row = {
+        "id": str(uuid.uuid4()), "fecha": "2026-03-01", "concepto": concepto, "pago": quien,
+        "monto": 30.0, "moneda": "ARS", "cambio_a_base": 1.0, "monto_base": 30.0,
+    }
+    row.update({p: 10.0 for p in PERSONAS})
+    return row
+
+
+def ids_en_hoja(ws) -> list[str]:
+    return [r[0] for r in ws.values[1:]]
+
+
+def nueva_hoja():
+    ws = FakeWorksheet([HEADERS])
+    storage = SheetsStorage(SnapshotCache(ttl=30, incremental=True, id_index_ttl=300), "demo", "gastos", lambda: ws)
+    return ws, storage
+
+
+def interleaving():
+    # Quique carga, Rafa carga justo después, Quique quiere deshacer lo suyo
+    ws, storage = nueva_hoja()
+    a, b = gasto("Quique", "Taxi de Quique"), gasto("Rafa", "Cena de Rafa")
+    storage.append([a], PERSONAS)
+    storage.append([b], PERSONAS)
+    ws.delete_rows(len(ws.get_all_values()))
+    antes = [r[2] for r in ws.values[1:]]
+
+    ws, storage = nueva_hoja()
+    storage.append([a], PERSONAS)
+    storage.append([b], PERSONAS)
+    storage.delete(a["id"])
+    despues = [r[2] for r in ws.values[1:]]
+
+    print("Quique deshace con una alta de Rafa en el medio")
+    print(f"  antes   (borrar última fila): quedan {antes}")
+    print(f"  después (deshacer por id):    quedan {despues}")
+    assert despues == ["Cena de Rafa"]
+
+
+def stress(hilos: int, por_hilo: int, seed: int = 0):
+    ws, storage = nueva_hoja()
+    esperados = set()
+    editados = {}
+    lock = threading.Lock()
+    barrera = threading.Barrier(hilos + 1)
+
+    def viajero(k: int):
+        rng = random.Random(seed + k)
+        mios = []
+        barrera.wait()
+        for i in range(por_hilo):
+            row = gasto(PERSONAS[k % len(PERSONAS)], f"h{k}-{i}")
+            storage.append([row], PERSONAS)
+            mios.append(row)
+            r = rng.random()
+            if r < 0.3:
+                # deshacer el último propio
+                storage.delete(mios.pop()["id"])
+            elif r < 0.4 and mios:
+                # editar uno propio cualquiera
+                viejo = rng.choice(mios)
+                nuevo = dict(viejo, concepto=viejo["concepto"] + " (editado)")
+                storage.update(viejo["id"], nuevo, PERSONAS)
+                with lock:
+                    editados[viejo["id"]] = nuevo["concepto"]
+        with lock:
+            esperados.update(r["id"] for r in mios)
+
+    def otra_instancia():
+        # Otra app (u otra persona en la Sheet) agregando filas al final, sin pasar por el índice
+        barrera.wait()
+        for i in range(por_hilo):
+            row = gasto("Gus", f"ajeno-{i}")
+            ws.append_rows([[row.get(h, "") for h in HEADERS]])
+            with lock:
+                esperados.add(row["id"])
+
+    threads = [threading.Thread(target=viajero, args=(k,)) for k in range(hilos)]
+    threads.append(threading.Thread(target=otra_instancia))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    en_hoja = ids_en_hoja(ws)
+    conceptos = {r[0]: r[2] for r in ws.values[1:]}
+    calls = Counter(ws.calls)
+    ok = sorted(en_hoja) == sorted(esperados) and all(conceptos.get(i) == c for i, c in editados.items() if i in esperados)
+    print(f"{hilos} viajeros x {por_hilo} gastos + otra instancia agregando: "
+          f"{len(en_hoja)} filas, esperadas {len(esperados)} -> {'OK' if ok else 'MAL'}")
+    print(f"  llamadas: {dict(calls)}")
+    print(f"  relecturas del índice (batch_get) por borrado/edición: "
+          f"{calls['batch_get'] / max(calls['delete_rows'] + calls['update'], 1):.2f}")
+    assert ok
+
+
+def main():
+    hilos = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    por_hilo = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    interleaving()
+    stress(hilos, por_hilo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# Muchas sesiones leyendo la misma hoja a la vez, contra una FakeWorksheet detrás de una cuota
+# como la de Google (más de N llamadas por ventana -> 429), con y sin el Limitador de cuota.py.
+# La ventana es de 1 s en vez de 1 minuto para que corra rápido.
+#
+#   python bench/bench_cuota.py [sesiones...]
+
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "bench"))
+
+from bench_suite import hoja_sintetica  # noqa: E402
+from cuota import CuotaAgotada, Limitador  # noqa: E402
+from fake_sheet import FakeWorksheet  # noqa: E402
+from sheets import load_gastos_from_sheet  # noqa: E402
+
+CUOTA = 20         # llamadas por ventana de 1 s
+LATENCIA = 0.05    # s por llamada
+RERUNS = 5         # lecturas por sesión
+
+
+class ErrorAPI(Exception):
+    # Como gspread.exceptions.APIError: el status en .code
+    def __init__(self, code: int):
+        super().__init__(f"APIError [{code}]")
+        self.code = code
+
+
+class SheetConCuota:
+    def __init__(self, ws, cuota: int):
+        self.ws = ws
+        self.cuota = cuota
+        self.ventana = deque()
+        self.llamadas = 0
+        self.rechazos = 0
+        self.pico = 0
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        attr = getattr(self.ws, name)
+        if not callable(attr):
+            return attr
+
+        def llamada(*args, **kwargs):
+            with self.lock:
+                ahora = time.monotonic()
+                while self.ventana and ahora - self.ventana[0] > 1.0:
+                    self.ventana.popleft()
+                if len(self.ventana) >= self.cuota:
+                    self.rechazos += 1
+                    raise ErrorAPI(429)
+                self.ventana.append(ahora)
+                self.llamadas += 1
+                self.pico = max(self.pico, len(self.ventana))
+            time.sleep(LATENCIA)
+            return attr(*args, **kwargs)
+
+        return llamada
+
+
+def correr(sesiones: int, limitado: bool) -> dict:
+    personas, values = hoja_sintetica(500, 4)
+    api = SheetConCuota(FakeWorksheet(values), CUOTA)
+    lim = Limitador(lecturas_por_minuto=CUOTA * 60 * 0.9, rafaga=CUOTA // 2, backoff_base=0.1, backoff_max=1.0)
+    ws = lim.envolver(api) if limitado else api
+    fallas = []
+
+    def sesion():
+        for _ in range(RERUNS):
+            try:
+                load_gastos_from_sheet(ws, personas)
+            except (ErrorAPI, CuotaAgotada) as e:
+                fallas.append(e)
+            time.sleep(0.02)
+
+    t = time.perf_counter()
+    hilos = [threading.Thread(target=sesion) for _ in range(sesiones)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    return {
+        "segundos": time.perf_counter() - t,
+        "pedidos": sesiones * RERUNS,
+        "llamadas": api.llamadas,
+        "429": api.rechazos,
+        "fallas": len(fallas),
+        "pico": api.pico,
+        **(lim.resumen() if limitado else {}),
+    }
+
+
+def main():
+    sesiones = [int(a) for a in sys.argv[1:]] or [5, 20, 50]
+    print(f"cuota: {CUOTA} llamadas/s, latencia {LATENCIA * 1000:.0f} ms, {RERUNS} lecturas por sesión")
+    for n in sesiones:
+        for limitado in (False, True):
+            r = correr(n, limitado)
+            extra = f", {r['compartidas']} compartidas, {r['reintentos']} reintentos" if limitado else ""
+            print(f"{n:>3} sesiones {'con' if limitado else 'sin'} limitador: {r['pedidos']} lecturas -> "
+                  f"{r['llamadas']} llamadas, pico {r['pico']}/s, {r['429']} x 429, "
+                  f"{r['fallas']} fallas en la app{extra} ({r['segundos']:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# Costo de arranque de la app:
+#   1. import en frío de cada módulo (python -X importtime, un proceso por módulo)
+#   2. primera corrida del script vs reruns, con AppTest y una Sheet en memoria
+#
+#   python bench/bench_import.py [reruns]
+
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = [
+    "streamlit", "pandas", "numpy", "gspread", "google.oauth2.service_account", "reportlab.platypus",
+    "sheets", "saldos", "outbox", "viajes", "reportes",
+]
+
+HEADERS = ["id", "fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base", "Quique", "Rafa", "Gus"]
+
+
+def importtime(modulo: str) -> float:
+    # Último renglón de -X importtime para el módulo pedido: tiempo acumulado en µs
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True, text=True, cwd=RAIZ, check=True,
+    ).stderr
+    for linea in reversed(err.splitlines()):
+        partes = [p.strip() for p in linea.split("|")]
+        if len(partes) == 3 and partes[2] == modulo:
+            return int(partes[1]) / 1000
+    return float("nan")
+
+
+def reruns(n: int):
+    # Corre en un proceso aparte para que la primera corrida sea realmente en frío
+    from fake_sheet import FakeWorksheet
+    import gspread
+    from google.oauth2 import service_account
+    from streamlit.testing.v1 import AppTest
+
+    ws = FakeWorksheet([HEADERS] + [
+        [f"id-{i}", "2026-01-01", "Cena", "Rafa", "300", "ARS", "1", "300", "100", "100", "100"] for i in range(500)
+    ])
+
+    class Spreadsheet:
+        def worksheet(self, name):
+            return ws
+
+    class Client:
+        def open_by_key(self, key):
+            return Spreadsheet()
+
+    gspread.authorize = lambda creds: Client()
+    service_account.Credentials.from_service_account_info = staticmethod(lambda *a, **k: None)
+
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=120)
+    at.secrets["gcp_service_account"] = {}
+    at.secrets["sheets"] = {"spreadsheet_id": "bench", "worksheet": "gastos"}
+    at.secrets["outbox"] = {"path": os.path.join(RAIZ, "bench_outbox.jsonl")}
+    at.session_state["pagina"] = "app"
+
+    t = time.perf_counter()
+    at.run()
+    primera = time.perf_counter() - t
+
+    tiempos = []
+    for _ in range(n):
+        t = time.perf_counter()
+        at.run()
+        tiempos.append(time.perf_counter() - t)
+
+    if os.path.exists(os.path.join(RAIZ, "bench_outbox.jsonl")):
+        os.unlink(os.path.join(RAIZ, "bench_outbox.jsonl"))
+    print(f"{primera:.4f} {sum(tiempos) / len(tiempos):.4f} {int('reportlab' in sys.modules)} {len(ws.calls)}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    print("Import en frío (acumulado)")
+    for m in MODULOS:
+        print(f"  {m:<32} {importtime(m):>8.1f} ms")
+
+    out = subprocess.run(
+        [sys.executable, __file__, "--reruns", str(n)], capture_output=True, text=True, check=True,
+    ).stdout.split()
+    primera, rerun, reportlab, lecturas = float(out[0]), float(out[1]), out[2] == "1", int(out[3])
+    print()
+    print(f"Primera corrida del script: {primera * 1000:.0f} ms")
+    print(f"Rerun promedio ({n}):        {rerun * 1000:.0f} ms")
+    print(f"reportlab cargado sin tocar el PDF: {'sí' if reportlab else 'no'}")
+    print(f"Llamadas a la Sheet en {n + 1} corridas: {lecturas}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--reruns"]:
+        reruns(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,60 @@
+# Compara to_num (celda por celda) con el parser vectorizado de sheets.py.
+# Que den exactamente lo mismo lo verifica tests/test_sheets.py; acá sólo se mide.
+#
+#   python bench/bench_parse.py [filas]
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheets import to_num, to_num_series  # noqa: E402
+
+# Algunos formatos raros para mezclar con los habituales
+RAROS = ["", "   ", None, "abc", "-", "1.234.567,89", "1,234.56", "$ 1.234,56", "US$12", "1e3", "-.5", "+3"]
+
+
+def synthetic(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        v = rng.uniform(-5000, 50000)
+        fmt = rng.randrange(6)
+        if fmt == 0:
+            s = f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        elif fmt == 1:
+            s = f"{v:.7f}".replace(".", ",")
+        elif fmt == 2:
+            s = str(int(v))
+        elif fmt == 3:
+            s = f"{v:.2f}"
+        elif fmt == 4:
+            s = rng.choice(["", " ", "-", "n/a"])
+        else:
+            s = rng.choice(RAROS) or ""
+        out.append(s)
+    return out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    col = pd.Series(synthetic(n), dtype=object)
+
+    t = time.perf_counter()
+    col.apply(to_num)
+    t_apply = time.perf_counter() - t
+
+    t = time.perf_counter()
+    to_num_series(col)
+    t_vec = time.perf_counter() - t
+
+    print(f"{n} celdas: apply(to_num) {t_apply:.3f}s | vectorizado {t_vec:.3f}s | x{t_apply / t_vec:.1f}")
+
+
+if __name__ == "__main__":
+    main()
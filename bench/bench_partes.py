@@ -0,0 +1,78 @@
+# Grupo grande (60 personas, cada gasto de 2 a 5): columnas por persona contra tabla de partes.
+# Celdas guardadas, tiempo de leer + parsear la hoja y de calcular los saldos, desde una
+# FakeWorksheet con caché fría. La migración se hace con SheetsStorage.migrar_a_largo.
+#
+#   python bench/bench_partes.py [filas] [personas]
+
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "bench"))
+
+from fake_sheet import FakeWorksheet  # noqa: E402
+from partes import PARTES_COLS  # noqa: E402
+from sheets import BASE_COLS, SnapshotCache  # noqa: E402
+from storage import SheetsStorage  # noqa: E402
+
+
+def hoja_ancha(n: int, p: int, seed: int = 0):
+    rng = random.Random(seed)
+    personas = [f"P{i:02d}" for i in range(p)]
+    values = [BASE_COLS + personas]
+    for i in range(n):
+        monto = round(rng.uniform(10, 500), 2)
+        quienes = set(rng.sample(personas, rng.randint(2, 5)))
+        parte = round(monto / len(quienes), 2)
+        values.append([f"id-{i}", "2026-03-01", "Cena", rng.choice(personas), str(monto), "ARS", "1", str(monto)]
+                      + [str(parte) if q in quienes else "0" for q in personas])
+    return personas, values
+
+
+def medir(storage, personas, repeticiones=3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        storage.cache = SnapshotCache()
+        t = time.perf_counter()
+        storage.ledger(personas).balance()
+        storage.load(personas)
+        mejor = min(mejor, time.perf_counter() - t)
+    return mejor
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    p = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    personas, values = hoja_ancha(n, p)
+
+    ws = FakeWorksheet(values)
+    ancho = SheetsStorage(SnapshotCache(), "demo", "gastos", lambda: ws)
+    t_ancho = medir(ancho, personas)
+    celdas_ancho = sum(len(r) for r in ws.values)
+    balance_ancho = ancho.ledger(personas).balance()
+
+    wp = FakeWorksheet([PARTES_COLS], title="gastos_partes")
+    largo = SheetsStorage(SnapshotCache(), "demo", "gastos", lambda: ws,
+                          partes_worksheet="gastos_partes", get_partes_ws=lambda: wp)
+    t = time.perf_counter()
+    migradas = largo.migrar_a_largo(personas)
+    t_migrar = time.perf_counter() - t
+    t_largo = medir(largo, personas)
+    celdas_largo = sum(len(r) for r in ws.values) + sum(len(r) for r in wp.values)
+    balance_largo = largo.ledger(personas).balance()
+
+    print(f"{n} gastos x {p} personas")
+    print(f"ancho: {celdas_ancho:>10,} celdas, lectura + saldos {t_ancho * 1000:7.1f} ms")
+    print(f"largo: {celdas_largo:>10,} celdas, lectura + saldos {t_largo * 1000:7.1f} ms "
+          f"({migradas:,} partes, migración {t_migrar * 1000:.0f} ms)")
+    dif = (balance_ancho - balance_largo.reindex(balance_ancho.index)).abs().max()
+    print(f"x{t_ancho / t_largo:.1f} más rápido, {celdas_ancho / celdas_largo:.1f}x menos celdas; "
+          f"diferencia máxima de saldos {dif:.2e}")
+    assert dif < 1e-6
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# Tiempo y RSS pico de los PDFs con el detalle en una sola tabla (antes, chunk=0)
+# contra el detalle en bloques de DETALLE_CHUNK filas (después).
+# Cada medición corre en un proceso aparte para que el RSS pico sea sólo de ese caso.
+#
+#   python bench/bench_pdf.py [filas ...]
+#
+# Medido (bloques diferidos: cada Table se arma cuando reportlab la ubica en la página):
+#
+#   reporte      filas modo        tiempo   RSS pico
+#   ejecutivo     1000 antes        1.07s    137.4MB
+#   ejecutivo     1000 después      1.16s    134.7MB
+#   ejecutivo    10000 antes       24.16s    184.4MB
+#   ejecutivo    10000 después     12.54s    152.6MB
+#   ejecutivo    50000 antes      311.73s    371.6MB
+#   ejecutivo    50000 después     37.51s    216.9MB
+#   gastos        1000 antes        0.86s    133.8MB
+#   gastos        1000 después      0.85s    129.6MB
+#   gastos       10000 antes       14.23s    194.3MB
+#   gastos       10000 después      8.10s    143.5MB
+#   gastos       50000 antes      246.62s    434.2MB
+#   gastos       50000 después     41.97s    195.0MB
+#
+# Con los bloques armados todos de entrada el tiempo era parecido pero el RSS pico no bajaba
+# (10k: 183.4MB ejecutivo, 197.4MB gastos).
+
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+PERSONAS = ["Quique", "Rafa", "Gus", "Ana"]
+
+
+def viaje_sintetico(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    monto = rng.uniform(1, 500, n).round(2)
+    cambio = rng.choice([1.0, 1000.0, 1100.0], n)
+    df = pd.DataFrame({
+        "id": [f"id-{i}" for i in range(n)],
+        "fecha": pd.date_range("2026-01-01", periods=n, freq="h").strftime("%Y-%m-%d"),
+        "concepto": rng.choice(["Hotel", "Cena", "Uber", "Museo", "Super"], n),
+        "pago": rng.choice(PERSONAS, n),
+        "monto": monto,
+        "moneda": rng.choice(["ARS", "USD", "EUR"], n),
+        "cambio_a_base": cambio,
+        "monto_base": monto * cambio,
+    })
+    for p in PERSONAS:
+        df[p] = df["monto_base"] / len(PERSONAS)
+    return df
+
+
+def uno(reporte: str, modo: str, n: int):
+    from reportes import DETALLE_CHUNK, generar_pdf_ejecutivo, generar_pdf_gastos
+
+    df = viaje_sintetico(n)
+    chunk = 0 if modo == "antes" else DETALLE_CHUNK
+    t = time.perf_counter()
+    if reporte == "ejecutivo":
+        path = generar_pdf_ejecutivo(df, PERSONAS, chunk=chunk)
+    else:
+        path = generar_pdf_gastos(df, PERSONAS, chunk=chunk)
+    dt = time.perf_counter() - t
+    os.unlink(path)
+    # ru_maxrss está en KB en Linux
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{dt:.3f} {rss:.1f}")
+
+
+def main():
+    filas = [int(x) for x in sys.argv[1:]] or [1_000, 10_000, 50_000]
+    print(f"{'reporte':<10} {'filas':>7} {'modo':<8} {'tiempo':>9} {'RSS pico':>10}")
+    for reporte in ("ejecutivo", "gastos"):
+        for n in filas:
+            for modo in ("antes", "después"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--uno", reporte, modo, str(n)],
+                    capture_output=True, text=True, check=True,
+                ).stdout.split()
+                print(f"{reporte:<10} {n:>7} {modo:<8} {float(out[0]):>8.2f}s {float(out[1]):>8.1f}MB")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--uno"]:
+        uno(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    else:
+        main()
@@ -0,0 +1,56 @@
+# Costo fijo por reporte: armar fuentes, hoja de estilos y TableStyles en cada PDF (antes)
+# contra reusar el PdfContext del proceso (después). Con reportes chicos es casi todo el tiempo.
+#
+#   python bench/bench_pdf_setup.py [repeticiones] [filas]
+
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "bench"))
+
+import reportes  # noqa: E402
+from bench_pdf import PERSONAS, viaje_sintetico  # noqa: E402
+
+
+def por_reporte(fn, reps: int) -> float:
+    t = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - t) / reps * 1000
+
+
+def generar(reporte: str, df, frio: bool):
+    if frio:
+        # lo que pasaba antes: todo el setup de nuevo en cada reporte
+        reportes._contexto = None
+    gen = reportes.generar_pdf_ejecutivo if reporte == "ejecutivo" else reportes.generar_pdf_gastos
+    os.unlink(gen(df, PERSONAS))
+
+
+def main():
+    reps = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    ctx = reportes.contexto_pdf()
+    print(f"fuente: {ctx.fuente} / {ctx.fuente_bold}")
+
+    def setup_frio():
+        reportes.PdfContext()
+
+    t_frio = por_reporte(setup_frio, reps)
+    t_tibio = por_reporte(reportes.contexto_pdf, reps)
+    print(f"setup por reporte: antes {t_frio:.2f}ms | después {t_tibio * 1000:.2f}µs")
+
+    df = viaje_sintetico(n)
+    for reporte in ("ejecutivo", "gastos"):
+        generar(reporte, df, frio=False)  # calentamos imports
+        antes = por_reporte(lambda: generar(reporte, df, frio=True), reps)
+        despues = por_reporte(lambda: generar(reporte, df, frio=False), reps)
+        print(f"{reporte:<10} {n} filas: antes {antes:.2f}ms | después {despues:.2f}ms | x{antes / despues:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Compara settle_up (greedy) con settle_min (mínimo de transferencias) en grupos sintéticos:
+# cantidad de transferencias y tiempo.
+#
+#   python bench/bench_settle.py
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saldos import settle_min, settle_up  # noqa: E402
+
+
+def grupo(n: int, rng, subgrupos: bool) -> pd.Series:
+    # Saldos en centavos que suman 0; con subgrupos=True se arman varios subgrupos
+    # que se cancelan entre sí (el caso típico: gastos de a 2 o 3 personas)
+    if subgrupos:
+        valores = []
+        while len(valores) < n:
+            k = min(int(rng.integers(2, 5)), n - len(valores))
+            if n - len(valores) - k == 1:
+                k += 1
+            parte = rng.integers(-50_000, 50_000, k)
+            parte[-1] -= parte.sum()
+            valores.extend(parte.tolist())
+        valores = np.array(valores)
+        rng.shuffle(valores)
+    else:
+        valores = rng.integers(-50_000, 50_000, n)
+        valores[-1] -= valores.sum()
+    return pd.Series(valores / 100, index=[f"P{i}" for i in range(n)])
+
+
+def chequear(balance: pd.Series, tx: pd.DataFrame):
+    neto = balance.round(2).to_dict()
+    for r in tx.itertuples():
+        neto[r.De] += r.Monto
+        neto[r.Para] -= r.Monto
+    assert max(abs(v) for v in neto.values()) < 0.011, neto
+
+
+def medir(fn, *args):
+    t = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - t
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'n':>3} {'tipo':<10} {'greedy':>7} {'mínimo':>7} {'t greedy':>10} {'t mínimo':>10}")
+    for n in (4, 6, 8, 10, 12, 15, 18, 25, 60):
+        for subgrupos in (False, True):
+            tot_g = tot_m = 0
+            t_g = t_m = 0.0
+            for _ in range(5):
+                b = grupo(n, rng, subgrupos)
+                g, dt_g = medir(settle_up, b.sort_values(ascending=False))
+                m, dt_m = medir(settle_min, b)
+                chequear(b, m)
+                tot_g += len(g)
+                tot_m += len(m)
+                t_g += dt_g
+                t_m += dt_m
+            tipo = "subgrupos" if subgrupos else "random"
+            print(f"{n:>3} {tipo:<10} {tot_g / 5:>7.1f} {tot_m / 5:>7.1f} {t_g / 5 * 1000:>8.2f}ms {t_m / 5 * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
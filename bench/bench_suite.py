@@ -0,0 +1,162 @@
+# Suite de benchmarks del camino de datos, sin Streamlit ni red:
+#   parse (load_gastos_from_sheet sobre una FakeWorksheet), compute_balances, settle_up, cubo,
+#   generar_pdf_ejecutivo y generar_pdf_gastos.
+# Viajes sintéticos de N filas x P personas, con monedas mezcladas y montos como texto en
+# formato AR (1.234,56) y EN (1234.56), como llegan de la Sheet.
+# Reporta tiempo (mejor de R corridas), filas/s y memoria pico (tracemalloc, en una corrida aparte),
+# y guarda JSON para comparar entre commits.
+#
+#   python bench/bench_suite.py --filas 1000 10000 --personas 4 --json antes.json
+#   python bench/bench_suite.py --filas 1000 10000 --personas 4 --comparar antes.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "bench"))
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from analitica import Cubo  # noqa: E402
+from fake_sheet import FakeWorksheet  # noqa: E402
+from saldos import compute_balances, settle_up  # noqa: E402
+from sheets import BASE_COLS, load_gastos_from_sheet  # noqa: E402
+
+MONEDAS = {"ARS": 1.0, "USD": 1100.0, "EUR": 1200.0}
+CONCEPTOS = ["Hotel", "Cena", "Uber", "Museo", "Super", "Tren", "Café"]
+
+
+def fmt_ar(v: float) -> str:
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def hoja_sintetica(n: int, p: int, seed: int = 0) -> tuple[list[str], list[list[str]]]:
+    # Valores como los devuelve get_all_values: todo texto, mitad formato AR y mitad EN
+    rng = random.Random(seed)
+    personas = [f"P{i}" for i in range(p)]
+    values = [BASE_COLS + personas]
+    for i in range(n):
+        moneda = rng.choice(list(MONEDAS))
+        monto = round(rng.uniform(1, 500), 2)
+        cambio = MONEDAS[moneda]
+        monto_base = monto * cambio
+        # división entre un subconjunto (gastos de a 2 o 3) o entre todos
+        k = rng.choice([2, 3, p]) if p > 3 else p
+        quienes = set(rng.sample(personas, min(k, p)))
+        fmt = fmt_ar if rng.random() < 0.5 else (lambda v: f"{v:.2f}")
+        values.append([
+            f"id-{i}",
+            f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            rng.choice(CONCEPTOS),
+            rng.choice(personas),
+            fmt(monto),
+            moneda,
+            fmt(cambio),
+            fmt(monto_base),
+        ] + [fmt(monto_base / len(quienes)) if q in quienes else "" for q in personas])
+    return personas, values
+
+
+def medir(fn, repeticiones: int) -> tuple[float, float]:
+    # (mejor tiempo en s, memoria pico en MB)
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - t)
+
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return mejor, pico / 1024 / 1024
+
+
+def casos(n: int, p: int, pdf: bool):
+    personas, values = hoja_sintetica(n, p)
+    ws = FakeWorksheet(values)
+    df = load_gastos_from_sheet(ws, personas)
+    balance = compute_balances(df.copy(), personas)
+
+    def pdf_ejecutivo():
+        from reportes import generar_pdf_ejecutivo
+        os.unlink(generar_pdf_ejecutivo(df, personas))
+
+    def pdf_gastos():
+        from reportes import generar_pdf_gastos
+        os.unlink(generar_pdf_gastos(df, personas))
+
+    yield "parse", lambda: load_gastos_from_sheet(ws, personas)
+    yield "compute_balances", lambda: compute_balances(df.copy(), personas)
+    yield "settle_up", lambda: settle_up(balance)
+    yield "cubo", lambda: Cubo.from_df(df)
+    if pdf:
+        yield "pdf_ejecutivo", pdf_ejecutivo
+        yield "pdf_gastos", pdf_gastos
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=RAIZ, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000])
+    ap.add_argument("--personas", type=int, default=4)
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--sin-pdf", action="store_true", help="saltear los PDFs (son lo más lento)")
+    ap.add_argument("--json", help="guardar los resultados en este archivo")
+    ap.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    args = ap.parse_args()
+
+    anterior = {}
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = {(r["caso"], r["filas"], r["personas"]): r for r in json.load(f)["resultados"]}
+
+    print(f"{'caso':<17} {'filas':>7} {'tiempo':>9} {'filas/s':>12} {'pico':>9}" + ("  vs anterior" if anterior else ""))
+    resultados = []
+    for n in args.filas:
+        # los PDFs también se calientan (imports de reportlab, contexto de fuentes) antes de medir
+        for caso, fn in casos(n, args.personas, not args.sin_pdf):
+            fn()
+            t, pico = medir(fn, args.repeticiones)
+            r = {"caso": caso, "filas": n, "personas": args.personas, "segundos": t,
+                 "filas_por_segundo": n / t if t else None, "pico_mb": pico}
+            resultados.append(r)
+
+            linea = f"{caso:<17} {n:>7} {t * 1000:>7.1f}ms {r['filas_por_segundo']:>12,.0f} {pico:>7.1f}MB"
+            prev = anterior.get((caso, n, args.personas))
+            if prev:
+                linea += f"  x{prev['segundos'] / t:.2f} tiempo, {pico - prev['pico_mb']:+.1f}MB"
+            print(linea)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "commit": commit(),
+                "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "repeticiones": args.repeticiones,
+                "resultados": resultados,
+            }, f, indent=2)
+        print(f"guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
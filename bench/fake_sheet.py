@@ -0,0 +1,112 @@
+# Worksheet en memoria con la parte de la API de gspread que usa la app,
+# para correr los benchmarks sin red. Cuenta las llamadas en `calls`.
+# Cada llamada es atómica (como en la API real), así que se puede usar desde varios hilos.
+
+import re
+import threading
+
+
+def _col(letras: str) -> int:
+    n = 0
+    for ch in letras:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+def _letra(n: int) -> str:
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+class FakeWorksheet:
+    def __init__(self, values, title="gastos"):
+        self.values = [list(r) for r in values]
+        self.title = title
+        self.calls = []
+        self.lock = threading.RLock()
+
+    def _rango(self, rng: str):
+        # "1:1", "C5", "A4:K", "A4:K10"
+        a, _, b = rng.partition(":")
+        ma = re.fullmatch(r"([A-Z]*)(\d*)", a)
+        mb = re.fullmatch(r"([A-Z]*)(\d*)", b or a)
+        c0 = _col(ma.group(1)) if ma.group(1) else 1
+        c1 = _col(mb.group(1)) if mb.group(1) else None
+        r0 = int(ma.group(2)) if ma.group(2) else 1
+        r1 = int(mb.group(2)) if mb.group(2) else len(self.values)
+        out = []
+        for r in self.values[r0 - 1:r1]:
+            fila = r[c0 - 1:c1]
+            while fila and fila[-1] == "":
+                fila = fila[:-1]
+            out.append(fila)
+        while out and not out[-1]:
+            out.pop()
+        return out
+
+    def get_all_values(self, **kw):
+        with self.lock:
+            self.calls.append("get_all_values")
+            ancho = max((len(r) for r in self.values), default=0)
+            return [list(r) + [""] * (ancho - len(r)) for r in self.values]
+
+    def get(self, rng, **kw):
+        self.calls.append("get")
+        return self._rango(rng)
+
+    def batch_get(self, ranges, **kw):
+        with self.lock:
+            self.calls.append("batch_get")
+            return [self._rango(r) for r in ranges]
+
+    def row_values(self, row, **kw):
+        self.calls.append("row_values")
+        return list(self.values[row - 1]) if row <= len(self.values) else []
+
+    def col_values(self, col, **kw):
+        self.calls.append("col_values")
+        return [r[col - 1] if len(r) >= col else "" for r in self.values]
+
+    def append_row(self, row, **kw):
+        self.calls.append("append_row")
+        self.values.append([str(x) for x in row])
+
+    def append_rows(self, rows, **kw):
+        with self.lock:
+            self.calls.append("append_rows")
+            start = len(self.values) + 1
+            self.values.extend([str(x) for x in r] for r in rows)
+            # misma forma que la respuesta de values.append
+            fin = f"{_letra(max((len(r) for r in rows), default=1))}{start + len(rows) - 1}"
+            return {"updates": {"updatedRange": f"'{self.title}'!A{start}:{fin}"}}
+
+    def update(self, values, range_name, **kw):
+        with self.lock:
+            self.calls.append("update")
+            m = re.fullmatch(r"([A-Z]+)(\d+)(?::[A-Z]+\d+)?", range_name)
+            c0, r0 = _col(m.group(1)), int(m.group(2))
+            for k, fila in enumerate(values):
+                while len(self.values) < r0 + k:
+                    self.values.append([])
+                actual = self.values[r0 + k - 1]
+                actual += [""] * (c0 - 1 + len(fila) - len(actual))
+                actual[c0 - 1:c0 - 1 + len(fila)] = [str(x) for x in fila]
+
+    def delete_rows(self, start, end=None):
+        with self.lock:
+            self.calls.append("delete_rows")
+            del self.values[start - 1:(end or start)]
+
+    def delete_columns(self, start, end=None):
+        with self.lock:
+            self.calls.append("delete_columns")
+            for r in self.values:
+                del r[start - 1:(end or start)]
+
+    def clear(self):
+        with self.lock:
+            self.calls.append("clear")
+            self.values = []
@@ -0,0 +1,164 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from saldos import a_centavos, cuadrar_partes, de_centavos
+from sheets import to_fecha, to_num_series
+
+
+# -------------------------
+# Tabla de cotizaciones
+# -------------------------
+# Filas (fecha, de, a, tasa): 1 unidad de `de` = `tasa` unidades de `a` ese día.
+# Sale de un CSV o de una worksheet con esas columnas ([cambios] path / worksheet en secrets),
+# completada con los cambios que ya se usaron en los gastos del viaje.
+# Para una fecha se usa la última cotización de ese día o anterior.
+
+COLS = ["fecha", "de", "a", "tasa"]
+
+
+def _dias(fechas) -> np.ndarray:
+    # datetime64[D]; acepta texto "YYYY-MM-DD", número de serie de la Sheet o fechas
+    # (date / datetime / Timestamp / datetime64, ej. el date_input o una Sheet tipada)
+    if isinstance(fechas, np.ndarray) and np.issubdtype(fechas.dtype, np.datetime64):
+        return fechas.astype("datetime64[D]")
+    if isinstance(fechas, pd.Series) and pd.api.types.is_datetime64_any_dtype(fechas):
+        return fechas.to_numpy(dtype="datetime64[D]")
+    col = pd.Series(list(fechas), dtype=object)
+    # las fechas de verdad no pasan por to_fecha: ahí un no-texto es un número de serie
+    es_fecha = col.map(lambda v: isinstance(v, (date, np.datetime64))).to_numpy(dtype=bool)
+    dias = pd.to_datetime(to_fecha(col.where(~es_fecha))).to_numpy(dtype="datetime64[D]")
+    if es_fecha.any():
+        dias[es_fecha] = pd.to_datetime(col[es_fecha].tolist()).to_numpy(dtype="datetime64[D]")
+    return dias
+
+
+class TablaCambios:
+    def __init__(self, df: pd.DataFrame | None = None):
+        df = pd.DataFrame(columns=COLS) if df is None else df[COLS]
+        df = df[(df["tasa"] > 0) & (df["de"] != df["a"])]
+        self.df = df
+
+        # Cada par también en sentido inverso; si el mismo día aparece dos veces gana la primera fila
+        inversa = df.rename(columns={"de": "a", "a": "de"}).assign(tasa=1.0 / df["tasa"])
+        todo = pd.concat([df, inversa[COLS]], ignore_index=True)
+        todo = todo.assign(dia=_dias(todo["fecha"]) if len(todo) else np.array([], dtype="datetime64[D]"))
+        todo = todo.drop_duplicates(["de", "a", "dia"], keep="first").sort_values("dia", kind="stable")
+
+        self._pares = {
+            (de, a): (g["dia"].to_numpy(dtype="datetime64[D]"), g["tasa"].to_numpy(dtype=float))
+            for (de, a), g in todo.groupby(["de", "a"], sort=False)
+        }
+        self.monedas = sorted({m for par in self._pares for m in par})
+
+    @classmethod
+    def from_values(cls, values) -> "TablaCambios":
+        # Filas tipo get_all_values / csv.reader, header en la primera
+        if len(values) < 2:
+            return cls()
+        headers = [str(h).strip() for h in values[0]]
+        df = pd.DataFrame([r[:len(headers)] for r in values[1:]], columns=headers)
+        return cls(cls._normalizar(df))
+
+    @classmethod
+    def from_csv(cls, path: str) -> "TablaCambios":
+        return cls(cls._normalizar(pd.read_csv(path, dtype=str, keep_default_na=False)))
+
+    @staticmethod
+    def _normalizar(df: pd.DataFrame) -> pd.DataFrame:
+        faltan = [c for c in COLS if c not in df.columns]
+        if faltan:
+            raise ValueError(f"Faltan columnas en la tabla de cambios: {faltan}")
+        return pd.DataFrame({
+            "fecha": df["fecha"].astype(str).str.strip(),
+            "de": df["de"].astype(str).str.strip().str.upper(),
+            "a": df["a"].astype(str).str.strip().str.upper(),
+            "tasa": to_num_series(df["tasa"]),
+        })
+
+    def con(self, extra: pd.DataFrame) -> "TablaCambios":
+        # Agrega cotizaciones sin pisar las de la tabla
+        if extra is None or extra.empty:
+            return self
+        return TablaCambios(pd.concat([self.df, extra[COLS]], ignore_index=True))
+
+    def _serie(self, de: str, a: str, dias: np.ndarray) -> np.ndarray:
+        par = self._pares.get((de, a))
+        if par is not None:
+            fechas, tasas = par
+            # última cotización <= fecha; antes de la primera, la primera
+            i = np.searchsorted(fechas, dias, side="right") - 1
+            return tasas[np.clip(i, 0, None)]
+        # Cruce por una moneda intermedia (ej. EUR -> USD -> ARS)
+        for m in self.monedas:
+            if (de, m) in self._pares and (m, a) in self._pares:
+                return self._serie(de, m, dias) * self._serie(m, a, dias)
+        return np.full(len(dias), np.nan)
+
+    def tasas(self, monedas, a: str, fechas) -> np.ndarray:
+        # Vectorizado: una búsqueda por moneda distinta, no por fila. NaN donde no hay cotización.
+        monedas = np.asarray(monedas, dtype=object)
+        dias = _dias(fechas)
+        out = np.full(len(monedas), np.nan)
+        for m in pd.unique(monedas):
+            sel = monedas == m
+            out[sel] = 1.0 if m == a else self._serie(m, a, dias[sel])
+        return out
+
+    def tasa(self, de: str, a: str, fecha=None) -> float | None:
+        if de == a:
+            return 1.0
+        dia = [fecha] if fecha is not None else [pd.Timestamp.max.strftime("%Y-%m-%d")]
+        t = self.tasas([de], a, dia)[0]
+        return None if np.isnan(t) else float(t)
+
+
+def observadas(df: pd.DataFrame, base: str) -> pd.DataFrame:
+    # Los cambios que ya se cargaron en el viaje (moneda -> base), el último de cada día
+    if df is None or df.empty or not {"fecha", "moneda", "cambio_a_base"} <= set(df.columns):
+        return pd.DataFrame(columns=COLS)
+    obs = pd.DataFrame({
+        "fecha": df["fecha"].to_numpy(),
+        "de": df["moneda"].astype(str).to_numpy(),
+        "a": base,
+        "tasa": df["cambio_a_base"].to_numpy(dtype=float),
+    })
+    # primero se deduplica y después se parsean las fechas (quedan pocas filas)
+    obs = obs[(obs["de"] != base) & (obs["tasa"] > 0)].drop_duplicates(["fecha", "de"], keep="last")
+    obs["fecha"] = pd.Series(_dias(obs["fecha"])).astype(str).to_numpy()
+    return obs[obs["fecha"] != "NaT"]
+
+
+# -------------------------
+# Cambio de base
+# -------------------------
+def rebase(df: pd.DataFrame, personas: list[str], de: str, a: str, tabla: TablaCambios) -> pd.DataFrame:
+    # Pasa monto_base, cambio_a_base y las partes de cada persona de la base `de` a la base `a`,
+    # en una sola pasada por columnas. Cada gasto se convierte desde su moneda original;
+    # si no hay cotización para esa moneda, desde la base anterior.
+    if df is None or df.empty or de == a:
+        return df
+
+    monto = df["monto"].to_numpy(dtype=float)
+    monto_base = df["monto_base"].to_numpy(dtype=float)
+    dias = _dias(df["fecha"])
+    directa = tabla.tasas(df["moneda"].astype(str).to_numpy(), a, dias)
+    via_base = tabla.tasas(np.full(len(df), de, dtype=object), a, dias)
+
+    nuevo = np.where(np.isnan(directa), monto_base * via_base, monto * directa)
+    if np.isnan(nuevo).any():
+        raise ValueError(f"No hay cotización {de} -> {a}")
+    # al centavo, y las partes cuadradas con el monto convertido (ver saldos.cuadrar_partes)
+    nuevo_c = a_centavos(nuevo)
+    nuevo = de_centavos(nuevo_c)
+    factor = np.divide(nuevo, monto_base, out=np.zeros(len(df)), where=monto_base != 0)
+
+    out = df.copy()
+    out["monto_base"] = nuevo
+    out["cambio_a_base"] = np.divide(nuevo, monto, out=np.zeros(len(df)), where=monto != 0)
+    presentes = [p for p in personas if p in out.columns]
+    if presentes:
+        partes_c = a_centavos(out[presentes].to_numpy(dtype=float) * factor[:, None])
+        out[presentes] = de_centavos(cuadrar_partes(nuevo_c, partes_c))
+    return out
@@ -0,0 +1,178 @@
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+
+# -------------------------
+# Cuota de la API de Sheets
+# -------------------------
+# Envuelve el handle de get_ws() para no pasarse de la cuota por minuto aunque haya muchas sesiones:
+#   - token bucket compartido por todo el proceso (uno para lecturas y otro para escrituras);
+#   - reintentos con backoff exponencial (y jitter) ante 429 y 5xx;
+#   - single-flight: lecturas iguales en vuelo al mismo tiempo se hacen una sola vez y
+#     todas las sesiones reciben el mismo resultado (que no se debe modificar).
+# Las escrituras que no son idempotentes (append_rows, delete_rows...) sólo se reintentan
+# ante 429, que la API rechaza sin aplicar; un 5xx pudo haberlas aplicado igual.
+
+LECTURAS = {"get_all_values", "get_values", "get", "batch_get", "row_values", "col_values", "acell", "cell"}
+IDEMPOTENTES = LECTURAS | {"update", "batch_update", "clear"}
+
+
+class CuotaAgotada(RuntimeError):
+    # Se agotaron los reintentos (o la espera por un token) y la API sigue limitando
+    pass
+
+
+def status_de(e: Exception) -> int | None:
+    # gspread.exceptions.APIError trae .code; si no, el status de la respuesta HTTP
+    code = getattr(e, "code", None)
+    if isinstance(code, int):
+        return code
+    return getattr(getattr(e, "response", None), "status_code", None)
+
+
+def retry_after(e: Exception) -> float | None:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, por_minuto: float, rafaga: int, reloj=time.monotonic, dormir=time.sleep):
+        self.tasa = por_minuto / 60.0
+        self.capacidad = float(rafaga)
+        self.reloj = reloj
+        self.dormir = dormir
+        self._tokens = float(rafaga)
+        self._t = reloj()
+        self._lock = threading.Lock()
+
+    def tomar(self, espera_max: float | None = None) -> float:
+        # Bloquea hasta conseguir un token; devuelve cuánto esperó
+        esperado = 0.0
+        while True:
+            with self._lock:
+                ahora = self.reloj()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._t) * self.tasa)
+                self._t = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return esperado
+                falta = (1 - self._tokens) / self.tasa
+            if espera_max is not None and esperado + falta > espera_max:
+                raise CuotaAgotada(f"Sin cuota de la API por más de {espera_max:.0f}s")
+            self.dormir(falta)
+            esperado += falta
+
+
+class SingleFlight:
+    def __init__(self):
+        self._vuelos = {}
+        self._lock = threading.Lock()
+        self.compartidas = 0
+
+    def hacer(self, clave, fn):
+        with self._lock:
+            fut = self._vuelos.get(clave)
+            lider = fut is None
+            if lider:
+                fut = self._vuelos[clave] = Future()
+            else:
+                self.compartidas += 1
+        if not lider:
+            return fut.result()
+        try:
+            r = fn()
+            fut.set_result(r)
+            return r
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._vuelos[clave]
+
+
+class Limitador:
+    # Uno por proceso (st.cache_resource), compartido por todas las worksheets y sesiones
+
+    def __init__(self, lecturas_por_minuto: float = 60, escrituras_por_minuto: float = 60, rafaga: int = 10,
+                 max_reintentos: int = 5, backoff_base: float = 1.0, backoff_max: float = 32.0,
+                 espera_max: float = 30.0, reloj=time.monotonic, dormir=time.sleep):
+        self.buckets = {
+            "lectura": TokenBucket(lecturas_por_minuto, rafaga, reloj, dormir),
+            "escritura": TokenBucket(escrituras_por_minuto, rafaga, reloj, dormir),
+        }
+        self.vuelos = SingleFlight()
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.espera_max = espera_max
+        self.dormir = dormir
+        self.reintentos = 0
+        self.espera_total = 0.0
+
+    def envolver(self, ws) -> "WorksheetLimitada":
+        return WorksheetLimitada(ws, self)
+
+    def reintentable(self, metodo: str, e: Exception) -> bool:
+        status = status_de(e)
+        if status == 429:
+            return True
+        idempotente = metodo in IDEMPOTENTES
+        if status is not None and status >= 500:
+            return idempotente
+        # corte de red / timeout (requests.ConnectionError es un OSError)
+        return idempotente and status is None and isinstance(e, OSError)
+
+    def backoff(self, intento: int, e: Exception) -> float:
+        espera = min(self.backoff_max, self.backoff_base * 2 ** intento)
+        return max(retry_after(e) or 0.0, espera * random.uniform(0.5, 1.0))
+
+    def llamar(self, ws, metodo: str, fn, args: tuple, kwargs: dict):
+        if metodo in LECTURAS:
+            clave = (id(ws), metodo, repr(args), repr(sorted(kwargs.items())))
+            return self.vuelos.hacer(clave, lambda: self._con_reintentos(metodo, fn, args, kwargs))
+        return self._con_reintentos(metodo, fn, args, kwargs)
+
+    def _con_reintentos(self, metodo: str, fn, args: tuple, kwargs: dict):
+        bucket = self.buckets["lectura" if metodo in LECTURAS else "escritura"]
+        for intento in range(self.max_reintentos + 1):
+            self.espera_total += bucket.tomar(self.espera_max)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if not self.reintentable(metodo, e):
+                    raise
+                if intento == self.max_reintentos:
+                    raise CuotaAgotada(f"{metodo}: la API sigue respondiendo {status_de(e) or e}") from e
+                self.reintentos += 1
+                self.dormir(self.backoff(intento, e))
+
+    def resumen(self) -> dict:
+        return {
+            "reintentos": self.reintentos,
+            "compartidas": self.vuelos.compartidas,
+            "espera_s": round(self.espera_total, 2),
+        }
+
+
+class WorksheetLimitada:
+    # Mismo uso que la worksheet que envuelve; cada método público pasa por el Limitador
+
+    def __init__(self, ws, limitador: Limitador):
+        self._ws = ws
+        self._limitador = limitador
+
+    def __getattr__(self, name):
+        attr = getattr(self._ws, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def limitado(*args, **kwargs):
+            return self._limitador.llamar(self._ws, name, attr, args, kwargs)
+
+        return limitado
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from sheets import to_fecha
+
+
+# -------------------------
+# Explorador de gastos
+# -------------------------
+# Índices armados una vez por snapshot (fechas ordenadas, códigos de pago/moneda, concepto en
+# minúsculas y sin tildes) para que cada página sea un slice y no un recorrido de toda la tabla:
+#   - el rango de fechas es un searchsorted sobre las fechas ordenadas;
+#   - pago y moneda se comparan por código entero, sólo dentro de ese rango;
+#   - la búsqueda de texto corre sólo sobre lo que quedó.
+# consulta() devuelve posiciones de fila: sirven igual para el snapshot rebasado (mismo orden).
+
+
+def _normalizar_texto(col: pd.Series) -> np.ndarray:
+    s = col.astype(str).str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+    return s.str.lower().to_numpy(dtype=object)
+
+
+class IndiceGastos:
+    def __init__(self, df: pd.DataFrame):
+        self.n = len(df)
+        fechas = pd.to_datetime(to_fecha(df["fecha"]) if "fecha" in df.columns else pd.Series([pd.NaT] * self.n))
+        dias = fechas.to_numpy(dtype="datetime64[D]")
+
+        # más recientes primero; a igual fecha, el último cargado primero. Sin fecha, al final.
+        self.orden = np.lexsort((-np.arange(self.n), -dias.astype("int64")))
+        sin_fecha = np.isnat(dias[self.orden])
+        self.orden = np.concatenate([self.orden[~sin_fecha], self.orden[sin_fecha]])
+        self.dias = dias[self.orden]                  # descendente, NaT al final
+        self.n_con_fecha = int((~sin_fecha).sum())
+
+        self.codigos = {}
+        self.categorias = {}
+        for col in ["pago", "moneda"]:
+            valores = df[col].astype(str) if col in df.columns else pd.Series([""] * self.n)
+            codigos, cats = pd.factorize(valores.to_numpy(dtype=object)[self.orden])
+            self.codigos[col] = codigos
+            self.categorias[col] = list(cats)
+
+        conceptos = df["concepto"] if "concepto" in df.columns else pd.Series([""] * self.n)
+        self.concepto = _normalizar_texto(conceptos)[self.orden]
+
+    def rango_fechas(self):
+        if not self.n_con_fecha:
+            return None
+        return self.dias[self.n_con_fecha - 1].astype(object), self.dias[0].astype(object)
+
+    def consulta(self, desde=None, hasta=None, pagos=None, monedas=None, texto: str = "",
+                 pagina: int = 1, por_pagina: int = 50) -> tuple[np.ndarray, int]:
+        # -> (posiciones de fila de la página pedida, total que cumple los filtros)
+        i, j = 0, self.n
+        if desde is not None or hasta is not None:
+            # las fechas están en orden descendente: se busca sobre el negativo
+            neg = -self.dias[:self.n_con_fecha].astype("int64")
+            if hasta is not None:
+                i = int(np.searchsorted(neg, -np.datetime64(hasta, "D").astype("int64"), side="left"))
+            j = self.n_con_fecha
+            if desde is not None:
+                j = int(np.searchsorted(neg, -np.datetime64(desde, "D").astype("int64"), side="right"))
+
+        filtros = [(col, sel) for col, sel in (("pago", pagos), ("moneda", monedas)) if sel]
+        texto = _normalizar_texto(pd.Series([texto.strip()]))[0] if texto and texto.strip() else ""
+        inicio = (max(pagina, 1) - 1) * por_pagina
+
+        if not filtros and not texto:
+            # sólo fechas (o nada): la página es un slice del orden
+            return self.orden[i + inicio:min(i + inicio + por_pagina, j)], max(j - i, 0)
+
+        ok = np.ones(max(j - i, 0), dtype=bool)
+        for col, sel in filtros:
+            cats = self.categorias[col]
+            buscados = [cats.index(v) for v in sel if v in cats]
+            ok &= np.isin(self.codigos[col][i:j], buscados)
+        if texto:
+            cand = np.flatnonzero(ok)
+            contiene = pd.Series(self.concepto[i:j][cand]).str.contains(texto, regex=False).to_numpy(dtype=bool)
+            ok[cand[~contiene]] = False
+        pos = np.flatnonzero(ok) + i
+        return self.orden[pos[inicio:inicio + por_pagina]], len(pos)
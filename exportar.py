@@ -0,0 +1,62 @@
+import io
+
+import pandas as pd
+
+from saldos import Ledger, settle
+
+
+# -------------------------
+# Exportación
+# -------------------------
+# Detalle, pagó/consumió/balance y transferencias del snapshot en memoria, como CSV o Parquet.
+# Se escriben de a bloques en un BytesIO (sin archivos temporales) listo para st.download_button.
+# pyarrow se importa recién al exportar a Parquet.
+
+EXPORT_CHUNK = 5000
+DETALLE_COLS = ["id", "fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"]
+TABLAS = {"gastos": "Gastos", "saldos": "Saldos", "transferencias": "Transferencias"}
+
+
+def tabla_export(nombre: str, df: pd.DataFrame, personas: list[str], ledger: Ledger,
+                 estrategia: str = "greedy") -> pd.DataFrame:
+    if nombre == "gastos":
+        return df[[c for c in DETALLE_COLS + personas if c in df.columns]]
+    if nombre == "saldos":
+        return ledger.tabla()
+    tx = settle(ledger.balance(), estrategia) if ledger.n else pd.DataFrame()
+    return tx if not tx.empty else pd.DataFrame(columns=["De", "Para", "Monto"])
+
+
+def a_csv(df: pd.DataFrame, chunk: int = EXPORT_CHUNK) -> io.BytesIO:
+    buf = io.BytesIO()
+    texto = io.TextIOWrapper(buf, encoding="utf-8", newline="", write_through=True)
+    df.to_csv(texto, index=False, chunksize=chunk)
+    texto.detach()  # que cerrar el wrapper no cierre el buffer
+    buf.seek(0)
+    return buf
+
+
+def a_parquet(df: pd.DataFrame, chunk: int = EXPORT_CHUNK) -> io.BytesIO:
+    # pago y moneda como diccionario (se leen de vuelta como categóricas); un row group por bloque
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df.copy()
+    for col in ["pago", "moneda", "Persona", "De", "Para"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str).astype("category")
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    buf = io.BytesIO()
+    writer = pq.ParquetWriter(buf, schema, compression="zstd")
+    for start in range(0, len(df), chunk):
+        writer.write_table(pa.Table.from_pandas(df.iloc[start:start + chunk], schema=schema, preserve_index=False))
+    writer.close()
+    buf.seek(0)
+    return buf
+
+
+FORMATOS = {
+    "CSV": (a_csv, "csv", "text/csv"),
+    "Parquet": (a_parquet, "parquet", "application/vnd.apache.parquet"),
+}
@@ -0,0 +1,219 @@
+import csv
+import io
+import unicodedata
+import uuid
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from cambios import TablaCambios
+from saldos import a_centavos, cuadrar_partes, de_centavos, repartir
+from sheets import BASE_COLS, to_num_series
+
+
+# -------------------------
+# Importación masiva
+# -------------------------
+# CSV / XLSX (exportaciones del banco o de la tarjeta) leídos de a bloques. Cada bloque se valida
+# y normaliza por columnas con las mismas reglas que el formulario y se escribe con un solo
+# storage.append (en Sheets, un append_rows por bloque).
+
+IMPORT_CHUNK = 500
+
+# Nombres de columna habituales -> columna de la hoja (sin tildes, minúsculas, "_" por espacios)
+ALIAS = {
+    "id": "id",
+    "fecha": "fecha", "date": "fecha", "fecha_operacion": "fecha", "fecha_de_operacion": "fecha",
+    "concepto": "concepto", "descripcion": "concepto", "detalle": "concepto", "description": "concepto",
+    "comercio": "concepto",
+    "pago": "pago", "pagador": "pago",
+    "monto": "monto", "importe": "monto", "amount": "monto", "valor": "monto",
+    "moneda": "moneda", "currency": "moneda", "divisa": "moneda",
+    "cambio_a_base": "cambio_a_base", "cambio": "cambio_a_base", "tasa": "cambio_a_base",
+}
+
+# ids deterministas: reimportar el mismo archivo no duplica gastos
+NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "gastos-de-viaje/importar")
+
+
+def _clave(col: str) -> str:
+    s = unicodedata.normalize("NFKD", str(col)).encode("ascii", "ignore").decode()
+    return "_".join(s.strip().lower().split())
+
+
+def mapear_columnas(cols, personas: list[str]) -> dict:
+    # columna del archivo -> columna de la hoja (las personas, por nombre sin importar mayúsculas)
+    por_persona = {_clave(p): p for p in personas}
+    mapa = {}
+    for c in cols:
+        k = _clave(c)
+        destino = por_persona.get(k) or ALIAS.get(k)
+        if destino and destino not in mapa.values():
+            mapa[c] = destino
+    return mapa
+
+
+def leer_archivo(archivo, nombre: str, chunk: int = IMPORT_CHUNK):
+    # Bloques de filas como texto. El CSV se lee en streaming (separador , ; o tab detectado);
+    # el XLSX necesita openpyxl y se trae entero, pero se procesa igual de a bloques.
+    if nombre.lower().endswith((".xlsx", ".xlsm")):
+        try:
+            df = pd.read_excel(archivo, dtype=str).fillna("")
+        except ImportError:
+            raise ValueError("Para importar XLSX hace falta openpyxl (pip install openpyxl).")
+        for start in range(0, len(df), chunk):
+            yield df.iloc[start:start + chunk]
+        return
+
+    muestra = archivo.read(64 * 1024)
+    archivo.seek(0)
+    if isinstance(muestra, bytes):
+        muestra = muestra.decode("utf-8-sig", errors="replace")
+    try:
+        sep = csv.Sniffer().sniff(muestra.splitlines()[0] if muestra else ",", delimiters=",;\t").delimiter
+    except csv.Error:
+        sep = ","
+    yield from pd.read_csv(
+        archivo, sep=sep, dtype=str, keep_default_na=False, chunksize=chunk,
+        encoding="utf-8-sig", encoding_errors="replace", skipinitialspace=True,
+    )
+
+
+def parse_fechas(col: pd.Series) -> pd.Series:
+    # ISO primero; después con hora (las celdas fecha de un XLSX leídas como texto) y día/mes/año
+    # (formato local de los bancos)
+    s = col.astype(str).str.strip()
+    out = pd.to_datetime(s, format="%Y-%m-%d", errors="coerce")
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y"):
+        falta = out.isna()
+        if not falta.any():
+            break
+        out = out.fillna(pd.to_datetime(s.where(falta), format=fmt, errors="coerce"))
+    return out
+
+
+def signo_gastos(signos: Counter) -> int:
+    # Los gastos son la mayoría de las filas: la tarjeta los exporta en negativo, el banco en positivo
+    return -1 if signos[-1] > signos[1] else 1
+
+
+def normalizar(raw: pd.DataFrame, personas: list[str], base: str, pago_default: str, moneda_default: str,
+               tabla: TablaCambios, vistos: Counter, offset: int = 0,
+               signos: Counter | None = None) -> tuple[list[dict], list[str]]:
+    # Un bloque del archivo -> filas listas para storage.append y errores "fila N: motivo".
+    # signos: cuántos montos negativos / positivos traía el primer bloque (se completa acá si está
+    # vacío); con el signo de la mayoría son gastos, los del signo opuesto (reintegros, pagos de
+    # la tarjeta) no se importan.
+    df = raw.rename(columns=mapear_columnas(raw.columns, personas))
+    n = len(df)
+
+    def texto(col, default=""):
+        return df[col].astype(str).str.strip() if col in df.columns else pd.Series(default, index=df.index)
+
+    fechas = parse_fechas(texto("fecha"))
+    concepto = texto("concepto")
+    pago = texto("pago").mask(lambda s: s == "", pago_default)
+    moneda = texto("moneda").str.upper().mask(lambda s: s == "", moneda_default)
+    monto = to_num_series(texto("monto")).to_numpy(dtype=float)
+    signos = Counter() if signos is None else signos
+    if not any(signos.values()):
+        signos.update({-1: int((monto < 0).sum()), 1: int((monto > 0).sum())})
+    monto = monto * signo_gastos(signos)
+
+    cambio = np.full(n, np.nan)
+    if "cambio_a_base" in df.columns:
+        cambio = to_num_series(texto("cambio_a_base")).to_numpy(dtype=float, copy=True)
+        cambio[cambio <= 0] = np.nan
+    sin_cambio = np.isnan(cambio)
+    if sin_cambio.any():
+        dias = fechas.fillna(pd.Timestamp.today().normalize()).to_numpy(dtype="datetime64[D]")
+        cambio[sin_cambio] = tabla.tasas(moneda.to_numpy(dtype=object)[sin_cambio], base, dias[sin_cambio])
+
+    # Se informa la primera regla que falla, en el mismo orden que el formulario
+    motivo = np.full(n, "", dtype=object)
+    reglas = [
+        (fechas.isna().to_numpy(), "fecha inválida"),
+        ((concepto == "").to_numpy(), "falta concepto"),
+        (monto < 0, "signo opuesto a los gastos (reintegro o pago), no se importa"),
+        (~(monto > 0), "monto inválido"),
+        (np.isnan(cambio), f"sin cotización a {base}"),
+        (~pago.isin(personas).to_numpy(), "pagó desconocido"),
+    ]
+    for malo, texto_error in reglas:
+        motivo[malo & (motivo == "")] = texto_error
+    ok = motivo == ""
+    errores = [f"fila {offset + i + 2}: {m}" for i, m in enumerate(motivo) if m]
+
+    base_c = a_centavos(monto * cambio)  # normalize_currency, por columnas
+    monto_base = de_centavos(base_c)
+    out = pd.DataFrame({
+        "fecha": fechas.dt.strftime("%Y-%m-%d"),
+        "concepto": concepto,
+        "pago": pago,
+        "monto": monto,
+        "moneda": moneda,
+        "cambio_a_base": cambio,
+        "monto_base": monto_base,
+    })[ok]
+
+    # División personalizada si el archivo trae columnas por persona; si no (o todo en 0), igual
+    con_partes = [p for p in personas if p in df.columns]
+    partes = np.zeros((n, len(personas)))
+    for j, p in enumerate(personas):
+        if p in con_partes:
+            partes[:, j] = to_num_series(texto(p)).abs().to_numpy() * cambio
+    # en centavos, cuadradas con monto_base; las iguales por mayor resto
+    partes_c = cuadrar_partes(base_c, a_centavos(partes))
+    iguales = partes_c.sum(axis=1) == 0
+    partes_c[iguales] = repartir(base_c[iguales], np.ones((int(iguales.sum()), len(personas))))
+    for j, p in enumerate(personas):
+        out[p] = de_centavos(partes_c[ok, j])
+
+    if "id" in df.columns and (texto("id") != "").all():
+        out.insert(0, "id", texto("id")[ok])
+    else:
+        ids = []
+        for f, c, m, mon, pg in zip(out["fecha"], out["concepto"], out["monto"], out["moneda"], out["pago"]):
+            clave = f"{f}|{c}|{m:.2f}|{mon}|{pg}"
+            vistos[clave] += 1
+            ids.append(str(uuid.uuid5(NAMESPACE, f"{clave}|{vistos[clave]}")))
+        out.insert(0, "id", ids)
+
+    return out[BASE_COLS + personas].to_dict("records"), errores
+
+
+def importar_gastos(archivo, nombre: str, storage, personas: list[str], base: str, pago_default: str,
+                    moneda_default: str, tabla: TablaCambios | None = None, chunk: int = IMPORT_CHUNK,
+                    progreso=None) -> dict:
+    # progreso(filas_leidas) se llama después de cada bloque
+    tabla = tabla or TablaCambios()
+    existentes = set(storage.ids())
+    vistos = Counter()
+    signos = Counter()
+    resumen = {"leidas": 0, "importadas": 0, "duplicadas": 0, "errores": []}
+
+    for raw in leer_archivo(archivo, nombre, chunk):
+        rows, errores = normalizar(raw, personas, base, pago_default, moneda_default, tabla, vistos,
+                                   offset=resumen["leidas"], signos=signos)
+        nuevas = [r for r in rows if r["id"] not in existentes]
+        if nuevas:
+            storage.append(nuevas, personas)
+            existentes.update(r["id"] for r in nuevas)
+
+        resumen["leidas"] += len(raw)
+        resumen["importadas"] += len(nuevas)
+        resumen["duplicadas"] += len(rows) - len(nuevas)
+        resumen["errores"].extend(errores)
+        if progreso is not None:
+            progreso(resumen["leidas"])
+    return resumen
+
+
+def plantilla_csv(personas: list[str]) -> bytes:
+    # Ejemplo para descargar: columnas que entiende el importador
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    w.writerow(["fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base"] + personas)
+    w.writerow(["2026-03-01", "Cena", personas[0] if personas else "", "120", "USD", "", *([""] * len(personas))])
+    return buf.getvalue().encode("utf-8")
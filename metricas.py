@@ -0,0 +1,217 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# -------------------------
+# Métricas
+# -------------------------
+# Cuánto cuesta cada rerun: llamadas a la API de Sheets (cantidad, latencia, errores) y tiempo
+# por etapa (load, parse, balances, settle, render, pdf).
+#   - METRICAS acumula todo el proceso (todas las sesiones y los hilos de fondo).
+#   - Corrida junta lo de un rerun; etapa() y las llamadas la encuentran por contextvar,
+#     así sheets/storage/reportes no necesitan saber de Streamlit.
+# Logs estructurados (una línea JSON por evento) en el logger "gastos.metricas":
+# DEBUG por llamada a la API, INFO por rerun.
+
+log = logging.getLogger("gastos.metricas")
+
+BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")]
+
+
+class Histograma:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        i = next(i for i, b in enumerate(BUCKETS_MS) if ms <= b)
+        self.counts[i] += 1
+        self.n += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentil(self, q: float) -> float:
+        # cota superior del bucket donde cae el percentil (el último bucket se reporta con el máximo)
+        if not self.n:
+            return 0.0
+        acum = 0
+        for b, c in zip(BUCKETS_MS, self.counts):
+            acum += c
+            if acum >= q * self.n:
+                return min(b, self.max_ms)
+        return self.max_ms
+
+    def resumen(self) -> dict:
+        return {
+            "n": self.n,
+            "ms_total": round(self.total_ms, 1),
+            "ms_prom": round(self.total_ms / self.n, 1) if self.n else 0.0,
+            "p50": round(self.percentil(0.5), 1),
+            "p95": round(self.percentil(0.95), 1),
+            "max": round(self.max_ms, 1),
+        }
+
+
+class Metricas:
+    def __init__(self):
+        self.api = {}      # método -> Histograma
+        self.errores = {}  # método -> {tipo de error: cantidad}
+        self.etapas = {}   # etapa -> Histograma
+        self._ultimo_minuto = deque()
+        self._lock = threading.Lock()
+
+    def registrar_api(self, metodo: str, ms: float, error: str | None = None):
+        ahora = time.monotonic()
+        with self._lock:
+            self.api.setdefault(metodo, Histograma()).add(ms)
+            if error:
+                errs = self.errores.setdefault(metodo, {})
+                errs[error] = errs.get(error, 0) + 1
+            self._ultimo_minuto.append(ahora)
+            while self._ultimo_minuto and ahora - self._ultimo_minuto[0] > 60:
+                self._ultimo_minuto.popleft()
+
+    def registrar_etapa(self, nombre: str, ms: float):
+        with self._lock:
+            self.etapas.setdefault(nombre, Histograma()).add(ms)
+
+    def por_minuto(self) -> int:
+        # llamadas a la API en los últimos 60 s (la cuota de Sheets es por minuto)
+        with self._lock:
+            ahora = time.monotonic()
+            return sum(1 for t in self._ultimo_minuto if ahora - t <= 60)
+
+    def resumen(self) -> dict:
+        with self._lock:
+            return {
+                "api": {m: {**h.resumen(), "errores": dict(self.errores.get(m, {}))} for m, h in self.api.items()},
+                "etapas": {e: h.resumen() for e, h in self.etapas.items()},
+            }
+
+
+METRICAS = Metricas()
+
+
+class Corrida:
+    # Un rerun: ms por etapa (total y propio, sin las etapas anidadas) y llamadas a la API
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = {}  # nombre -> [ms total, ms propio, veces]
+        self.api = {}     # método -> [llamadas, ms, errores]
+        self._pila = []   # [nombre, ms de etapas hijas]
+        self.ms = None
+
+    def entrar(self, nombre: str):
+        self._pila.append([nombre, 0.0])
+
+    def salir(self, ms: float):
+        nombre, hijos = self._pila.pop()
+        e = self.etapas.setdefault(nombre, [0.0, 0.0, 0])
+        e[0] += ms
+        e[1] += ms - hijos
+        e[2] += 1
+        if self._pila:
+            self._pila[-1][1] += ms
+
+    def llamada(self, metodo: str, ms: float, error: str | None):
+        a = self.api.setdefault(metodo, [0, 0.0, 0])
+        a[0] += 1
+        a[1] += ms
+        a[2] += bool(error)
+
+    def terminar(self) -> dict:
+        self.ms = (time.perf_counter() - self.inicio) * 1000
+        evento = {
+            "evento": "rerun",
+            "ms": round(self.ms, 1),
+            "etapas": {k: {"ms": round(v[0], 1), "propio_ms": round(v[1], 1), "veces": v[2]}
+                       for k, v in self.etapas.items()},
+            "api": {k: {"llamadas": v[0], "ms": round(v[1], 1), "errores": v[2]} for k, v in self.api.items()},
+        }
+        log.info(json.dumps(evento, ensure_ascii=False))
+        return evento
+
+
+_corrida = contextvars.ContextVar("corrida", default=None)
+
+
+def iniciar_corrida() -> Corrida:
+    c = Corrida()
+    _corrida.set(c)
+    return c
+
+
+def corrida_actual() -> Corrida | None:
+    return _corrida.get()
+
+
+@contextmanager
+def etapa(nombre: str):
+    c = _corrida.get()
+    if c is not None:
+        c.entrar(nombre)
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        METRICAS.registrar_etapa(nombre, ms)
+        if c is not None:
+            c.salir(ms)
+
+
+@contextmanager
+def llamada_api(metodo: str):
+    t = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        ms = (time.perf_counter() - t) * 1000
+        METRICAS.registrar_api(metodo, ms, error)
+        c = _corrida.get()
+        if c is not None:
+            c.llamada(metodo, ms, error)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(json.dumps({"evento": "api", "metodo": metodo, "ms": round(ms, 1), "error": error}))
+
+
+class WorksheetMedida:
+    # Envuelve un gspread.Worksheet (o la FakeWorksheet de bench/): cada método público que se
+    # llama cuenta como una llamada a la API. Los atributos que no son métodos pasan directo.
+
+    def __init__(self, ws):
+        self._ws = ws
+
+    def __getattr__(self, name):
+        attr = getattr(self._ws, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def medido(*args, **kwargs):
+            with llamada_api(name):
+                return attr(*args, **kwargs)
+
+        return medido
+
+
+def configurar_logs(nivel: str | None):
+    # Manda los eventos a stderr (una línea JSON cada uno) si se pide un nivel en secrets
+    if not nivel:
+        return
+    log.setLevel(nivel.upper())
+    if not log.handlers:
+        h = logging.StreamHandler()
+        h.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(h)
+        log.propagate = False
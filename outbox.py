@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+
+
+# -------------------------
+# Outbox local de gastos
+# -------------------------
+class Outbox:
+    # Cola durable (JSONL append-only) de filas a escribir en la Sheet.
+    # Cada submit se guarda en disco al instante; un hilo en segundo plano las sube en lote.
+    #   {"op": "add", "row": {...}, "dest": [spreadsheet_id, worksheet]}  -> gasto pendiente
+    #   {"op": "done", "ids": [...]}                                      -> ya está en la Sheet (archivos viejos;
+    #                                                                        hoy mark_done reescribe el archivo)
+    #   {"op": "failed", "id": ..., "error": "..."}                       -> en cuarentena
+    # Un error de datos (ValueError, ej. falta la columna de una persona) no se arregla reintentando:
+    # esa fila queda en cuarentena, fuera del lote, hasta que alguien la reintente o la descarte.
+    # Cada mark_done reescribe el archivo con lo que sigue pendiente o en cuarentena: no crece sin fin.
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pending = {}
+        self._fallidos = {}  # id -> (dest, row, error)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.last_error = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # última línea cortada por un corte de luz: se ignora
+                    continue
+                if rec.get("op") == "add":
+                    dest = tuple(rec["dest"]) if rec.get("dest") else None
+                    self._pending[rec["row"]["id"]] = (dest, rec["row"])
+                    self._fallidos.pop(rec["row"]["id"], None)
+                elif rec.get("op") == "done":
+                    for id_ in rec["ids"]:
+                        self._pending.pop(id_, None)
+                        self._fallidos.pop(id_, None)
+                elif rec.get("op") == "failed" and rec["id"] in self._pending:
+                    dest, row = self._pending.pop(rec["id"])
+                    self._fallidos[rec["id"]] = (dest, row, rec.get("error", ""))
+
+    def _compactar(self):
+        # Con self._lock tomado. Archivo nuevo al lado y os.replace: un corte a mitad deja el anterior
+        recs = [{"op": "add", "row": row, "dest": list(dest) if dest else None}
+                for dest, row in self._pending.values()]
+        for id_, (dest, row, error) in self._fallidos.items():
+            recs.append({"op": "add", "row": row, "dest": list(dest) if dest else None})
+            recs.append({"op": "failed", "id": id_, "error": error})
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(rec, ensure_ascii=False) + "\n" for rec in recs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _write(self, rec: dict):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def add(self, row: dict, dest: tuple[str, str] | None = None):
+        # dest: (spreadsheet_id, worksheet) del viaje; None = la hoja por defecto
+        with self._lock:
+            self._write({"op": "add", "row": row, "dest": list(dest) if dest else None})
+            self._pending[row["id"]] = (dest, row)
+        self._wake.set()
+
+    def pending(self) -> list[dict]:
+        with self._lock:
+            return [row for _, row in self._pending.values()]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def fallidos(self) -> list[tuple[dict, str]]:
+        with self._lock:
+            return [(row, error) for _, row, error in self._fallidos.values()]
+
+    def mark_done(self, ids: list[str]):
+        with self._lock:
+            for id_ in ids:
+                self._pending.pop(id_, None)
+                self._fallidos.pop(id_, None)
+            self._compactar()
+
+    def _cuarentena(self, id_: str, error: Exception):
+        with self._lock:
+            dest, row = self._pending.pop(id_)
+            self._write({"op": "failed", "id": id_, "error": str(error)})
+            self._fallidos[id_] = (dest, row, str(error))
+
+    def reintentar(self, id_: str) -> bool:
+        # Vuelve a la cola una fila en cuarentena (ej. después de agregar la columna que faltaba)
+        with self._lock:
+            if id_ not in self._fallidos:
+                return False
+            dest, row, _ = self._fallidos.pop(id_)
+        self.add(row, dest)
+        return True
+
+    def descartar(self, id_: str) -> bool:
+        if id_ not in self._fallidos:
+            return False
+        self.mark_done([id_])
+        return True
+
+    def cancel(self, id_: str) -> bool:
+        # Deshacer antes de que se suba: si todavía está pendiente, no llega a la Sheet.
+        # Espera a que termine un flush en curso, así no cancela algo que ya se está escribiendo.
+        with self._flush_lock:
+            if id_ not in self._pending:
+                return False
+            self.mark_done([id_])
+            return True
+
+    def flush(self, push, on_flush=None) -> list:
+        # push(dest, rows) escribe en la Sheet; el dedup por id lo hace idempotente si se repite.
+        # Un lote por hoja destino; devuelve las hojas que se actualizaron (y llama on_flush(dest)).
+        # Si una hoja falla (red, cuota) se sigue con las demás y al final se relanza el primer error.
+        with self._flush_lock:
+            with self._lock:
+                por_dest = {}
+                for dest, row in self._pending.values():
+                    por_dest.setdefault(dest, []).append(row)
+
+            hechos = []
+            error = None
+            for dest, rows in por_dest.items():
+                try:
+                    try:
+                        push(dest, rows)
+                    except ValueError:
+                        # Error de datos: de a una fila, para que una mala no trabe a las demás
+                        if not self._push_de_a_una(push, dest, rows):
+                            continue
+                    else:
+                        self.mark_done([r["id"] for r in rows])
+                except Exception as e:
+                    error = error or e
+                    continue
+                hechos.append(dest)
+                if on_flush is not None:
+                    on_flush(dest)
+            if error is not None:
+                raise error
+            return hechos
+
+    def _push_de_a_una(self, push, dest, rows) -> bool:
+        # Las que fallan con ValueError van a cuarentena; otro error (red, cuota) corta y queda pendiente
+        subidas = []
+        try:
+            for row in rows:
+                try:
+                    push(dest, [row])
+                except ValueError as e:
+                    self._cuarentena(row["id"], e)
+                else:
+                    subidas.append(row["id"])
+        finally:
+            if subidas:
+                self.mark_done(subidas)
+        return bool(subidas)
+
+    def start(self, push, on_flush=None, interval: float = 5.0, max_backoff: float = 300.0):
+        if self._thread is not None:
+            return
+
+        def run():
+            backoff = interval
+            while True:
+                self._wake.wait(timeout=backoff)
+                self._wake.clear()
+                try:
+                    self.flush(push, on_flush)
+                except Exception as e:
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    backoff = min(backoff * 2, max_backoff)
+                    continue
+                self.last_error = None
+                backoff = interval
+
+        self._thread = threading.Thread(target=run, name="outbox-flusher", daemon=True)
+        self._thread.start()
+        self._wake.set()
@@ -0,0 +1,109 @@
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from saldos import Ledger, a_centavos, cuadrar_partes, de_centavos, descuadradas
+
+
+# -------------------------
+# Partes en formato largo
+# -------------------------
+# Para grupos grandes: en vez de una columna por persona (casi todas en 0) se guarda una fila por
+# parte distinta de cero, (id, persona, monto_base), en una tabla/hoja aparte.
+# Los consumos salen de un solo groupby por persona; la tabla ancha (una columna por persona) se
+# arma con un scatter sólo al cargar, para el detalle, los PDFs y la edición.
+#
+# En Sheets la hoja de partes es sólo de agregar: editar un gasto escribe sus partes otra vez con
+# un `lote` nuevo y vale el último lote de cada id; las partes de gastos borrados se ignoran.
+# compactar() la reescribe sin lo que ya no vale.
+
+PARTES_COLS = ["id", "persona", "monto_base", "lote"]
+
+
+def nuevo_lote() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def filas_partes(rows: list[dict], personas: list[str], lote: str) -> list[list]:
+    # Filas (id, persona, monto_base, lote) de las partes distintas de cero
+    out = []
+    for row in rows:
+        for p in personas:
+            v = float(row.get(p) or 0.0)
+            if v:
+                out.append([row["id"], p, v, lote])
+    return out
+
+
+def df_a_largo(df: pd.DataFrame, personas: list[str], lote: str = "migracion") -> pd.DataFrame:
+    # Migración: columnas por persona -> una fila por parte distinta de cero.
+    # Las partes se escriben al centavo y cuadradas con su monto_base (ver saldos.cuadrar_partes).
+    presentes = [p for p in personas if p in df.columns]
+    if df.empty or not presentes:
+        return pd.DataFrame(columns=PARTES_COLS)
+    m = cuadrar_partes(a_centavos(df["monto_base"]), a_centavos(df[presentes].to_numpy(dtype=float)))
+    fila, col = np.nonzero(m)
+    return pd.DataFrame({
+        "id": df["id"].to_numpy()[fila],
+        "persona": np.asarray(presentes, dtype=object)[col],
+        "monto_base": de_centavos(m[fila, col]),
+        "lote": lote,
+    })
+
+
+def vigentes(partes: pd.DataFrame, ids) -> pd.DataFrame:
+    # Último lote de cada id, sólo de gastos que siguen existiendo
+    if partes is None or partes.empty:
+        return pd.DataFrame(columns=PARTES_COLS)
+    existe = pd.Index(pd.unique(np.asarray(ids, dtype=object))).get_indexer(partes["id"].to_numpy(dtype=object)) >= 0
+    partes = partes[existe]
+    if "lote" in partes.columns and len(partes):
+        ultimo = partes.groupby("id", sort=False)["lote"].transform("last")
+        partes = partes[partes["lote"] == ultimo]
+    return partes
+
+
+def a_ancho(df: pd.DataFrame, partes: pd.DataFrame, personas: list[str]) -> pd.DataFrame:
+    # Una columna por persona, sumando las partes de cada gasto (scatter, sin pivot)
+    m = np.zeros((len(df), len(personas)))
+    if partes is not None and len(partes) and len(df):
+        fila = pd.Index(df["id"].to_numpy(dtype=object)).get_indexer(partes["id"].to_numpy(dtype=object))
+        col = pd.Index(personas).get_indexer(partes["persona"].to_numpy(dtype=object))
+        ok = (fila >= 0) & (col >= 0)
+        np.add.at(m, (fila[ok], col[ok]), partes["monto_base"].to_numpy(dtype=float)[ok])
+    # todas las columnas de una vez (insertarlas de a una copia el bloque cada vez)
+    resto = df[[c for c in df.columns if c not in personas]]
+    return pd.concat([resto, pd.DataFrame(m, columns=personas, index=df.index)], axis=1)
+
+
+def consumos(partes: pd.DataFrame) -> pd.Series:
+    # Centavos por persona
+    if partes is None or partes.empty:
+        return pd.Series(dtype=np.int64)
+    return pd.Series(a_centavos(partes["monto_base"]), index=partes.index).groupby(
+        partes["persona"].to_numpy(dtype=object), sort=False).sum()
+
+
+def ledger_largo(df: pd.DataFrame, partes: pd.DataFrame, personas: list[str]) -> Ledger:
+    # Pagó por groupby de `pago` sobre los gastos; consumió por groupby de `persona` sobre las partes
+    base = df[[c for c in df.columns if c not in personas]] if df is not None else df
+    if partes is not None and len(partes) and _hay_descuadre(base, partes):
+        # partes viejas que no suman su monto por redondeo: se cuadran sobre la tabla ancha
+        return Ledger.from_df(a_ancho(base, partes, personas), personas)
+    ledger = Ledger.from_df(base, personas)
+    sumas = consumos(partes)
+    for i, p in enumerate(ledger.personas):
+        ledger.consumido_c[i] = int(sumas.get(p, 0))
+    return ledger
+
+
+def _hay_descuadre(df: pd.DataFrame, partes: pd.DataFrame) -> bool:
+    codigos, ids = pd.factorize(partes["id"].to_numpy(dtype=object))
+    pc = a_centavos(partes["monto_base"])
+    suma = np.zeros(len(ids), dtype=np.int64)
+    np.add.at(suma, codigos, pc)
+    k = np.bincount(codigos, weights=pc != 0, minlength=len(ids)).astype(np.int64)
+    base_c = pd.Series(a_centavos(df["monto_base"]), index=df["id"].to_numpy(dtype=object))
+    base_c = base_c[~base_c.index.duplicated()].reindex(ids, fill_value=0).to_numpy(dtype=np.int64)
+    return bool(descuadradas(base_c, suma, k).any())
@@ -0,0 +1,578 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm, inch
+from reportlab.platypus import Flowable, SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+
+from analitica import Cubo
+from metricas import etapa
+from saldos import Ledger, settle
+
+# Filas por tabla del detalle: cada bloque entra en una página A4 y repite el header.
+# Con 0 se arma una sola tabla gigante (como antes), útil para comparar en bench/bench_pdf.py.
+DETALLE_CHUNK = 40
+
+
+# -------------------------
+# Contexto de render
+# -------------------------
+# Fuente TTF con acentos (y lo que cubra de símbolos): la primera que exista.
+# GASTOS_PDF_FONT permite apuntar a otra; si no, la DejaVu del sistema, que en Streamlit Cloud /
+# devcontainer sale de packages.txt (fonts-dejavu-core). No se incluye ninguna fuente en el repo.
+# Si no hay ninguna se usa Helvetica, que cubre Latin-1 (acentos y ñ).
+# Los emoji se sacan a propósito (PdfContext.texto): DejaVu no los tiene y reportlab no dibuja
+# fuentes de emoji a color, así que de otro modo saldrían como cuadrados.
+FUENTES_TTF = [
+    os.environ.get("GASTOS_PDF_FONT", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+]
+
+
+class PdfContext:
+    # Todo lo que no depende de los datos: fuentes registradas, hoja de estilos y TableStyles.
+    # Se arma una vez por proceso (contexto_pdf) y lo comparten todos los reportes;
+    # nadie lo modifica después de construido, así que se puede usar desde el hilo de ReportCache.
+
+    def __init__(self, fuentes_ttf: list[str] = FUENTES_TTF):
+        self.fuente, self.fuente_bold, self._glifos = self._registrar(fuentes_ttf)
+
+        self.styles = getSampleStyleSheet()
+        for nombre in ["Normal", "BodyText", "Title", "Heading1", "Heading2"]:
+            estilo = self.styles[nombre]
+            estilo.fontName = self.fuente_bold if estilo.fontName.endswith("Bold") else self.fuente
+
+        grilla = [
+            ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
+            ("FONTNAME", (0,0), (-1,-1), self.fuente),
+            ("FONTNAME", (0,0), (-1,0), self.fuente_bold),
+            ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
+            ("ROWBACKGROUNDS", (0,1), (-1,-1), [colors.whitesmoke, colors.white]),
+        ]
+        self.tabla_resumen = TableStyle([
+            ("GRID", (0,0), (-1,-1), 0.25, colors.grey),
+            ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
+            ("FONTNAME", (0,0), (-1,-1), self.fuente),
+            ("FONTSIZE", (0,0), (-1,-1), 10),
+            ("PADDING", (0,0), (-1,-1), 6),
+        ])
+        # pagó/consumió/balance y transferencias comparten estilo
+        self.tabla_saldos = TableStyle(grilla + [
+            ("FONTSIZE", (0,0), (-1,0), 9),
+            ("FONTSIZE", (0,1), (-1,-1), 9),
+            ("PADDING", (0,0), (-1,-1), 4),
+        ])
+        self.tabla_detalle_ejecutivo = TableStyle(grilla + [
+            ("FONTSIZE", (0,0), (-1,0), 8),
+            ("FONTSIZE", (0,1), (-1,-1), 7),
+            ("VALIGN", (0,0), (-1,-1), "TOP"),
+            ("PADDING", (0,0), (-1,-1), 3),
+        ])
+        self.tabla_detalle_gastos = TableStyle(grilla + [
+            ("TEXTCOLOR", (0,0), (-1,0), colors.black),
+            ("FONTSIZE", (0,0), (-1,0), 9),
+            ("FONTSIZE", (0,1), (-1,-1), 8),
+            ("VALIGN", (0,0), (-1,-1), "TOP"),
+        ])
+
+    @staticmethod
+    def _registrar(fuentes_ttf):
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont, TTFError
+
+        for path in fuentes_ttf:
+            if not path or not os.path.exists(path):
+                continue
+            try:
+                normal = TTFont("GastosSans", path)
+            except TTFError:
+                continue
+            pdfmetrics.registerFont(normal)
+            bold = "GastosSans"
+            path_bold = path.replace(".ttf", "-Bold.ttf")
+            if os.path.exists(path_bold):
+                try:
+                    pdfmetrics.registerFont(TTFont("GastosSans-Bold", path_bold))
+                    bold = "GastosSans-Bold"
+                except TTFError:
+                    pass
+            pdfmetrics.registerFontFamily("GastosSans", normal="GastosSans", bold=bold,
+                                          italic="GastosSans", boldItalic=bold)
+            return "GastosSans", bold, set(normal.face.charToGlyph)
+        return "Helvetica", "Helvetica-Bold", None
+
+    def texto(self, s: str) -> str:
+        # Saca los caracteres que la fuente no tiene (p.ej. el emoji de "📋 Gastos cargados"),
+        # que si no salen como cuadrados negros en el PDF
+        if self._glifos is None:
+            limpio = s.encode("cp1252", "ignore").decode("cp1252")
+        else:
+            limpio = "".join(c for c in s if ord(c) in self._glifos)
+        return limpio.strip() if limpio != s else s
+
+
+_contexto = None
+_contexto_lock = threading.Lock()
+
+
+def contexto_pdf() -> PdfContext:
+    global _contexto
+    if _contexto is None:
+        with _contexto_lock:
+            if _contexto is None:
+                _contexto = PdfContext()
+    return _contexto
+
+
+def _detalle(df: pd.DataFrame, cols: list[str], personas: list[str]) -> pd.DataFrame:
+    detalle = df[cols].copy()
+    for c in ["monto", "cambio_a_base", "monto_base"] + [p for p in personas if p in detalle.columns]:
+        if c in detalle.columns:
+            detalle[c] = pd.to_numeric(detalle[c], errors="coerce").fillna(0.0).round(2)
+    return detalle
+
+
+def filas_detalle(df: pd.DataFrame, cols: list[str], personas: list[str], chunk: int):
+    # Genera el detalle de a bloques de `chunk` filas ya convertidas a texto,
+    # sin materializar toda la tabla como lista de listas
+    detalle = _detalle(df, cols, personas)
+    if detalle.empty:
+        yield []
+        return
+    chunk = chunk or len(detalle)
+    for start in range(0, len(detalle), chunk):
+        yield detalle.iloc[start:start + chunk].astype(str).values.tolist()
+
+
+class TablaDiferida(Flowable):
+    # Un bloque del detalle que arma su Table recién cuando reportlab lo ubica en la página.
+    # doc.build va sacando los flowables de la lista a medida que los dibuja, así que en memoria
+    # hay una Table de bloque por vez (más el DataFrame del detalle), no todas juntas.
+    hAlign = "CENTER"
+
+    def __init__(self, armar):
+        super().__init__()
+        self._armar = armar
+        self._tabla = None
+
+    def tabla(self) -> Table:
+        if self._tabla is None:
+            self._tabla = self._armar()
+        return self._tabla
+
+    def wrapOn(self, canv, aW, aH):
+        return self.tabla().wrapOn(canv, aW, aH)
+
+    def wrap(self, aW, aH):
+        return self.tabla().wrap(aW, aH)
+
+    def splitOn(self, canv, aW, aH):
+        return self.tabla().splitOn(canv, aW, aH)
+
+    def split(self, aW, aH):
+        return self.tabla().split(aW, aH)
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        self.tabla().drawOn(canvas, x, y, _sW)
+
+    def getSpaceBefore(self):
+        return self.tabla().getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self.tabla().getSpaceAfter()
+
+
+def tablas_detalle(df: pd.DataFrame, cols: list[str], personas: list[str], style: TableStyle,
+                   chunk: int = DETALLE_CHUNK) -> list:
+    # Una Table por bloque, cada una con su header: reportlab no tiene que partir una tabla enorme.
+    # Con chunk=0, una sola Table armada de entrada (como antes, para comparar).
+    detalle = _detalle(df, cols, personas)
+    if detalle.empty or not chunk:
+        return [Table([cols] + filas, repeatRows=1, style=style) for filas in filas_detalle(df, cols, personas, chunk)]
+
+    def bloque(start):
+        return lambda: Table([cols] + detalle.iloc[start:start + chunk].astype(str).values.tolist(),
+                             repeatRows=1, style=style)
+
+    return [TablaDiferida(bloque(start)) for start in range(0, len(detalle), chunk)]
+
+
+# -------------------------
+# Gráficos del informe ejecutivo
+# -------------------------
+# Salen del Cubo (sumas por día / pagó / moneda), no de las filas: el costo no crece con el viaje.
+PALETA = [colors.HexColor(c) for c in ["#4C78A8", "#F58518", "#54A24B", "#E45756", "#72B7B2", "#EECA3B", "#B279A2"]]
+MAX_ETIQUETAS = 12
+
+
+def _chart_por_dia(ctx: PdfContext, por_dia: pd.Series, ancho: float, alto: float):
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.shapes import Drawing
+
+    d = Drawing(ancho, alto)
+    bc = VerticalBarChart()
+    bc.x, bc.y, bc.width, bc.height = 45, 25, ancho - 60, alto - 35
+    bc.data = [[float(v) for v in por_dia.to_numpy()]]
+    # una etiqueta cada tantos días para que no se pisen
+    paso = max(1, -(-len(por_dia) // MAX_ETIQUETAS))
+    bc.categoryAxis.categoryNames = [
+        f.strftime("%d/%m") if i % paso == 0 else "" for i, f in enumerate(por_dia.index)
+    ]
+    bc.categoryAxis.labels.fontName = ctx.fuente
+    bc.categoryAxis.labels.fontSize = 6
+    bc.valueAxis.labels.fontName = ctx.fuente
+    bc.valueAxis.labels.fontSize = 7
+    bc.valueAxis.valueMin = 0
+    bc.bars[0].fillColor = PALETA[0]
+    bc.bars[0].strokeColor = None
+    d.add(bc)
+    return d
+
+
+def _chart_por_pago(ctx: PdfContext, por_pago: pd.Series, ancho: float):
+    from reportlab.graphics.charts.barcharts import HorizontalBarChart
+    from reportlab.graphics.shapes import Drawing
+
+    alto = 30 + 16 * len(por_pago)
+    d = Drawing(ancho, alto)
+    bc = HorizontalBarChart()
+    bc.x, bc.y, bc.width, bc.height = 80, 15, ancho - 100, alto - 25
+    # de mayor a menor, de arriba hacia abajo
+    bc.data = [[float(v) for v in por_pago.to_numpy()[::-1]]]
+    bc.categoryAxis.categoryNames = [ctx.texto(str(p)) for p in por_pago.index[::-1]]
+    bc.categoryAxis.labels.fontName = ctx.fuente
+    bc.categoryAxis.labels.fontSize = 8
+    bc.valueAxis.labels.fontName = ctx.fuente
+    bc.valueAxis.labels.fontSize = 7
+    bc.valueAxis.valueMin = 0
+    bc.bars[0].fillColor = PALETA[1]
+    bc.bars[0].strokeColor = None
+    d.add(bc)
+    return d
+
+
+def _chart_monedas(ctx: PdfContext, monedas: pd.DataFrame, ancho: float, alto: float):
+    from reportlab.graphics.charts.piecharts import Pie
+    from reportlab.graphics.shapes import Drawing
+
+    d = Drawing(ancho, alto)
+    pie = Pie()
+    pie.x, pie.y = 20, 10
+    pie.width = pie.height = alto - 20
+    pie.data = [max(float(v), 0.0) for v in monedas["En base"]]
+    pie.labels = [f"{m} {p:.0f}%" for m, p in zip(monedas["Moneda"], monedas["%"])]
+    pie.simpleLabels = 1
+    pie.slices.fontName = ctx.fuente
+    pie.slices.fontSize = 8
+    pie.slices.strokeColor = colors.white
+    for i in range(len(pie.data)):
+        pie.slices[i].fillColor = PALETA[i % len(PALETA)]
+    d.add(pie)
+    return d
+
+
+def graficos_ejecutivo(ctx: PdfContext, cubo: Cubo, fmt_money) -> list:
+    styles = ctx.styles
+    elements = [Paragraph("Gráficos", styles["Heading2"]), Spacer(1, 6)]
+    ancho = A4[0] - 2.4 * cm
+
+    por_dia = cubo.por_dia()
+    if len(por_dia):
+        r = cubo.ritmo()
+        elements.append(Paragraph(ctx.texto(
+            f"Gasto por día: {fmt_money(r['promedio'])} en promedio en {r['dias']} días; "
+            f"pico de {fmt_money(r['pico'])} el {r['dia_pico'].strftime('%d/%m/%Y')}."
+        ), styles["Normal"]))
+        elements.append(_chart_por_dia(ctx, por_dia, ancho, 150))
+        elements.append(Spacer(1, 10))
+
+    por_pago = cubo.por_pago()
+    if len(por_pago):
+        elements.append(Paragraph("Pagado por cada uno", styles["Normal"]))
+        elements.append(_chart_por_pago(ctx, por_pago, ancho))
+        elements.append(Spacer(1, 10))
+
+    monedas = cubo.monedas()
+    if len(monedas) and monedas["En base"].sum() > 0:
+        elements.append(Paragraph("Mezcla de monedas (en la base)", styles["Normal"]))
+        elements.append(_chart_monedas(ctx, monedas, ancho, 130))
+    return elements
+
+
+def generar_pdf(df, balance, base_moneda):
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+    from reportlab.pdfbase import pdfmetrics
+
+    file_path = "resumen_viaje.pdf"
+    doc = SimpleDocTemplate(file_path)
+
+    elements = []
+
+    # Fuente compatible UTF-8 (se registra una sola vez por proceso)
+    if 'HYSMyeongJo-Medium' not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(UnicodeCIDFont('HYSMyeongJo-Medium'))
+
+    style = ParagraphStyle(
+        name='Normal',
+        fontName='HYSMyeongJo-Medium',
+        fontSize=12,
+    )
+
+    elements.append(Paragraph("Resumen de Gastos de Viaje", style))
+    elements.append(Spacer(1, 0.3 * inch))
+
+    # Tabla gastos
+    data = [["Fecha", "Concepto", "Pagó", "Monto Base"]]
+    for _, row in df.iterrows():
+        data.append([
+            row["fecha"],
+            row["concepto"],
+            row["pago"],
+            f"{row['monto_base']:.2f} {base_moneda}"
+        ])
+
+    table = Table(data)
+    elements.append(table)
+    elements.append(Spacer(1, 0.5 * inch))
+
+    # Tabla balances
+    data_balance = [["Persona", "Balance"]]
+    for persona, valor in balance.items():
+        data_balance.append([persona, f"{valor:.2f} {base_moneda}"])
+
+    table2 = Table(data_balance)
+    elements.append(table2)
+
+    doc.build(elements)
+
+    return file_path
+
+def generar_pdf_ejecutivo(df: pd.DataFrame, personas: list[str], simbolo="$", titulo="Viaje NYC – Amsterdam 2026", ledger=None,
+                          estrategia="greedy", chunk=DETALLE_CHUNK, cubo=None):
+    ctx = contexto_pdf()
+    styles = ctx.styles
+    if ledger is None:
+        ledger = Ledger.from_df(df, personas)
+    if cubo is None:
+        cubo = Cubo.from_df(df)
+
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    file_path = tmp.name
+    tmp.close()
+
+    doc = SimpleDocTemplate(
+        file_path,
+        pagesize=A4,
+        rightMargin=1.2*cm,
+        leftMargin=1.2*cm,
+        topMargin=1.2*cm,
+        bottomMargin=1.2*cm
+    )
+
+    def fmt_money(x):
+        try:
+            return f"{simbolo}{float(x):,.2f}"
+        except:
+            return f"{simbolo}0.00"
+
+    elements = []
+
+    # ===== ENCABEZADO EJECUTIVO (SIN PORTADA) =====
+    elements.append(Paragraph(ctx.texto(f"{titulo} — Informe Ejecutivo"), styles["Title"]))
+    elements.append(Spacer(1, 6))
+    elements.append(Paragraph(ctx.texto(f"Participantes: {', '.join(personas)}"), styles["Normal"]))
+    elements.append(Paragraph(f"Generado: {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles["Normal"]))
+    elements.append(Spacer(1, 12))
+
+    # ===== RESUMEN =====
+    elements.append(Paragraph("Resumen", styles["Heading1"]))
+    elements.append(Spacer(1, 6))
+
+    total_base = ledger.total
+    por_persona = total_base / len(personas) if personas else 0.0
+
+    resumen_tbl = Table([
+        ["Total (base)", fmt_money(total_base)],
+        ["Por persona (base)", fmt_money(por_persona)],
+        ["Cantidad de gastos", str(ledger.n)]
+    ], colWidths=[7*cm, 7*cm])
+    resumen_tbl.setStyle(ctx.tabla_resumen)
+    elements.append(resumen_tbl)
+    elements.append(Spacer(1, 14))
+
+    # ===== PAGÓ / CONSUMIÓ / BALANCE =====
+    elements.append(Paragraph("Pagó, consumió y balance", styles["Heading2"]))
+    elements.append(Spacer(1, 6))
+
+    pagos = ledger.pagado
+    consumos = ledger.consumido
+    balance = {p: pagos[p] - consumos[p] for p in personas}
+
+    pcb_rows = [["Persona", "Pagó", "Consumió", "Balance"]]
+    for p in personas:
+        pcb_rows.append([p, fmt_money(pagos.get(p, 0.0)), fmt_money(consumos.get(p, 0.0)), fmt_money(balance.get(p, 0.0))])
+
+    pcb_tbl = Table(pcb_rows, repeatRows=1, colWidths=[4*cm, 4*cm, 4*cm, 4*cm])
+    pcb_tbl.setStyle(ctx.tabla_saldos)
+    elements.append(pcb_tbl)
+    elements.append(Spacer(1, 14))
+
+    # ===== TRANSFERENCIAS =====
+    elements.append(Paragraph("Quién le transfiere a quién", styles["Heading2"]))
+    elements.append(Spacer(1, 6))
+
+    try:
+        balance_series = pd.Series(balance).sort_values(ascending=False)
+        tx = settle(balance_series, estrategia)  # debe devolver DataFrame
+    except Exception:
+        tx = pd.DataFrame()
+
+    if tx is None or tx.empty:
+        elements.append(Paragraph("No hay transferencias pendientes.", styles["Normal"]))
+    else:
+        tx_show = tx.copy()
+        if "Monto" in tx_show.columns:
+            tx_show["Monto"] = tx_show["Monto"].apply(fmt_money)
+
+        tx_rows = [list(tx_show.columns)] + tx_show.astype(str).values.tolist()
+        tx_tbl = Table(tx_rows, repeatRows=1)
+        tx_tbl.setStyle(ctx.tabla_saldos)
+        elements.append(tx_tbl)
+
+    # ===== GRÁFICOS =====
+    if cubo.n:
+        elements.append(Spacer(1, 14))
+        elements.extend(graficos_ejecutivo(ctx, cubo, fmt_money))
+
+    # ===== DETALLE (nueva página) =====
+    elements.append(PageBreak())
+    elements.append(Paragraph("Detalle de gastos", styles["Heading1"]))
+    elements.append(Spacer(1, 8))
+
+    cols = ["fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"] + personas
+    cols = [c for c in cols if c in df.columns]
+
+    elements.extend(tablas_detalle(df, cols, personas, ctx.tabla_detalle_ejecutivo, chunk=chunk))
+
+    doc.build(elements)
+    return file_path
+
+
+def generar_pdf_gastos(df: pd.DataFrame, personas: list[str], titulo="📋 Gastos cargados", chunk=DETALLE_CHUNK):
+    ctx = contexto_pdf()
+    styles = ctx.styles
+
+    # Archivo temporal
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
+    file_path = tmp.name
+    tmp.close()
+
+    doc = SimpleDocTemplate(
+        file_path,
+        pagesize=A4,
+        rightMargin=1.2*cm,
+        leftMargin=1.2*cm,
+        topMargin=1.2*cm,
+        bottomMargin=1.2*cm
+    )
+
+    elements = []
+    elements.append(Paragraph(ctx.texto(titulo), styles["Title"]))
+    elements.append(Spacer(1, 10))
+
+    # Columnas a mostrar
+    cols = ["fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"] + personas
+    cols = [c for c in cols if c in df.columns]
+
+    elements.extend(tablas_detalle(df, cols, personas, ctx.tabla_detalle_gastos, chunk=chunk))
+    elements.append(Spacer(1, 10))
+
+    # Totales (opcional)
+    if "monto_base" in df.columns:
+        total_base = float(pd.to_numeric(df["monto_base"], errors="coerce").fillna(0.0).sum())
+        elements.append(Paragraph(f"<b>Total (base):</b> {total_base:,.2f}", styles["Normal"]))
+
+    doc.build(elements)
+    return file_path
+
+
+# -------------------------
+# Cache de reportes
+# -------------------------
+class ReportCache:
+    # PDFs ya generados, por huella de los datos (filas del snapshot, personas, símbolo, título...).
+    # Se generan en un hilo aparte y se guardan como bytes; el archivo temporal se borra enseguida.
+    # LRU acotado por cantidad y por tamaño total.
+
+    GENERADORES = {"ejecutivo": generar_pdf_ejecutivo, "gastos": generar_pdf_gastos}
+
+    def __init__(self, max_items: int = 8, max_bytes: int = 64 * 1024 * 1024):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        # RLock: si el future ya terminó, el callback de _evict corre dentro de submit
+        self._lock = threading.RLock()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf")
+
+    @staticmethod
+    def fingerprint(kind: str, df: pd.DataFrame, personas: list[str], **kw) -> str:
+        h = hashlib.sha256()
+        h.update(kind.encode())
+        h.update(repr(list(df.columns)).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        h.update(repr(list(personas)).encode())
+        # el ledger y el cubo salen de las mismas filas: no hace falta en la huella
+        h.update(repr(sorted((k, v) for k, v in kw.items() if k not in ("ledger", "cubo"))).encode())
+        return h.hexdigest()
+
+    def submit(self, kind: str, df: pd.DataFrame, personas: list[str], **kw) -> tuple[str, Future]:
+        key = self.fingerprint(kind, df, personas, **kw)
+        with self._lock:
+            fut = self._items.get(key)
+            if fut is not None and not (fut.done() and fut.exception() is not None):
+                self._items.move_to_end(key)
+                return key, fut
+            fut = self._pool.submit(self._generar, kind, df.copy(), list(personas), kw)
+            self._items[key] = fut
+            # Recién con la entrada guardada: si ya terminó, el callback corre acá mismo y tiene que verla
+            fut.add_done_callback(lambda _: self._evict())
+            return key, fut
+
+    def get(self, key: str) -> Future | None:
+        # Un PDF que falló se queda hasta que la UI lo lee (para mostrar el error) y ahí se saca:
+        # el próximo submit lo vuelve a generar
+        with self._lock:
+            fut = self._items.get(key)
+            if fut is not None and fut.done() and fut.exception() is not None:
+                del self._items[key]
+            return fut
+
+    def _generar(self, kind, df, personas, kw) -> bytes:
+        with etapa("pdf"):
+            path = self.GENERADORES[kind](df, personas, **kw)
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.unlink(path)
+
+    def _evict(self):
+        # Sólo se desalojan PDFs generados; los fallidos esperan a que get() los entregue
+        with self._lock:
+            listos = [k for k, f in self._items.items() if f.done() and f.exception() is None]
+            total = sum(len(self._items[k].result()) for k in listos)
+            for k in listos:
+                if len(self._items) <= self.max_items and total <= self.max_bytes:
+                    break
+                total -= len(self._items.pop(k).result())
@@ -0,0 +1,355 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# -------------------------
+# Montos en centavos
+# -------------------------
+# Los saldos se suman en unidades menores enteras (int64, centavos con DECIMALES = 2): sumar, restar
+# y comparar es exacto, y "todo saldado" es una igualdad. Las filas siguen guardando el monto en la
+# moneda (2 decimales); se pasa a centavos al sumar y de vuelta al mostrar.
+# Las partes de un gasto se reparten por mayor resto, así suman exactamente su monto_base.
+DECIMALES = 2
+ESCALA = 10 ** DECIMALES
+
+
+def a_centavos(x, decimals: int = DECIMALES) -> np.ndarray:
+    # Redondeo a la unidad menor más cercana, las mitades para afuera (redondeo comercial).
+    # El 1e-6 absorbe el error binario: 1.005 * 100 = 100.49999999999999 -> 101
+    v = np.nan_to_num(np.asarray(x, dtype=float)) * 10 ** decimals
+    return np.trunc(v + np.copysign(0.5 + 1e-6, v)).astype(np.int64)
+
+
+def de_centavos(c, decimals: int = DECIMALES):
+    return np.asarray(c, dtype=np.int64) / 10 ** decimals
+
+
+def repartir(total, pesos) -> np.ndarray:
+    # Reparte `total` centavos en proporción a `pesos` por mayor resto: las partes suman exactamente
+    # total. A igual resto, el centavo extra va a los primeros. Con totales (m,) y pesos (m, k)
+    # reparte cada fila; con pesos en 0 (o todos en 0) esa parte queda en 0.
+    pesos = np.asarray(pesos, dtype=float)
+    una = pesos.ndim == 1
+    pesos = np.atleast_2d(pesos)
+    totales = np.atleast_1d(np.asarray(total, dtype=np.int64))
+    suma = pesos.sum(axis=1)
+    ok = suma > 0
+
+    exacto = np.zeros(pesos.shape)
+    np.divide(totales[:, None] * pesos, suma[:, None], out=exacto, where=ok[:, None])
+    partes = np.floor(exacto).astype(np.int64)
+    resto = np.where(ok, totales - partes.sum(axis=1), 0)
+    frac = np.where(pesos > 0, exacto - partes, -1.0)
+    rango = np.argsort(np.argsort(-frac, axis=1, kind="stable"), axis=1, kind="stable")
+    partes += rango < resto[:, None]
+    return partes[0] if una else partes
+
+
+def descuadradas(base_c: np.ndarray, suma_c: np.ndarray, k: np.ndarray) -> np.ndarray:
+    # Gastos cuyas k partes no suman monto_base por redondeo (a lo sumo un centavo por parte).
+    # Diferencias mayores son datos así cargados (ej. partes a mano que no llegan al monto): no se tocan.
+    diff = base_c - suma_c
+    return (diff != 0) & (k > 0) & (np.abs(diff) <= k)
+
+
+def cuadrar_partes(base_c: np.ndarray, partes_c: np.ndarray) -> np.ndarray:
+    # Partes (m, k) en centavos de gastos con monto_base base_c (m,): las que no cuadran por redondeo
+    # (filas viejas con round(..., 2) por parte, cambios de base) se reparten de nuevo en proporción
+    malas = descuadradas(base_c, partes_c.sum(axis=1), (partes_c != 0).sum(axis=1))
+    if malas.any():
+        partes_c = partes_c.copy()
+        partes_c[malas] = repartir(base_c[malas], partes_c[malas])
+    return partes_c
+
+
+# -------------------------
+# Helpers
+# -------------------------
+def normalize_currency(monto: float, cambio_a_base: float) -> float:
+    # Monto en la base, redondeado al centavo
+    return float(de_centavos(a_centavos(float(monto) * float(cambio_a_base))))
+
+
+def compute_balances(df: pd.DataFrame, personas: list[str]) -> pd.Series:
+    if df is None or df.empty:
+        return pd.Series({p: 0.0 for p in personas})
+
+    # Asegurar columnas necesarias
+    for col in ["pago", "monto_base"]:
+        if col not in df.columns:
+            raise ValueError(f"Falta la columna '{col}' en la Sheet.")
+
+    for p in personas:
+        if p not in df.columns:
+            df[p] = 0.0
+
+    # Pagos y consumos en centavos enteros (ver Ledger.from_df)
+    return Ledger.from_df(df, personas).balance()
+
+
+def settle_up(balance: pd.Series, decimals: int = DECIMALES) -> pd.DataFrame:
+    # Greedy en el orden de `balance`, en unidades enteras: no quedan deudas fantasma de un centavo
+    unidades = round_balances(balance, decimals)
+    escala = 10 ** decimals
+    transfers = [
+        {"De": de, "Para": para, "Monto": round(x / escala, decimals)}
+        for de, para, x in _greedy_units(list(unidades.index), unidades.to_numpy(dtype=np.int64), ordenar=False)
+    ]
+    return pd.DataFrame(transfers)
+
+
+# -------------------------
+# Transferencias mínimas
+# -------------------------
+def round_balances(balance: pd.Series, decimals: int = DECIMALES) -> pd.Series:
+    # Lleva los saldos a unidades enteras de la moneda (centavos con decimals=2) y reparte
+    # el residuo del redondeo por mayor resto, para que sigan sumando exactamente 0.
+    # Saldos que salen de un Ledger ya son centavos exactos y suman 0: no hay residuo.
+    # Redondear n saldos mueve a lo sumo n/2 unidades; si no suman 0 por más que eso, son datos
+    # (partes que no llegan al monto): se dejan como están y la app avisa.
+    escala = 10 ** decimals
+    crudo = balance.to_numpy(dtype=float) * escala
+    unidades = a_centavos(balance.to_numpy(dtype=float), decimals)
+    residuo = int(unidades.sum())
+    if residuo and abs(residuo) <= len(unidades) / 2:
+        error = unidades - crudo
+        # si sobra, restamos donde más se redondeó para arriba; si falta, al revés
+        orden = np.argsort(-error if residuo > 0 else error, kind="stable")
+        unidades[orden[:abs(residuo)]] -= np.sign(residuo)
+    return pd.Series(unidades, index=balance.index)
+
+
+def _greedy_units(nombres, unidades, ordenar: bool = True) -> list[tuple]:
+    # Emparejamiento greedy en unidades enteras (sin eps); con ordenar=False respeta el orden de entrada
+    creditors = [[n, int(u)] for n, u in zip(nombres, unidades) if u > 0]
+    debtors = [[n, -int(u)] for n, u in zip(nombres, unidades) if u < 0]
+    if ordenar:
+        creditors.sort(key=lambda c: -c[1])
+        debtors.sort(key=lambda d: -d[1])
+
+    transfers = []
+    i = j = 0
+    while i < len(debtors) and j < len(creditors):
+        x = min(debtors[i][1], creditors[j][1])
+        transfers.append((debtors[i][0], creditors[j][0], x))
+        debtors[i][1] -= x
+        creditors[j][1] -= x
+        if debtors[i][1] == 0:
+            i += 1
+        if creditors[j][1] == 0:
+            j += 1
+    return transfers
+
+
+def zero_sum_groups(unidades: np.ndarray, deadline: float) -> list[list[int]] | None:
+    # Partición en la mayor cantidad posible de subgrupos que suman 0.
+    # Con k subgrupos alcanzan n - k transferencias, que es el mínimo.
+    # DP sobre subconjuntos, por capas de popcount y vectorizada con NumPy: O(2^n · n).
+    # Devuelve None si se pasa del deadline.
+    n = len(unidades)
+    masks = np.arange(1 << n, dtype=np.int64)
+    sumas = np.zeros(1 << n, dtype=np.int64)
+    popcount = np.zeros(1 << n, dtype=np.int8)
+    for i in range(n):
+        bit = (masks >> i) & 1
+        sumas += bit * int(unidades[i])
+        popcount += bit.astype(np.int8)
+
+    dp = np.zeros(1 << n, dtype=np.int16)
+    for k in range(1, n + 1):
+        if time.monotonic() > deadline:
+            return None
+        capa = masks[popcount == k]
+        mejor = np.full(len(capa), -1, dtype=np.int16)
+        for i in range(n):
+            tiene = (capa >> i) & 1 == 1
+            cand = np.where(tiene, dp[capa ^ (1 << i)], -1)
+            np.maximum(mejor, cand, out=mejor)
+        dp[capa] = mejor + (sumas[capa] == 0)
+
+    # Reconstrucción: camino desde el conjunto completo; cada vez que el prefijo suma 0
+    # cerramos un subgrupo
+    grupos = []
+    actual = []
+    mask = (1 << n) - 1
+    while mask:
+        for i in range(n):
+            b = 1 << i
+            if mask & b and dp[mask] == dp[mask ^ b] + (sumas[mask] == 0):
+                if sumas[mask] == 0 and actual:
+                    grupos.append(actual)
+                    actual = []
+                actual.append(i)
+                mask ^= b
+                break
+    if actual:
+        grupos.append(actual)
+    return grupos
+
+
+def settle_min(balance: pd.Series, decimals: int = DECIMALES, max_exact: int = 18, time_budget: float = 1.0) -> pd.DataFrame:
+    # Cantidad mínima de transferencias para grupos chicos (búsqueda exacta por subconjuntos);
+    # para grupos grandes o si se pasa del tiempo, primero saca los pares que se cancelan
+    # exacto y el resto va por greedy.
+    unidades = round_balances(balance, decimals)
+    unidades = unidades[unidades != 0]
+    nombres = list(unidades.index)
+    valores = unidades.to_numpy(dtype=np.int64)
+
+    grupos = None
+    if len(valores) <= max_exact:
+        grupos = zero_sum_groups(valores, time.monotonic() + time_budget)
+    if grupos is None:
+        grupos = _pares_exactos(valores)
+
+    escala = 10 ** decimals
+    transfers = []
+    for g in grupos:
+        for de, para, x in _greedy_units([nombres[i] for i in g], [int(valores[i]) for i in g]):
+            transfers.append({"De": de, "Para": para, "Monto": round(x / escala, decimals)})
+    return pd.DataFrame(transfers)
+
+
+def _pares_exactos(valores: np.ndarray) -> list[list[int]]:
+    # Deudor y acreedor con el mismo monto: una transferencia y listo
+    libres = {}
+    grupos = []
+    resto = []
+    for i, v in enumerate(valores):
+        pareja = libres.get(-int(v))
+        if pareja:
+            grupos.append([pareja.pop(), i])
+        else:
+            libres.setdefault(int(v), []).append(i)
+    for idxs in libres.values():
+        resto.extend(idxs)
+    if resto:
+        grupos.append(resto)
+    return grupos
+
+
+def settle(balance: pd.Series, estrategia: str = "greedy", decimals: int = DECIMALES) -> pd.DataFrame:
+    if estrategia == "min":
+        return settle_min(balance, decimals=decimals)
+    return settle_up(balance, decimals=decimals)
+
+
+def money(v: float, symbol: str) -> str:
+    s = f"{symbol}{v:,.2f}"
+    return s.replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+# -------------------------
+# Libro de saldos
+# -------------------------
+class Ledger:
+    # Pagó / consumió por persona en centavos (arrays int64), mantenido fila a fila en O(personas).
+    # Se reconstruye desde un snapshot con from_df y se puede verificar contra un recálculo.
+    # pagado / consumido / total devuelven lo mismo en la moneda, para mostrar.
+
+    def __init__(self, personas: list[str]):
+        self.personas = list(personas)
+        self._pos = {p: i for i, p in enumerate(self.personas)}
+        self.pagado_c = np.zeros(len(self.personas), dtype=np.int64)
+        self.consumido_c = np.zeros(len(self.personas), dtype=np.int64)
+        self.total_c = 0
+        self.n = 0
+
+    @classmethod
+    def from_df(cls, df: pd.DataFrame, personas: list[str]) -> "Ledger":
+        ledger = cls(personas)
+        if df is None or df.empty:
+            return ledger
+
+        base_c = a_centavos(df["monto_base"]) if "monto_base" in df.columns else np.zeros(len(df), dtype=np.int64)
+        if "pago" in df.columns:
+            # factorize + get_indexer sobre los pocos valores distintos (no por fila)
+            codigos, valores = pd.factorize(df["pago"])
+            quien = pd.Index(ledger.personas).get_indexer(pd.Index(valores).astype(str))
+            quien = np.where(codigos >= 0, quien[codigos], -1)
+            ok = quien >= 0
+            np.add.at(ledger.pagado_c, quien[ok], base_c[ok])
+        presentes = [p for p in ledger.personas if p in df.columns]
+        if presentes:
+            partes_c = cuadrar_partes(base_c, a_centavos(df[presentes].to_numpy(dtype=float)))
+            ledger.consumido_c[[ledger._pos[p] for p in presentes]] = partes_c.sum(axis=0)
+        ledger.total_c = int(base_c.sum())
+        ledger.n = len(df)
+        return ledger
+
+    @property
+    def pagado(self) -> dict:
+        return dict(zip(self.personas, de_centavos(self.pagado_c).tolist()))
+
+    @property
+    def consumido(self) -> dict:
+        return dict(zip(self.personas, de_centavos(self.consumido_c).tolist()))
+
+    @property
+    def total(self) -> float:
+        return float(de_centavos(self.total_c))
+
+    def copy(self) -> "Ledger":
+        other = Ledger(self.personas)
+        other.pagado_c = self.pagado_c.copy()
+        other.consumido_c = self.consumido_c.copy()
+        other.total_c = self.total_c
+        other.n = self.n
+        return other
+
+    def _merge(self, other: "Ledger", sign: int):
+        self.pagado_c += sign * other.pagado_c
+        self.consumido_c += sign * other.consumido_c
+        self.total_c += sign * other.total_c
+        self.n += sign * other.n
+
+    def _apply(self, row, sign: int):
+        base_c = int(a_centavos(float(row.get("monto_base", 0.0) or 0.0)))
+        partes_c = a_centavos([[float(row.get(p, 0.0) or 0.0) for p in self.personas]])
+        i = self._pos.get(row.get("pago"))
+        if i is not None:
+            self.pagado_c[i] += sign * base_c
+        self.consumido_c += sign * cuadrar_partes(np.array([base_c]), partes_c)[0]
+        self.total_c += sign * base_c
+        self.n += sign
+
+    def add(self, row):
+        self._apply(row, 1)
+
+    def remove(self, row):
+        self._apply(row, -1)
+
+    def add_df(self, df: pd.DataFrame):
+        self._merge(Ledger.from_df(df, self.personas), 1)
+
+    def balance_centavos(self) -> pd.Series:
+        return pd.Series(self.pagado_c - self.consumido_c, index=self.personas).sort_values(ascending=False)
+
+    def balance(self) -> pd.Series:
+        # Mismo resultado que compute_balances
+        c = self.balance_centavos()
+        return pd.Series(de_centavos(c.to_numpy()), index=c.index, dtype=float)
+
+    def saldado(self) -> bool:
+        # Nadie debe nada: igualdad exacta en centavos
+        return not (self.pagado_c - self.consumido_c).any()
+
+    def tabla(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            "Persona": self.personas,
+            "Pagó": de_centavos(self.pagado_c),
+            "Consumió": de_centavos(self.consumido_c),
+            "Balance": de_centavos(self.pagado_c - self.consumido_c),
+        })
+
+    def verify(self, df: pd.DataFrame) -> bool:
+        # Compara contra un recálculo completo del snapshot (en centavos: igualdad exacta)
+        esperado = Ledger.from_df(df, self.personas)
+        return (
+            self.n == esperado.n
+            and self.total_c == esperado.total_c
+            and np.array_equal(self.pagado_c, esperado.pagado_c)
+            and np.array_equal(self.consumido_c, esperado.consumido_c)
+        )
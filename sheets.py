@@ -0,0 +1,499 @@
+import itertools
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from analitica import Cubo
+from cuota import CuotaAgotada
+from metricas import etapa
+from saldos import Ledger
+
+
+# -------------------------
+# Lectura / escritura de la Sheet
+# -------------------------
+BASE_COLS = ["id", "fecha", "concepto", "pago", "monto", "moneda", "cambio_a_base", "monto_base"]
+
+
+def to_num(x):
+    if x is None:
+        return 0.0
+    s = str(x).strip()
+    if s == "":
+        return 0.0
+
+    # deja solo dígitos, coma, punto y signo
+    s = re.sub(r"[^0-9,.\-]", "", s)
+
+    # Tu caso: 333,3333333  -> 333.3333333
+    # y 1000 -> 1000
+    # y 1.234,56 -> 1234.56
+    if "," in s and "." in s:
+        # si tiene ambos, asumimos formato AR: 1.234,56
+        s = s.replace(".", "")
+        s = s.replace(",", ".")
+    elif "," in s and "." not in s:
+        # solo coma: decimal
+        s = s.replace(",", ".")
+
+    try:
+        return float(s)
+    except:
+        return 0.0
+
+
+# Misma lógica que to_num, pero por columna con operaciones .str (sin un llamado Python por celda)
+FLOAT_RE = r"-?(?:\d+(?:\.\d*)?|\.\d+)"
+
+
+def _normalizar_num(col: pd.Series) -> pd.Series:
+    s = col.astype(object).where(col.notna(), "").astype(str).str.strip()
+
+    # deja solo dígitos, coma, punto y signo
+    s = s.str.replace(r"[^0-9,.\-]", "", regex=True)
+
+    # si tiene ambos, asumimos formato AR (1.234,56): se van los puntos;
+    # después toda coma es decimal
+    both = s.str.contains(",", regex=False) & s.str.contains(".", regex=False)
+    s = s.mask(both, s.str.replace(".", "", regex=False))
+    return s.str.replace(",", ".", regex=False)
+
+
+def no_numericas(col: pd.Series) -> np.ndarray:
+    # Celdas con algo escrito que to_num no entiende como número (quedarían en 0.0)
+    escrito = col.astype(object).where(col.notna(), "").astype(str).str.strip() != ""
+    return (escrito & ~_normalizar_num(col).str.fullmatch(FLOAT_RE)).to_numpy(dtype=bool)
+
+
+def to_num_strings(col: pd.Series) -> np.ndarray:
+    s = _normalizar_num(col)
+
+    # lo que float() no aceptaría queda en 0.0
+    ok = s.str.fullmatch(FLOAT_RE).to_numpy(dtype=bool)
+    out = np.zeros(len(s))
+    out[ok] = s.to_numpy(dtype=object)[ok].astype(float)
+    return out
+
+
+def to_num_series(col: pd.Series) -> pd.Series:
+    kind = pd.api.types.infer_dtype(col, skipna=True)
+    if kind in ("integer", "floating", "mixed-integer-float", "boolean"):
+        # Ya vienen como números (value_render_option=UNFORMATTED_VALUE)
+        return pd.to_numeric(col, errors="coerce").fillna(0.0).astype(float)
+    if kind in ("string", "empty"):
+        return pd.Series(to_num_strings(col), index=col.index)
+
+    # Mezcla de números y textos (ej. celdas vacías en modo UNFORMATTED_VALUE)
+    is_str = col.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    out = pd.to_numeric(col.mask(is_str), errors="coerce").fillna(0.0).to_numpy(dtype=float, copy=True)
+    out[is_str] = to_num_strings(col[is_str])
+    return pd.Series(out, index=col.index)
+
+
+def to_fecha(col: pd.Series) -> pd.Series:
+    # Las fechas cargadas con USER_ENTERED llegan como número de serie (días desde 1899-12-30);
+    # las escritas en RAW quedan como texto "YYYY-MM-DD".
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col
+    is_str = col.map(lambda v: isinstance(v, str)).to_numpy(dtype=bool)
+    serial = pd.to_datetime(pd.to_numeric(col.mask(is_str), errors="coerce"), unit="D", origin="1899-12-30")
+    texto = pd.to_datetime(col.where(is_str), format="%Y-%m-%d", errors="coerce")
+    return serial.fillna(texto)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    # Tipos declarados para el modo tipado: fecha datetime, pago/moneda categóricas.
+    # Los montos ya quedan en float64 por to_num_series.
+    if "fecha" in df.columns:
+        df["fecha"] = to_fecha(df["fecha"])
+    for col in ["pago", "moneda"]:
+        if col in df.columns:
+            df[col] = df[col].astype(str).astype("category")
+    return df
+
+
+def parse_gastos(headers, rows, personas, typed=False):
+    with etapa("parse"):
+        headers = [str(h).strip() for h in headers]
+        # batch_get no rellena las celdas vacías del final de cada fila
+        n = len(headers)
+        rows = [r[:n] if len(r) >= n else r + [""] * (n - len(r)) for r in rows]
+        df = pd.DataFrame(rows, columns=headers)
+
+        # columnas numéricas
+        numeric_cols = ["monto", "cambio_a_base", "monto_base"] + personas
+
+        for col in numeric_cols:
+            if col in df.columns:
+                df[col] = to_num_series(df[col])
+            else:
+                df[col] = 0.0
+
+        if typed:
+            apply_schema(df)
+
+        return df
+
+
+def render_options(value_render_option=None, typed=False) -> dict:
+    # Con UNFORMATTED_VALUE los montos llegan como números y no hay que parsear strings;
+    # las fechas se siguen pidiendo como texto para no recibir números de serie,
+    # salvo en modo tipado, donde to_fecha las convierte.
+    if typed:
+        return {"value_render_option": "UNFORMATTED_VALUE", "date_time_render_option": "SERIAL_NUMBER"}
+    if not value_render_option:
+        return {}
+    return {"value_render_option": value_render_option, "date_time_render_option": "FORMATTED_STRING"}
+
+
+def load_gastos_from_sheet(ws, personas, value_render_option=None, typed=False):
+    values = ws.get_all_values(**render_options(value_render_option, typed))
+    if len(values) < 2:
+        return pd.DataFrame()
+
+    return parse_gastos(values[0], values[1:], personas, typed)
+
+
+def col_letter(n: int) -> str:
+    # 1 -> A, 27 -> AA
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+
+def clean_headers(row):
+    # get_all_values rellena con "" y batch_get no: comparamos sin las celdas vacías del final
+    headers = [str(h).strip() for h in row]
+    while headers and headers[-1] == "":
+        headers.pop()
+    return headers
+
+
+def read_snapshot(ws, personas, value_render_option=None, typed=False) -> dict:
+    values = ws.get_all_values(**render_options(value_render_option, typed))
+    headers = clean_headers(values[0]) if values else []
+    rows = values[1:]
+    df = parse_gastos(headers, rows, personas, typed) if rows else pd.DataFrame()
+    return {
+        "headers": headers,
+        "n_rows": len(rows),
+        "last_id": last_id(headers, rows),
+        "df": df,
+        "ledger": Ledger.from_df(df, personas),
+        "cubo": Cubo.from_df(df),
+    }
+
+
+def last_id(headers, rows):
+    if not rows or "id" not in headers:
+        return None
+    r = rows[-1]
+    i = headers.index("id")
+    return r[i] if len(r) > i else ""
+
+
+def sync_snapshot(ws, snap: dict, personas, value_render_option=None, typed=False) -> dict | None:
+    # Trae sólo las filas agregadas desde la última lectura, en un solo batch_get.
+    # Devuelve None si hay que recargar todo (cambió el header o se borraron filas).
+    headers = snap["headers"]
+    n = snap["n_rows"]
+    if not headers or "id" not in headers or n == 0:
+        return None
+
+    last_col = col_letter(len(headers))
+    id_col = col_letter(headers.index("id") + 1)
+    head, last, new = ws.batch_get([
+        "1:1",
+        f"{id_col}{n + 1}",
+        f"A{n + 2}:{last_col}",
+    ], **render_options(value_render_option, typed))
+
+    if clean_headers(head[0] if head else []) != headers:
+        return None
+
+    # Si la última fila conocida ya no tiene el mismo id, se borró (o movió) algo
+    if (last[0][0] if last and last[0] else "") != snap["last_id"]:
+        return None
+
+    # Las filas vacías del medio se quedan en su lugar (como en read_snapshot): el df y el IdIndex
+    # sembrado desde él tienen que seguir alineados con los números de fila de la Sheet
+    if not any(any(str(c).strip() for c in r) for r in new):
+        return snap
+
+    df_new = parse_gastos(headers, new, personas, typed)
+    df = pd.concat([snap["df"], df_new], ignore_index=True)
+    if typed:
+        # concat de categóricas con categorías distintas vuelve a object
+        apply_schema(df)
+
+    # Los saldos y el cubo se actualizan sólo con las filas nuevas
+    ledger = snap["ledger"].copy()
+    ledger.add_df(df_new)
+    cubo = snap["cubo"].copy()
+    cubo.add_df(df_new)
+    return {
+        "headers": headers,
+        "n_rows": n + len(new),
+        "last_id": last_id(headers, new),
+        "df": df,
+        "ledger": ledger,
+        "cubo": cubo,
+    }
+
+
+def append_gasto_to_sheet(ws, row, personas, index=None, value_input_option="USER_ENTERED"):
+    append_gastos_to_sheet(ws, [row], personas, index=index, value_input_option=value_input_option)
+
+
+def append_gastos_to_sheet(ws, rows, personas, index=None, value_input_option="USER_ENTERED"):
+    # value_input_option="RAW" (modo tipado) escribe los montos como números tal cual,
+    # sin que la Sheet los reinterprete según su locale
+    # Con un IdIndex al día, agregar gastos es una sola llamada (append_rows)
+    if index is None:
+        index = IdIndex(ttl=0)
+    if index.stale():
+        index.refresh(ws)
+    headers = index.headers
+
+    # Asegurar que existan las columnas esperadas
+    needed = BASE_COLS + personas
+    missing = [c for c in needed if c not in headers]
+    if missing:
+        raise ValueError(f"Faltan columnas en la Sheet (fila 1): {missing}")
+
+    # Evitar duplicados por id (contra la hoja y dentro del mismo lote)
+    nuevos = {}
+    for row in rows:
+        if row["id"] not in index and row["id"] not in nuevos:
+            nuevos[row["id"]] = row
+    if not nuevos:
+        return
+
+    # Armar filas en el mismo orden que los headers de la hoja
+    ordered = [[row.get(h, "") for h in headers] for row in nuevos.values()]
+    resp = ws.append_rows(ordered, value_input_option=value_input_option)
+
+    # La respuesta dice en qué filas quedaron: el índice las conoce sin volver a leer
+    primera = appended_start_row(resp)
+    for k, id_ in enumerate(nuevos):
+        index.add(id_, primera + k if primera else None)
+
+
+def appended_start_row(resp) -> int | None:
+    # append_rows devuelve el rango escrito, ej. "'gastos'!A12:K14" -> 12
+    try:
+        rango = resp["updates"]["updatedRange"]
+    except (TypeError, KeyError):
+        return None
+    m = re.search(r"!\$?[A-Z]+\$?(\d+)", rango)
+    return int(m.group(1)) if m else None
+
+
+# -------------------------
+# Índice de ids
+# -------------------------
+class IdIndex:
+    # ids ya escritos y headers de una hoja, para chequear duplicados sin bajar la hoja entera.
+    # Se siembra con cada snapshot y, cuando vence, se revalida leyendo sólo el header y la columna id.
+    # También sabe en qué fila está cada id, para borrar/editar con una sola llamada.
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self.headers = []
+        self._rows = {}  # id -> número de fila (None si todavía no se sabe)
+        self._at = float("-inf")
+        self._lock = threading.Lock()
+
+    def __contains__(self, id_) -> bool:
+        return id_ in self._rows
+
+    def ids(self) -> list[str]:
+        return list(self._rows)
+
+    def row(self, id_) -> int | None:
+        return self._rows.get(id_)
+
+    def stale(self) -> bool:
+        return time.monotonic() - self._at >= self.ttl
+
+    def seed(self, headers, ids):
+        # ids en el orden de la hoja desde la fila 2; las celdas vacías también ocupan su fila
+        with self._lock:
+            self.headers = list(headers)
+            self._rows = {i: n for n, i in enumerate(ids, start=2) if i}
+            self._at = time.monotonic()
+
+    def refresh(self, ws):
+        # Un solo batch_get: header + la columna donde creemos que está el id
+        id_col = col_letter(self.headers.index("id") + 1) if "id" in self.headers else "A"
+        head, ids = ws.batch_get(["1:1", f"{id_col}2:{id_col}"])
+        headers = clean_headers(head[0] if head else [])
+
+        if "id" in headers and col_letter(headers.index("id") + 1) != id_col:
+            # La columna id se movió: la leemos de nuevo en su lugar
+            ids = ws.batch_get([f"{col_letter(headers.index('id') + 1)}2:{col_letter(headers.index('id') + 1)}"])[0]
+        elif "id" not in headers:
+            ids = []
+
+        self.seed(headers, (r[0] if r else "" for r in ids))
+
+    def add(self, id_, row: int | None = None):
+        with self._lock:
+            self._rows[id_] = row
+
+    def discard(self, id_):
+        # Después de borrar la fila de id_: las de abajo suben una
+        with self._lock:
+            row = self._rows.pop(id_, None)
+            if row is None:
+                return
+            for k, r in self._rows.items():
+                if r is not None and r > row:
+                    self._rows[k] = r - 1
+
+
+# -------------------------
+# Cache de snapshots
+# -------------------------
+class SnapshotCache:
+    # Guarda el último DataFrame leído de cada hoja, por (spreadsheet_id, worksheet, personas).
+    # Se comparte entre reruns (y sesiones) para no bajar la hoja entera en cada tab.
+    # Con incremental=True, al vencer el TTL sólo se piden las filas nuevas.
+
+    def __init__(self, ttl: float = 30.0, incremental: bool = False, id_index_ttl: float = 300.0,
+                 value_render_option=None, typed=False):
+        self.ttl = ttl
+        self.incremental = incremental
+        self.value_render_option = value_render_option
+        self.typed = typed
+        self.id_index_ttl = id_index_ttl
+        self._snapshots = {}
+        self._indexes = {}
+        self._versiones = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def id_index(self, spreadsheet_id: str, worksheet: str) -> IdIndex:
+        key = (spreadsheet_id, worksheet)
+        if key not in self._indexes:
+            self._indexes[key] = IdIndex(ttl=self.id_index_ttl)
+        return self._indexes[key]
+
+    def get(self, spreadsheet_id: str, worksheet: str, personas: list[str], get_ws) -> pd.DataFrame:
+        return self._snapshot(spreadsheet_id, worksheet, personas, get_ws)["df"].copy()
+
+    def get_ledger(self, spreadsheet_id: str, worksheet: str, personas: list[str], get_ws) -> Ledger:
+        return self._snapshot(spreadsheet_id, worksheet, personas, get_ws)["ledger"].copy()
+
+    def get_cubo(self, spreadsheet_id: str, worksheet: str, personas: list[str], get_ws) -> Cubo:
+        return self._snapshot(spreadsheet_id, worksheet, personas, get_ws)["cubo"].copy()
+
+    def _snapshot(self, spreadsheet_id: str, worksheet: str, personas: list[str], get_ws) -> dict:
+        key = (spreadsheet_id, worksheet, tuple(personas))
+        with self._lock:
+            snap = self._snapshots.get(key)
+            if snap is not None and time.monotonic() - snap["at"] < self.ttl:
+                return snap
+
+            ws = get_ws()
+            new_snap = None
+            try:
+                if snap is not None and self.incremental:
+                    new_snap = sync_snapshot(ws, snap, personas, self.value_render_option, self.typed)
+                if new_snap is None:
+                    new_snap = read_snapshot(ws, personas, self.value_render_option, self.typed)
+            except CuotaAgotada:
+                # Sin cuota: mejor el último snapshot (vencido) que romper la página; se reintenta en el próximo rerun
+                if snap is None:
+                    raise
+                return snap
+
+            new_snap["at"] = time.monotonic()
+            if new_snap is not snap:
+                new_snap["version"] = next(self._versiones)
+            self._snapshots[key] = new_snap
+
+            # Cada lectura deja sembrado el índice de ids para los próximos appends
+            df = new_snap["df"]
+            ids = df["id"].tolist() if "id" in df.columns else []
+            self.id_index(spreadsheet_id, worksheet).seed(new_snap["headers"], ids)
+            return new_snap
+
+    def version(self, spreadsheet_id: str, worksheet: str, personas: list[str], get_ws) -> int:
+        # Cambia con cada snapshot nuevo (lectura, sync con filas nuevas o drop), no con cada TTL
+        return self._snapshot(spreadsheet_id, worksheet, personas, get_ws)["version"]
+
+    def derivado(self, spreadsheet_id: str, worksheet: str, personas: list[str], get_ws, nombre: str, fn):
+        # Algo calculado del snapshot (ej. los índices del explorador): se arma una vez con fn(df)
+        # y se descarta junto con el snapshot
+        snap = self._snapshot(spreadsheet_id, worksheet, personas, get_ws)
+        derivados = snap.setdefault("derivados", {})
+        if nombre not in derivados:
+            derivados[nombre] = fn(snap["df"])
+        return derivados[nombre]
+
+    def drop(self, spreadsheet_id: str, worksheet: str, id_: str) -> bool:
+        # Borrado por id: si el snapshot tiene esa fila la sacamos sin releer la hoja (Ledger y Cubo
+        # se corrigen con esa fila sola), y el sync incremental sigue alineado con las filas de la Sheet.
+        # False si algún snapshot de la hoja no la tenía: ese hay que invalidarlo.
+        return self._ajustar(spreadsheet_id, worksheet, id_, None)
+
+    def reemplazar(self, spreadsheet_id: str, worksheet: str, id_: str, valores: list) -> bool:
+        # Edición por id: `valores` son las celdas escritas en la fila, en el orden del header.
+        # Se parsean como en una lectura y reemplazan a la fila vieja en su lugar; mismo False que drop.
+        return self._ajustar(spreadsheet_id, worksheet, id_, valores)
+
+    def _ajustar(self, spreadsheet_id: str, worksheet: str, id_: str, valores) -> bool:
+        todos = True
+        with self._lock:
+            for key, snap in self._snapshots.items():
+                if key[:2] != (spreadsheet_id, worksheet):
+                    continue
+                df = snap["df"]
+                pos = (df["id"] == id_).to_numpy().nonzero()[0] if "id" in df.columns else []
+                if not len(pos):
+                    todos = False
+                    continue
+                pos = pos[0]
+                fila = df.iloc[pos].to_dict()
+                ledger = snap["ledger"].copy()
+                ledger.remove(fila)
+                cubo = snap["cubo"].copy()
+                cubo.remove(fila)
+                if valores is None:
+                    df = df.drop(index=df.index[pos]).reset_index(drop=True)
+                    n_rows = snap["n_rows"] - 1
+                else:
+                    nueva = parse_gastos(snap["headers"], [valores], list(key[2]), self.typed)
+                    ledger.add_df(nueva)
+                    cubo.add_df(nueva)
+                    df = pd.concat([df.iloc[:pos], nueva, df.iloc[pos + 1:]], ignore_index=True)
+                    if self.typed:
+                        apply_schema(df)
+                    n_rows = snap["n_rows"]
+                snap.update({
+                    "df": df,
+                    "ledger": ledger,
+                    "cubo": cubo,
+                    "n_rows": n_rows,
+                    "last_id": str(df["id"].iloc[-1]) if len(df) else None,
+                    "derivados": {},
+                    "version": next(self._versiones),
+                })
+        return todos
+
+    def invalidate(self, spreadsheet_id: str, worksheet: str, reload: bool = False):
+        # Después de escribir/borrar, todas las variantes de personas de esa hoja quedan viejas.
+        # En modo incremental se conserva el snapshot y sólo se vence el TTL:
+        # la próxima lectura trae lo nuevo o detecta el borrado y recarga todo.
+        # reload=True (ej. después de editar una fila del medio) descarta el snapshot.
+        with self._lock:
+            for key in [k for k in self._snapshots if k[:2] == (spreadsheet_id, worksheet)]:
+                if self.incremental and not reload:
+                    self._snapshots[key]["at"] = float("-inf")
+                else:
+                    del self._snapshots[key]
@@ -0,0 +1,559 @@
+import os
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analitica import Cubo
+from explorar import IndiceGastos
+from partes import PARTES_COLS, a_ancho, df_a_largo, filas_partes, ledger_largo, nuevo_lote, vigentes
+from saldos import ESCALA, Ledger
+from sheets import BASE_COLS, SnapshotCache, append_gastos_to_sheet, apply_schema, col_letter, no_numericas, parse_gastos
+
+
+# -------------------------
+# Backends de almacenamiento
+# -------------------------
+# Todo lo que la app lee o escribe de los gastos de un viaje pasa por esta interfaz:
+#   load(personas)         -> DataFrame con los gastos (vacío si no hay)
+#   ledger(personas)       -> Ledger con pagó / consumió / total
+#   append(rows, personas) -> agrega filas, ignorando ids ya escritos
+#   delete(id_)            -> borra el gasto con ese id; False si no existe
+#   update(id_, row, personas) -> reemplaza el gasto con ese id (row completa); False si no existe
+#   ids()                  -> ids escritos, en orden de carga
+#   version(personas)      -> cambia cuando cambian los datos (None: no se sabe, no cachear)
+#   columnas_faltantes(personas) -> columnas que la tabla necesita para esas personas y no tiene
+#   columnas_por_migrar()  -> columnas por persona que quedan en la tabla de gastos (layout "largo")
+#   migrar_a_largo(personas) -> pasa esas columnas a la tabla de partes (ver partes.py); ValueError
+#                            si hay columnas que no son personas del viaje o celdas no numéricas
+#   indice(personas)       -> IndiceGastos del explorador, con las mismas posiciones de fila que load
+#   cubo(personas)         -> Cubo de análisis (sumas por día, pagó y moneda; ver analitica.py)
+# Se elige con secrets: [storage] backend = "sheets" (por defecto) o "sqlite",
+# y layout = "ancho" (una columna por persona, por defecto) o "largo" (tabla de partes aparte).
+
+NUM_COLS = ["monto", "cambio_a_base", "monto_base"]
+
+
+class Storage:
+    def load(self, personas: list[str]) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def ledger(self, personas: list[str]) -> Ledger:
+        return Ledger.from_df(self.load(personas), personas)
+
+    def append(self, rows: list[dict], personas: list[str]):
+        raise NotImplementedError
+
+    def delete(self, id_: str) -> bool:
+        raise NotImplementedError
+
+    def update(self, id_: str, row: dict, personas: list[str]) -> bool:
+        raise NotImplementedError
+
+    def ids(self) -> list[str]:
+        raise NotImplementedError
+
+    def version(self, personas: list[str]):
+        # Algo que cambia cuando cambian los datos, para cachear lo que se calcula de load();
+        # None si el backend no lo sabe (no se cachea)
+        return None
+
+    def columnas_faltantes(self, personas: list[str]) -> list[str]:
+        return []
+
+    def columnas_por_migrar(self) -> list[str]:
+        return []
+
+    def migrar_a_largo(self, personas: list[str]) -> int:
+        raise NotImplementedError
+
+    def indice(self, personas: list[str]) -> IndiceGastos:
+        return IndiceGastos(self.load(personas))
+
+    def cubo(self, personas: list[str]) -> Cubo:
+        return Cubo.from_df(self.load(personas))
+
+
+# -------------------------
+# Google Sheets
+# -------------------------
+class SheetsStorage(Storage):
+    # La hoja de un viaje, leída a través del SnapshotCache compartido (TTL, sync incremental, IdIndex).
+    # Borrar y editar ubican la fila con el IdIndex y, antes de tocarla, releen su celda id (una
+    # llamada chica): si no coincide (otra instancia borró filas, el índice quedó corrido) se
+    # refresca el índice. Nunca se borra ni se pisa una fila sin confirmar que es la de ese id.
+    # Con get_partes_ws (layout "largo") la hoja de gastos sólo tiene BASE_COLS y las partes van a
+    # otra worksheet (id, persona, monto_base, lote), leída por el mismo SnapshotCache.
+
+    def __init__(self, cache: SnapshotCache, spreadsheet_id: str, worksheet: str, get_ws,
+                 value_input_option: str = "USER_ENTERED",
+                 partes_worksheet: str | None = None, get_partes_ws=None):
+        self.cache = cache
+        self.hoja = (spreadsheet_id, worksheet)
+        self.get_ws = get_ws
+        self.value_input_option = value_input_option
+        self.hoja_partes = (spreadsheet_id, partes_worksheet) if get_partes_ws else None
+        self.get_partes_ws = get_partes_ws
+        self._lock = threading.Lock()
+
+    def _partes(self, df):
+        return vigentes(self.cache.get(*self.hoja_partes, [], self.get_partes_ws), df["id"] if len(df) else [])
+
+    def load(self, personas):
+        if self.hoja_partes is None:
+            return self.cache.get(*self.hoja, personas, self.get_ws)
+        df = self.cache.get(*self.hoja, [], self.get_ws)
+        return a_ancho(df, self._partes(df), personas) if len(df) else df
+
+    def ledger(self, personas):
+        if self.hoja_partes is None:
+            return self.cache.get_ledger(*self.hoja, personas, self.get_ws)
+        df = self.cache.get(*self.hoja, [], self.get_ws)
+        return ledger_largo(df, self._partes(df), personas)
+
+    def version(self, personas):
+        if self.hoja_partes is None:
+            return self.cache.version(*self.hoja, personas, self.get_ws)
+        return (self.cache.version(*self.hoja, [], self.get_ws),
+                self.cache.version(*self.hoja_partes, [], self.get_partes_ws))
+
+    def indice(self, personas):
+        # Una vez por snapshot; sólo usa fecha/pago/moneda/concepto, así que en layout "largo" va sobre
+        # la hoja de gastos sola
+        personas = [] if self.hoja_partes is not None else personas
+        return self.cache.derivado(*self.hoja, personas, self.get_ws, "indice", IndiceGastos)
+
+    def cubo(self, personas):
+        # Mantenido por el SnapshotCache junto con el Ledger; no depende de las partes
+        personas = [] if self.hoja_partes is not None else personas
+        return self.cache.get_cubo(*self.hoja, personas, self.get_ws)
+
+    def _escribir_partes(self, rows, personas):
+        # Un append_rows con las partes distintas de cero, en un lote nuevo (pisa a los anteriores)
+        filas = filas_partes(rows, personas, nuevo_lote())
+        if filas:
+            self.get_partes_ws().append_rows(filas, value_input_option=self.value_input_option)
+        self.cache.invalidate(*self.hoja_partes)
+
+    def append(self, rows, personas):
+        # Con el mismo lock que delete: la fila que devuelve append_rows no se corre por un borrado a mitad
+        with self._lock:
+            ws = self.get_ws()
+            index = self.cache.id_index(*self.hoja)
+            if self.hoja_partes is not None:
+                # Primero las partes: si después falla el gasto, el reintento las vuelve a escribir
+                # en otro lote y vale el último
+                if index.stale():
+                    index.refresh(ws)
+                nuevos = {}
+                for r in rows:
+                    if r["id"] not in index:
+                        nuevos.setdefault(r["id"], r)
+                self._escribir_partes(list(nuevos.values()), personas)
+                personas = []
+            append_gastos_to_sheet(ws, rows, personas, index=index, value_input_option=self.value_input_option)
+        self.cache.invalidate(*self.hoja)
+
+    def _fila(self, ws, id_) -> int | None:
+        # Fila de id_ según el índice; se relee (header + columna id) si venció, si no la conoce
+        # o si la celda id de esa fila no es id_
+        index = self.cache.id_index(*self.hoja)
+        if index.stale() or index.row(id_) is None:
+            index.refresh(ws)
+            return index.row(id_)
+        row = index.row(id_)
+        if row is not None:
+            id_col = col_letter(index.headers.index("id") + 1)
+            celda = ws.batch_get([f"{id_col}{row}"])[0]
+            if not celda or not celda[0] or celda[0][0] != id_:
+                index.refresh(ws)
+                row = index.row(id_)
+        return row
+
+    def delete(self, id_):
+        with self._lock:
+            ws = self.get_ws()
+            row = self._fila(ws, id_)
+            if row is None:
+                return False
+            ws.delete_rows(row)
+            self.cache.id_index(*self.hoja).discard(id_)
+
+        # el snapshot se corrige sin releer la hoja; si no tenía la fila, se invalida
+        if not self.cache.drop(*self.hoja, id_):
+            self.cache.invalidate(*self.hoja)
+        return True
+
+    def update(self, id_, row, personas):
+        with self._lock:
+            ws = self.get_ws()
+            n = self._fila(ws, id_)
+            if n is None:
+                return False
+            if self.hoja_partes is not None:
+                self._escribir_partes([row], personas)
+            headers = self.cache.id_index(*self.hoja).headers
+            valores = [row.get(h, "") for h in headers]
+            ws.update(
+                [valores],
+                f"A{n}:{col_letter(len(headers))}{n}",
+                value_input_option=self.value_input_option,
+            )
+
+        # una fila del medio cambió (el sync incremental no lo vería): se reemplaza en el snapshot,
+        # y si el snapshot no la tenía se descarta
+        if not self.cache.reemplazar(*self.hoja, id_, valores):
+            self.cache.invalidate(*self.hoja, reload=True)
+        return True
+
+    def ids(self):
+        index = self.cache.id_index(*self.hoja)
+        if index.stale():
+            index.refresh(self.get_ws())
+        return index.ids()
+
+    def compactar(self) -> int:
+        # Reescribe la hoja de partes sólo con lo vigente (dos llamadas: clear + update)
+        df = self.cache.get(*self.hoja, [], self.get_ws)
+        partes = self._partes(df)[PARTES_COLS]
+        self._reescribir_partes(partes)
+        return len(partes)
+
+    def _reescribir_partes(self, partes: pd.DataFrame):
+        ws = self.get_partes_ws()
+        ws.clear()
+        ws.update([PARTES_COLS] + partes.astype(object).values.tolist(), "A1",
+                  value_input_option=self.value_input_option)
+        self.cache.invalidate(*self.hoja_partes, reload=True)
+
+    def columnas_faltantes(self, personas):
+        # Con el header del IdIndex (se relee si venció); en layout "largo" las personas no son columnas
+        index = self.cache.id_index(*self.hoja)
+        if index.stale() or not index.headers:
+            index.refresh(self.get_ws())
+        necesarias = BASE_COLS + ([] if self.hoja_partes is not None else personas)
+        return [c for c in necesarias if c not in index.headers]
+
+    def columnas_por_migrar(self):
+        # el header solo alcanza para saber si hay algo que migrar (una llamada chica)
+        if self.hoja_partes is None:
+            return []
+        return [str(h).strip() for h in self.get_ws().row_values(1) if str(h).strip() and str(h).strip() not in BASE_COLS]
+
+    def migrar_a_largo(self, personas):
+        # Columnas por persona de la hoja de gastos -> hoja de partes, y después se borran esas columnas.
+        # Sólo columnas de personas del viaje y con números: cualquier otra cosa aborta sin tocar nada.
+        # La hoja de partes se reescribe entera: si se corta a mitad, volver a migrar no duplica.
+        with self._lock:
+            ws = self.get_ws()
+            values = ws.get_all_values()
+            headers = [str(h).strip() for h in values[0]] if values else []
+            extras = [h for h in headers if h and h not in BASE_COLS]
+            if not extras:
+                return 0
+            _validar_migracion(extras, personas, lambda p: no_numericas(
+                pd.Series([r[headers.index(p)] if len(r) > headers.index(p) else "" for r in values[1:]], dtype=object)
+            ).any())
+            df = parse_gastos(headers, values[1:], extras)
+            partes = df_a_largo(df, extras)
+
+            # Antes de borrar nada: los consumos tienen que dar lo mismo en los dos formatos
+            ancho = Ledger.from_df(df, extras)
+            largo = ledger_largo(df, partes, extras)
+            if not np.array_equal(ancho.consumido_c, largo.consumido_c):
+                raise ValueError("La migración no cuadra: no se borró nada.")
+
+            self._reescribir_partes(partes)
+            # por tramos contiguos (normalmente uno) y de derecha a izquierda, para que no se corran
+            cols = sorted(headers.index(p) + 1 for p in extras)
+            tramos = []
+            for c in cols:
+                if tramos and tramos[-1][1] == c - 1:
+                    tramos[-1][1] = c
+                else:
+                    tramos.append([c, c])
+            for desde, hasta in reversed(tramos):
+                ws.delete_columns(desde, hasta)
+            self.cache.id_index(*self.hoja).refresh(ws)
+        self.cache.invalidate(*self.hoja, reload=True)
+        return len(partes)
+
+
+# -------------------------
+# SQLite local
+# -------------------------
+def _validar_migracion(extras: list[str], personas: list[str], tiene_texto):
+    desconocidas = [c for c in extras if c not in personas]
+    if desconocidas:
+        raise ValueError(f"Columnas que no son personas del viaje: {desconocidas}. No se migró nada.")
+    con_texto = [c for c in extras if tiene_texto(c)]
+    if con_texto:
+        raise ValueError(f"Columnas con celdas que no son números: {con_texto}. No se migró nada.")
+
+
+def _q(nombre: str) -> str:
+    # Identificador SQL entre comillas (las personas y las worksheets son texto libre)
+    return '"' + str(nombre).replace('"', '""') + '"'
+
+
+def _c(col: str) -> str:
+    # Centavos enteros de una columna REAL, con el mismo redondeo que saldos.a_centavos
+    # (mitades para afuera; CAST trunca hacia 0)
+    return f"CAST({col} * {ESCALA} + (CASE WHEN {col} < 0 THEN -0.500001 ELSE 0.500001 END) AS INTEGER)"
+
+
+class SqliteStorage(Storage):
+    # Una tabla por worksheet, en modo WAL: lectores y el hilo del outbox no se bloquean entre sí.
+    # Índice único por id (el dedup lo hace INSERT OR IGNORE) y por fecha.
+    # Cada persona es una columna REAL; se agregan con ALTER TABLE cuando aparecen.
+    # Con layout="largo" las partes van a <table>_partes (id, persona, monto_base), clave (id, persona).
+
+    def __init__(self, path: str, table: str = "gastos", typed: bool = False, layout: str = "ancho"):
+        self.path = path
+        self.table = table
+        self.typed = typed
+        self.largo = layout == "largo"
+        self.partes = f"{table}_partes"
+        self._escrituras = 0
+        self._indice = None  # (versión, IndiceGastos)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        # Una conexión por hilo (Streamlit corre cada sesión en su hilo, el outbox en otro)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        t = _q(self.table)
+        with self._conn() as conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {t} (
+                    id TEXT NOT NULL,
+                    fecha TEXT,
+                    concepto TEXT,
+                    pago TEXT,
+                    monto REAL NOT NULL DEFAULT 0,
+                    moneda TEXT,
+                    cambio_a_base REAL NOT NULL DEFAULT 0,
+                    monto_base REAL NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {_q('ix_' + self.table + '_id')} ON {t} (id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {_q('ix_' + self.table + '_fecha')} ON {t} (fecha)")
+            if self.largo:
+                conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {_q(self.partes)} (
+                        id TEXT NOT NULL,
+                        persona TEXT NOT NULL,
+                        monto_base REAL NOT NULL,
+                        PRIMARY KEY (id, persona)
+                    ) WITHOUT ROWID
+                """)
+
+    def version(self, personas):
+        # Escrituras de este proceso + el archivo y su WAL (cubre otros procesos): sin leer la tabla
+        firma = []
+        for f in (self.path, self.path + "-wal"):
+            try:
+                st = os.stat(f)
+            except OSError:
+                firma.append(None)
+            else:
+                firma.append((st.st_mtime_ns, st.st_size))
+        return (self._escrituras, *firma)
+
+    def indice(self, personas):
+        # Armarlo cuesta un load() entero: se reusa mientras no cambie la versión (no depende de las personas)
+        version = self.version(personas)
+        guardado = self._indice
+        if guardado is not None and guardado[0] == version:
+            return guardado[1]
+        indice = IndiceGastos(self.load(personas))
+        self._indice = (version, indice)
+        return indice
+
+    def _escrito(self):
+        with self._lock:
+            self._escrituras += 1
+
+    def _columns(self) -> list[str]:
+        return [r[1] for r in self._conn().execute(f"PRAGMA table_info({_q(self.table)})")]
+
+    def _ensure_personas(self, personas):
+        with self._lock:
+            cols = self._columns()
+            with self._conn() as conn:
+                for p in personas:
+                    if p not in cols:
+                        conn.execute(f"ALTER TABLE {_q(self.table)} ADD COLUMN {_q(p)} REAL NOT NULL DEFAULT 0")
+
+    def load(self, personas):
+        cols = ", ".join(_q(c) for c in BASE_COLS) if self.largo else "*"
+        df = pd.read_sql_query(f"SELECT {cols} FROM {_q(self.table)} ORDER BY rowid", self._conn())
+        if df.empty:
+            return pd.DataFrame()
+        if self.largo:
+            partes = pd.read_sql_query(f"SELECT id, persona, monto_base FROM {_q(self.partes)}", self._conn())
+            df = a_ancho(df, partes, personas)
+        for col in NUM_COLS + personas:
+            if col in df.columns:
+                df[col] = df[col].astype(float)
+            else:
+                df[col] = 0.0
+        if self.typed:
+            apply_schema(df)
+        return df
+
+    def _descuadradas(self, presentes: list[str]) -> int:
+        # Gastos cuyas partes no suman monto_base por redondeo (saldos.descuadradas), contados en SQL
+        t = _q(self.table)
+        if self.largo:
+            por_gasto = (
+                f"SELECT {_c('g.monto_base')} - SUM({_c('p.monto_base')}) AS d, SUM(p.monto_base != 0) AS k "
+                f"FROM {t} g JOIN {_q(self.partes)} p ON p.id = g.id GROUP BY g.id"
+            )
+        elif presentes:
+            suma = " + ".join(_c(_q(p)) for p in presentes)
+            k = " + ".join(f"({_q(p)} != 0)" for p in presentes)
+            por_gasto = f"SELECT {_c('monto_base')} - ({suma}) AS d, ({k}) AS k FROM {t}"
+        else:
+            return 0
+        return self._conn().execute(
+            f"SELECT COUNT(*) FROM ({por_gasto}) WHERE d != 0 AND k > 0 AND ABS(d) <= k"
+        ).fetchone()[0]
+
+    def ledger(self, personas):
+        # Los saldos se suman en la base, en centavos enteros, sin traer las filas
+        t = _q(self.table)
+        cols = self._columns()
+        conn = self._conn()
+        ledger = Ledger(personas)
+        pos = {p: i for i, p in enumerate(ledger.personas)}
+        presentes = [p for p in personas if p in cols and not self.largo]
+
+        if self._descuadradas(presentes):
+            # filas viejas que no cuadran por redondeo: se cuadran en Python, como en el snapshot
+            return Ledger.from_df(self.load(personas), personas)
+
+        for pago, suma in conn.execute(f"SELECT pago, SUM({_c('monto_base')}) FROM {t} GROUP BY pago"):
+            if pago in pos:
+                ledger.pagado_c[pos[pago]] = int(suma or 0)
+
+        if self.largo:
+            for persona, suma in conn.execute(
+                f"SELECT persona, SUM({_c('monto_base')}) FROM {_q(self.partes)} GROUP BY persona"
+            ):
+                if persona in pos:
+                    ledger.consumido_c[pos[persona]] = int(suma or 0)
+
+        sumas = "".join(f", SUM({_c(_q(p))})" for p in presentes)
+        n, total, *consumos = conn.execute(f"SELECT COUNT(*), SUM({_c('monto_base')}){sumas} FROM {t}").fetchone()
+        for p, c in zip(presentes, consumos):
+            ledger.consumido_c[pos[p]] = int(c or 0)
+        ledger.total_c = int(total or 0)
+        ledger.n = int(n)
+        return ledger
+
+    def cubo(self, personas):
+        # Agrupado en la base: vuelven días x pagó x moneda filas, no los gastos
+        t = _q(self.table)
+        sumas = pd.read_sql_query(
+            f"SELECT fecha, pago, moneda, SUM({_c('monto_base')}) * 1.0 / {ESCALA} AS monto_base, "
+            f"SUM({_c('monto')}) * 1.0 / {ESCALA} AS monto, COUNT(*) AS n "
+            f"FROM {t} GROUP BY fecha, pago, moneda",
+            self._conn(),
+        )
+        return Cubo.from_sumas(sumas)
+
+    def _insertar_partes(self, conn, rows, personas):
+        # Sólo las partes distintas de cero; las de un id que ya estaba se ignoran como el gasto
+        conn.executemany(
+            f"INSERT OR IGNORE INTO {_q(self.partes)} (id, persona, monto_base) VALUES (?, ?, ?)",
+            [f[:3] for f in filas_partes(rows, personas, "")],
+        )
+
+    def append(self, rows, personas):
+        if not rows:
+            return
+        if self.largo:
+            personas_cols = []
+        else:
+            self._ensure_personas(personas)
+            personas_cols = [p for p in personas if p not in BASE_COLS]
+        cols = BASE_COLS + personas_cols
+        numericas = set(NUM_COLS + personas_cols)
+        valores = [
+            [float(row.get(c) or 0.0) if c in numericas else row.get(c, "") for c in cols]
+            for row in rows
+        ]
+        with self._conn() as conn:
+            conn.executemany(
+                f"INSERT OR IGNORE INTO {_q(self.table)} ({', '.join(_q(c) for c in cols)}) "
+                f"VALUES ({', '.join('?' for _ in cols)})",
+                valores,
+            )
+            if self.largo:
+                self._insertar_partes(conn, rows, personas)
+        self._escrito()
+
+    def delete(self, id_):
+        with self._conn() as conn:
+            cur = conn.execute(f"DELETE FROM {_q(self.table)} WHERE id = ?", (id_,))
+            if self.largo:
+                conn.execute(f"DELETE FROM {_q(self.partes)} WHERE id = ?", (id_,))
+        self._escrito()
+        return cur.rowcount > 0
+
+    def update(self, id_, row, personas):
+        personas_cols = [] if self.largo else personas
+        self._ensure_personas(personas_cols)
+        cols = [c for c in BASE_COLS + personas_cols if c != "id"]
+        numericas = set(NUM_COLS + personas_cols)
+        valores = [float(row.get(c) or 0.0) if c in numericas else row.get(c, "") for c in cols]
+        with self._conn() as conn:
+            cur = conn.execute(
+                f"UPDATE {_q(self.table)} SET {', '.join(_q(c) + ' = ?' for c in cols)} WHERE id = ?",
+                valores + [id_],
+            )
+            if self.largo and cur.rowcount:
+                conn.execute(f"DELETE FROM {_q(self.partes)} WHERE id = ?", (id_,))
+                self._insertar_partes(conn, [{**row, "id": id_}], personas)
+        self._escrito()
+        return cur.rowcount > 0
+
+    def ids(self):
+        return [r[0] for r in self._conn().execute(f"SELECT id FROM {_q(self.table)} ORDER BY rowid")]
+
+    def columnas_por_migrar(self):
+        return [c for c in self._columns() if c not in BASE_COLS] if self.largo else []
+
+    def migrar_a_largo(self, personas):
+        # Columnas por persona -> <table>_partes y se borran las columnas, todo en una transacción
+        if not self.largo:
+            raise ValueError("migrar_a_largo necesita layout='largo'")
+        extras = self.columnas_por_migrar()
+        if not extras:
+            return 0
+        t, partes = _q(self.table), _q(self.partes)
+        _validar_migracion(extras, personas, lambda p: self._conn().execute(
+            f"SELECT COUNT(*) FROM {t} WHERE typeof({_q(p)}) NOT IN ('integer', 'real', 'null')"
+        ).fetchone()[0] > 0)
+        with self._lock, self._conn() as conn:
+            conn.execute(f"DELETE FROM {partes}")
+            for p in extras:
+                conn.execute(
+                    f"INSERT INTO {partes} (id, persona, monto_base) SELECT id, ?, {_q(p)} FROM {t} WHERE {_q(p)} != 0",
+                    (p,),
+                )
+            for p in extras:
+                conn.execute(f"ALTER TABLE {t} DROP COLUMN {_q(p)}")
+        self._escrito()
+        return conn.execute(f"SELECT COUNT(*) FROM {partes}").fetchone()[0]
@@ -0,0 +1,35 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from cambios import TablaCambios, observadas
+
+
+def tabla():
+    return TablaCambios.from_values([
+        ["fecha", "de", "a", "tasa"],
+        ["2026-01-01", "USD", "ARS", "1000"],
+        ["2026-03-01", "USD", "ARS", "1500"],
+    ])
+
+
+def test_tasa_con_fecha_date():
+    # el date_input devuelve datetime.date: tiene que usar la cotización de ese día, no la última
+    t = tabla()
+    assert t.tasa("USD", "ARS", date(2026, 2, 1)) == 1000.0
+    assert t.tasa("USD", "ARS", pd.Timestamp("2026-02-01")) == 1000.0
+    assert t.tasa("USD", "ARS", "2026-02-01") == 1000.0
+    assert t.tasa("USD", "ARS", 46054) == 1000.0  # número de serie de la Sheet (2026-02-01)
+
+
+def test_observadas_con_fechas_tipadas():
+    df = pd.DataFrame({
+        "fecha": pd.to_datetime(["2026-01-05", "2026-03-05"]),
+        "moneda": ["USD", "USD"],
+        "cambio_a_base": [1100.0, 1400.0],
+    })
+    obs = observadas(df, "ARS")
+    assert obs["fecha"].tolist() == ["2026-01-05", "2026-03-05"]
+    t = tabla().con(obs)
+    assert np.allclose(t.tasas(["USD"] * 2, "ARS", df["fecha"]), [1100.0, 1400.0])
@@ -0,0 +1,90 @@
+import random
+import threading
+import uuid
+from collections import Counter
+
+from fake_sheet import FakeWorksheet
+from outbox import Outbox
+from sheets import BASE_COLS, SnapshotCache
+from storage import SheetsStorage
+
+# Versión chica de bench/bench_concurrencia.py: varias sesiones cargando por el outbox, editando y
+# borrando por id, mientras otra instancia agrega filas al final de la misma hoja.
+
+PERSONAS = ["Quique", "Rafa", "Gus"]
+HEADERS = BASE_COLS + PERSONAS
+
+
+def gasto(quien: str, concepto: str) -> dict:
+    row = {
+        "id": str(uuid.uuid4()), "fecha": "2026-03-01", "concepto": concepto, "pago": quien,
+        "monto": 30.0, "moneda": "ARS", "cambio_a_base": 1.0, "monto_base": 30.0,
+    }
+    row.update({p: 10.0 for p in PERSONAS})
+    return row
+
+
+def test_sesiones_concurrentes_no_pierden_ni_duplican_filas(tmp_path):
+    ws = FakeWorksheet([HEADERS])
+    storage = SheetsStorage(SnapshotCache(ttl=30, incremental=True, id_index_ttl=300), "demo", "gastos", lambda: ws)
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+
+    def push(dest, rows):
+        storage.append(rows, PERSONAS)
+
+    hilos, por_hilo = 4, 25
+    esperados, editados = set(), {}
+    lock = threading.Lock()
+    barrera = threading.Barrier(hilos + 1)
+    errores = []
+
+    def sesion(k: int):
+        try:
+            rng = random.Random(k)
+            barrera.wait()
+            for i in range(por_hilo):
+                row = gasto(PERSONAS[k % len(PERSONAS)], f"h{k}-{i}")
+                if rng.random() < 0.5:
+                    outbox.add(row)
+                    outbox.flush(push)
+                    with lock:
+                        esperados.add(row["id"])
+                    continue
+                storage.append([row], PERSONAS)
+                r = rng.random()
+                if r < 0.3:
+                    assert storage.delete(row["id"])
+                    continue
+                if r < 0.5:
+                    nuevo = dict(row, concepto=row["concepto"] + " (editado)")
+                    assert storage.update(row["id"], nuevo, PERSONAS)
+                    with lock:
+                        editados[row["id"]] = nuevo["concepto"]
+                with lock:
+                    esperados.add(row["id"])
+        except Exception as e:  # se reporta desde el hilo principal
+            errores.append(e)
+
+    def otra_instancia():
+        barrera.wait()
+        for i in range(por_hilo):
+            row = gasto("Gus", f"ajeno-{i}")
+            ws.append_rows([[row.get(h, "") for h in HEADERS]])
+            with lock:
+                esperados.add(row["id"])
+
+    threads = [threading.Thread(target=sesion, args=(k,)) for k in range(hilos)]
+    threads.append(threading.Thread(target=otra_instancia))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    outbox.flush(push)
+
+    assert not errores
+    ids = [r[0] for r in ws.values[1:]]
+    assert not [i for i, n in Counter(ids).items() if n > 1]
+    assert set(ids) == esperados
+    assert len(outbox) == 0 and not outbox.fallidos()
+    conceptos = {r[0]: r[2] for r in ws.values[1:]}
+    assert all(conceptos[i] == c for i, c in editados.items())
@@ -0,0 +1,45 @@
+import io
+from datetime import datetime
+
+import pytest
+
+from importar import importar_gastos
+from storage import SqliteStorage
+
+PERSONAS = ["Ana", "Beto"]
+
+
+@pytest.fixture
+def xlsx():
+    # Como los exporta el home banking: fechas como celdas fecha, consumos en negativo
+    # y un pago de la tarjeta en positivo
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Fecha", "Descripción", "Importe", "Moneda"])
+    ws.append([datetime(2026, 3, 1), "Cena", -120.5, "ARS"])
+    ws.append([datetime(2026, 3, 2), "Taxi", -30, "ARS"])
+    ws.append([datetime(2026, 3, 5), "Su pago en pesos", 150.5, "ARS"])
+    buf = io.BytesIO()
+    wb.save(buf)
+    buf.seek(0)
+    return buf
+
+
+def test_importar_xlsx_con_fechas_y_signos(xlsx, tmp_path):
+    storage = SqliteStorage(str(tmp_path / "t.db"))
+    r = importar_gastos(xlsx, "tarjeta.xlsx", storage, PERSONAS, "ARS", "Ana", "ARS")
+    assert r["importadas"] == 2
+    assert r["errores"] == ["fila 4: signo opuesto a los gastos (reintegro o pago), no se importa"]
+
+    df = storage.load(PERSONAS)
+    assert df["fecha"].tolist() == ["2026-03-01", "2026-03-02"]
+    assert df["monto_base"].tolist() == [120.5, 30.0]
+
+
+def test_importar_csv_en_positivo_no_cambia(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "t.db"))
+    csv = "fecha;concepto;monto\n01/03/2026;Cena;100\n02/03/2026;Taxi;20\n03/03/2026;Reintegro;-20\n"
+    r = importar_gastos(io.BytesIO(csv.encode()), "banco.csv", storage, PERSONAS, "ARS", "Ana", "ARS", chunk=1)
+    assert r["importadas"] == 2
+    assert r["errores"] == ["fila 4: signo opuesto a los gastos (reintegro o pago), no se importa"]
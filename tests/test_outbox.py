@@ -0,0 +1,95 @@
+import pytest
+
+from outbox import Outbox
+
+
+def fila(id_, **partes):
+    return {"id": id_, "fecha": "2026-03-01", "concepto": "Cena", "pago": "Ana", "monto_base": 10.0, **partes}
+
+
+def push_a(escritas, columnas):
+    def push(dest, rows):
+        faltan = sorted({k for r in rows for k in r} - columnas)
+        if faltan:
+            raise ValueError(f"Faltan columnas en la Sheet (fila 1): {faltan}")
+        escritas.extend(r["id"] for r in rows)
+    return push
+
+
+def test_una_fila_mala_no_traba_al_resto(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path)
+    outbox.add(fila("mala", Zoe=10.0))
+    outbox.add(fila("buena", Ana=10.0))
+
+    escritas = []
+    columnas = set(fila("x")) | {"Ana"}
+    outbox.flush(push_a(escritas, columnas))
+    assert escritas == ["buena"]
+    assert len(outbox) == 0
+    assert [r["id"] for r, _ in outbox.fallidos()] == ["mala"]
+
+    # la cuarentena sobrevive a un reinicio y no se reintenta sola
+    outbox = Outbox(path)
+    outbox.flush(push_a(escritas, columnas))
+    assert escritas == ["buena"] and [r["id"] for r, _ in Outbox(path).fallidos()] == ["mala"]
+
+    # con la columna agregada, reintentar la sube
+    assert outbox.reintentar("mala")
+    outbox.flush(push_a(escritas, columnas | {"Zoe"}))
+    assert escritas == ["buena", "mala"] and not outbox.fallidos() and len(Outbox(path)) == 0
+
+
+def test_descartar(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path)
+    outbox.add(fila("mala", Zoe=10.0))
+    outbox.flush(push_a([], set(fila("x"))))
+    assert outbox.descartar("mala")
+    assert not Outbox(path).fallidos() and len(Outbox(path)) == 0
+
+
+def test_error_transitorio_deja_todo_pendiente(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+    outbox.add(fila("a"))
+
+    def push(dest, rows):
+        raise ConnectionError("sin red")
+
+    try:
+        outbox.flush(push)
+    except ConnectionError:
+        pass
+    assert len(outbox) == 1 and not outbox.fallidos()
+
+
+def test_el_archivo_no_crece_con_una_fila_en_cuarentena(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    outbox = Outbox(path)
+    outbox.add(fila("mala", Zoe=10.0))
+    columnas = set(fila("x"))
+    outbox.flush(push_a([], columnas))
+
+    for i in range(20):
+        outbox.add(fila(f"g{i}"))
+        outbox.flush(push_a([], columnas))
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2  # el add y el failed de la que está en cuarentena
+    assert [r["id"] for r, _ in Outbox(path).fallidos()] == ["mala"]
+
+
+def test_una_hoja_caida_no_frena_a_las_demas(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.jsonl"))
+    outbox.add(fila("a"), dest=("s", "caida"))
+    outbox.add(fila("b"), dest=("s", "ok"))
+    escritas, hechas = [], []
+
+    def push(dest, rows):
+        if dest == ("s", "caida"):
+            raise ConnectionError("sin red")
+        escritas.extend(r["id"] for r in rows)
+
+    with pytest.raises(ConnectionError):
+        outbox.flush(push, on_flush=hechas.append)
+    assert escritas == ["b"] and hechas == [("s", "ok")]
+    assert [r["id"] for r in outbox.pending()] == ["a"]
@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from reportes import ReportCache
+
+
+def pdf_falso(df, personas, **kw):
+    if kw.get("titulo") == "roto":
+        raise RuntimeError("sin fuente")
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(b"%PDF" * len(df))
+    return path
+
+
+def cache(monkeypatch, **kw):
+    monkeypatch.setitem(ReportCache.GENERADORES, "ejecutivo", pdf_falso)
+    return ReportCache(**kw)
+
+
+def test_el_error_llega_a_la_ui_una_vez(monkeypatch):
+    reportes = cache(monkeypatch)
+    df = pd.DataFrame({"monto_base": [1.0, 2.0]})
+    key, fut = reportes.submit("ejecutivo", df, ["Ana"], titulo="roto")
+    fut.exception(timeout=10)
+    reportes._evict()
+    # ya terminó y pasó por _evict, pero sigue ahí hasta que la UI lo lee
+    leido = reportes.get(key)
+    assert isinstance(leido.exception(), RuntimeError)
+    assert reportes.get(key) is None
+
+    # el próximo submit lo vuelve a generar
+    _, otro = reportes.submit("ejecutivo", df, ["Ana"], titulo="roto")
+    assert otro is not fut
+
+
+def test_lru_desaloja_solo_pdfs_generados(monkeypatch):
+    reportes = cache(monkeypatch, max_items=2)
+    df = pd.DataFrame({"monto_base": [1.0]})
+    roto, fut = reportes.submit("ejecutivo", df, ["Ana"], titulo="roto")
+    fut.exception(timeout=10)
+    for t in ("a", "b", "c"):
+        reportes.submit("ejecutivo", df, ["Ana"], titulo=t)[1].result(timeout=10)
+    reportes._evict()  # el callback del último puede correr después de result()
+    assert reportes.get(roto) is fut
+    assert reportes.get(reportes.fingerprint("ejecutivo", df, ["Ana"], titulo="c")) is not None
+    assert reportes.get(reportes.fingerprint("ejecutivo", df, ["Ana"], titulo="a")) is None
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from saldos import round_balances, settle
+
+
+def test_round_balances_reparte_solo_el_residuo_del_redondeo():
+    # 100 / 3 por cabeza: los tres redondean para abajo y sobra un centavo
+    balance = pd.Series({"Ana": 66.666, "Beto": -33.333, "Caro": -33.333})
+    unidades = round_balances(balance)
+    assert unidades.sum() == 0
+    assert (unidades - (balance * 100).round()).abs().max() <= 1
+
+
+def test_round_balances_no_toca_saldos_que_no_suman_cero():
+    # Partes que no llegan al monto: 10 pesos sin repartir no son redondeo
+    balance = pd.Series({"Ana": 50.0, "Beto": -20.0, "Caro": -20.0})
+    assert round_balances(balance).tolist() == [5000, -2000, -2000]
+    t = settle(balance)
+    assert t["Monto"].sum() == 40.0
@@ -0,0 +1,150 @@
+import pandas as pd
+import pytest
+
+from fake_sheet import FakeWorksheet
+from sheets import BASE_COLS, SnapshotCache, to_num, to_num_series
+from storage import SheetsStorage
+
+PERSONAS = ["Ana", "Beto"]
+
+# Formatos que aparecen (o podrían aparecer) en las celdas de monto
+CORPUS = [
+    "1.234,56", "333,3333333", "1000", "", "   ", None, "abc", "-", ".", ",",
+    "1.234.567,89", "1,234.56", "1.5", "-1,5", "-1.234,5", "$ 1.234,56", "US$12",
+    "€ 3,5", "12 345", "1e3", "1.2.3", "1,2,3", "--1", "1-2", "-.5", "5.", ",5",
+    "0", "-0", "0,0", "00012", "99999999999999999999", "1.", " 42 ", "\t7\n",
+    "١٢٣", "½", "1_000", "+3", "3-", "nan", "inf", "-inf", "1,234,567.89",
+]
+
+
+@pytest.mark.parametrize("valor", CORPUS)
+def test_to_num_series_igual_que_to_num(valor):
+    # El parser vectorizado tiene que dar exactamente lo mismo que to_num, celda por celda
+    # (repr: distingue 0.0 de -0.0 y compara NaN)
+    assert repr(to_num_series(pd.Series([valor], dtype=object)).tolist()[0]) == repr(to_num(valor))
+
+
+def test_to_num_series_corpus_junto_y_tipos_mezclados():
+    col = pd.Series(CORPUS, dtype=object)
+    assert [repr(v) for v in to_num_series(col)] == [repr(to_num(v)) for v in CORPUS]
+    # Mezcla de números y strings, como llega con UNFORMATTED_VALUE
+    mixto = pd.Series([1, 2.5, "", "1.234,56", None, 3], dtype=object)
+    assert to_num_series(mixto).tolist() == [1.0, 2.5, 0.0, 1234.56, 0.0, 3.0]
+
+
+def fila(id_, monto="10"):
+    return [id_, "2026-03-01", "Cena", "Ana", monto, "ARS", "1", monto, "5", "5"]
+
+
+def hoja(*ids):
+    return FakeWorksheet([BASE_COLS + PERSONAS] + [fila(i) for i in ids])
+
+
+def test_sync_incremental_con_fila_vacia_borra_la_fila_correcta():
+    ws = hoja("id1", "id2")
+    storage = SheetsStorage(SnapshotCache(ttl=0, incremental=True), "s", "gastos", lambda: ws)
+    storage.load(PERSONAS)
+
+    # otro viajero deja una fila vacía en el medio y después carga dos gastos
+    ws.values += [[""] * len(ws.values[0]), fila("id10"), fila("id11")]
+    df = storage.load(PERSONAS)
+    assert "get_all_values" not in ws.calls[1:]  # fue un sync incremental
+    assert len(df) == len(ws.values) - 1
+    assert storage.cache.id_index("s", "gastos").row("id11") == len(ws.values)
+
+    assert storage.delete("id11")
+    ids = [r[0] for r in ws.values[1:]]
+    assert ids == ["id1", "id2", "", "id10"]
+
+
+def test_delete_y_update_confirman_la_celda_id():
+    ws = hoja("id1", "id2", "id3", "id4")
+    storage = SheetsStorage(SnapshotCache(), "s", "gastos", lambda: ws)
+    storage.load(PERSONAS)
+
+    # otra instancia borra id1: el índice (todavía vigente) quedó una fila corrido
+    del ws.values[1]
+    assert storage.delete("id3")
+    assert [r[0] for r in ws.values[1:]] == ["id2", "id4"]
+
+    del ws.values[1]
+    assert storage.update("id4", dict(zip(BASE_COLS + PERSONAS, fila("id4", "99"))), PERSONAS)
+    assert [r[0] for r in ws.values[1:]] == ["id4"] and ws.values[1][4] == "99"
+
+
+def _largo(ws):
+    wp = FakeWorksheet([["id", "persona", "monto_base", "lote"]], title="gastos_partes")
+    return SheetsStorage(SnapshotCache(), "s", "gastos", lambda: ws,
+                         partes_worksheet="gastos_partes", get_partes_ws=lambda: wp), wp
+
+
+def test_migracion_no_borra_columnas_que_no_son_personas():
+    ws = hoja("id1")
+    ws.values[0].append("notas")
+    ws.values[1].append("pagó con tarjeta")
+    storage, wp = _largo(ws)
+    assert storage.columnas_por_migrar() == PERSONAS + ["notas"]
+    try:
+        storage.migrar_a_largo(PERSONAS)
+        raise AssertionError("tendría que haber fallado")
+    except ValueError:
+        pass
+    assert ws.values[0] == BASE_COLS + PERSONAS + ["notas"] and "delete_columns" not in ws.calls
+
+
+def test_migracion_aborta_con_celdas_no_numericas():
+    ws = hoja("id1", "id2")
+    ws.values[2][-1] = "la mitad"
+    storage, wp = _largo(ws)
+    try:
+        storage.migrar_a_largo(PERSONAS)
+        raise AssertionError("tendría que haber fallado")
+    except ValueError:
+        pass
+    assert "delete_columns" not in ws.calls and len(wp.values) == 1
+
+    ws.values[2][-1] = "5"
+    assert storage.migrar_a_largo(PERSONAS) == 4
+    assert ws.values[0] == BASE_COLS and storage.ledger(PERSONAS).consumido == {"Ana": 10.0, "Beto": 10.0}
+
+
+def test_columnas_faltantes_antes_de_encolar():
+    ws = hoja("id1")
+    storage = SheetsStorage(SnapshotCache(), "s", "gastos", lambda: ws)
+    assert storage.columnas_faltantes(PERSONAS) == []
+    assert storage.columnas_faltantes(PERSONAS + ["Zoe"]) == ["Zoe"]
+
+
+def test_version_cambia_solo_cuando_cambian_los_datos():
+    ws = hoja("id1", "id2")
+    storage = SheetsStorage(SnapshotCache(ttl=0, incremental=True), "s", "gastos", lambda: ws)
+    v = storage.version(PERSONAS)
+    assert storage.version(PERSONAS) == v  # TTL vencido pero sin filas nuevas
+
+    ws.values.append(fila("id3"))
+    v2 = storage.version(PERSONAS)
+    assert v2 != v
+    assert storage.delete("id1")
+    assert storage.version(PERSONAS) != v2
+
+
+def test_delete_y_update_corrigen_el_snapshot_sin_releer_la_hoja():
+    # Modo por defecto (sync completo): borrar y editar ajustan Ledger, Cubo y df del snapshot
+    # en lugar de descartarlo
+    ws = hoja("id1", "id2", "id3")
+    storage = SheetsStorage(SnapshotCache(), "s", "gastos", lambda: ws)
+    storage.load(PERSONAS)
+    v = storage.version(PERSONAS)
+
+    assert storage.delete("id2")
+    assert storage.update("id3", dict(zip(BASE_COLS + PERSONAS, fila("id3", "40"))), PERSONAS)
+    assert storage.version(PERSONAS) != v
+
+    df = storage.load(PERSONAS)
+    assert df["id"].tolist() == ["id1", "id3"]
+    assert df["monto_base"].tolist() == [10.0, 40.0]
+    ledger = storage.ledger(PERSONAS)
+    assert ledger.total == 50.0 and ledger.n == 2
+    assert ledger.pagado["Ana"] == 50.0
+    assert storage.cubo(PERSONAS).n == 2
+    assert ws.calls.count("get_all_values") == 1
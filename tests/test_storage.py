@@ -0,0 +1,46 @@
+from sheets import BASE_COLS
+from storage import SqliteStorage
+
+PERSONAS = ["Ana", "Beto"]
+
+
+def fila(id_, monto="10"):
+    return dict(zip(BASE_COLS + PERSONAS, [id_, "2026-03-01", "Cena", "Ana", monto, "ARS", "1", monto, "5", "5"]))
+
+
+def test_version_sqlite(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "t.db"))
+    v = storage.version(PERSONAS)
+    assert storage.version(PERSONAS) == v
+    storage.append([fila("id1")], PERSONAS)
+    v2 = storage.version(PERSONAS)
+    assert v2 != v
+    storage.update("id1", fila("id1", "20"), PERSONAS)
+    assert storage.version(PERSONAS) != v2
+
+
+def test_indice_sqlite_se_reusa_hasta_que_cambian_los_datos(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "t.db"))
+    storage.append([fila("id1")], PERSONAS)
+    indice = storage.indice(PERSONAS)
+    assert storage.indice(PERSONAS) is indice
+    storage.append([fila("id2")], PERSONAS)
+    assert storage.indice(PERSONAS).n == 2
+
+
+def test_sqlite_dedup_borrar_y_editar(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "t.db"))
+    # el reintento de un lote ya escrito no duplica filas
+    storage.append([fila("id1"), fila("id2"), fila("id3")], PERSONAS)
+    storage.append([fila("id3")], PERSONAS)
+    assert sorted(storage.ids()) == ["id1", "id2", "id3"]
+
+    assert storage.delete("id2")
+    assert not storage.delete("id2")
+    assert storage.update("id3", fila("id3", "40"), PERSONAS)
+    assert not storage.update("nada", fila("nada"), PERSONAS)
+
+    df = storage.load(PERSONAS)
+    assert sorted(zip(df["id"], df["monto_base"])) == [("id1", 10.0), ("id3", 40.0)]
+    ledger = storage.ledger(PERSONAS)
+    assert ledger.total == 50.0 and ledger.n == 2
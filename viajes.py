@@ -0,0 +1,83 @@
+# -------------------------
+# Registro de viajes
+# -------------------------
+# Cada viaje vive en su propia worksheet (o Sheet), con sus personas y su moneda base.
+# Se definen en secrets:
+#
+#   [viajes.nyc2026]
+#   titulo = "Viaje NYC – Amsterdam 2026"
+#   worksheet = "gastos"
+#   personas = ["Quique", "Rafa", "Gus"]
+#   base = "ARS"
+#   # spreadsheet_id = "..."   (opcional, por defecto el de [sheets])
+#
+# o en una worksheet índice (sheets.trip_index) con columnas id, titulo, worksheet, personas, base
+# y opcionalmente spreadsheet_id. Sin nada configurado queda un único viaje con [sheets].worksheet
+# (o "gastos" si no hay [sheets], como con el backend sqlite).
+
+DEFAULT_TITULO = "Viaje NYC – Amsterdam 2026"
+DEFAULT_PERSONAS = ["Quique", "Rafa", "Gus"]
+DEFAULT_BASE = "ARS"
+
+
+class Viaje:
+    def __init__(self, id: str, titulo: str, spreadsheet_id: str, worksheet: str,
+                 personas: list[str], base: str = DEFAULT_BASE):
+        self.id = id
+        self.titulo = titulo
+        self.spreadsheet_id = spreadsheet_id
+        self.worksheet = worksheet
+        self.personas = list(personas)
+        self.base = base
+
+    @property
+    def hoja(self) -> tuple[str, str]:
+        # Clave de la worksheet: la misma que usan SnapshotCache, IdIndex y el outbox
+        return (self.spreadsheet_id, self.worksheet)
+
+
+def _personas(v) -> list[str]:
+    if isinstance(v, str):
+        v = v.replace(";", ",").split(",")
+    return [p.strip() for p in v if str(p).strip()]
+
+
+def viajes_from_config(sheets_cfg, viajes_cfg=None) -> dict[str, Viaje]:
+    spreadsheet_id = sheets_cfg.get("spreadsheet_id", "local")
+    viajes = {}
+    for id_, cfg in (viajes_cfg or {}).items():
+        viajes[id_] = Viaje(
+            id_,
+            cfg.get("titulo", id_),
+            cfg.get("spreadsheet_id", spreadsheet_id),
+            cfg.get("worksheet", id_),
+            _personas(cfg.get("personas", DEFAULT_PERSONAS)),
+            cfg.get("base", DEFAULT_BASE),
+        )
+    if not viajes:
+        viajes["default"] = Viaje(
+            "default", DEFAULT_TITULO, spreadsheet_id, sheets_cfg.get("worksheet", "gastos"), DEFAULT_PERSONAS, DEFAULT_BASE
+        )
+    return viajes
+
+
+def parse_trip_index(values, spreadsheet_id: str) -> dict[str, Viaje]:
+    # values: filas de la worksheet índice (get_all_values), header en la primera
+    if len(values) < 2:
+        return {}
+    headers = [h.strip() for h in values[0]]
+    viajes = {}
+    for r in values[1:]:
+        cfg = dict(zip(headers, r))
+        id_ = cfg.get("id", "").strip()
+        if not id_:
+            continue
+        viajes[id_] = Viaje(
+            id_,
+            cfg.get("titulo") or id_,
+            cfg.get("spreadsheet_id") or spreadsheet_id,
+            cfg.get("worksheet") or id_,
+            _personas(cfg.get("personas") or DEFAULT_PERSONAS),
+            cfg.get("base") or DEFAULT_BASE,
+        )
+    return viajes